@@ -11,8 +11,11 @@ import threading
 import json
 import calendar
 import gc
+import copy
+import itertools
 import queue
 import atexit
+from collections import OrderedDict
 import customtkinter as ctk
 from customtkinter import CTkScrollableFrame, CTkButton, CTkLabel, CTkEntry, CTkTextbox, CTkFrame, CTkComboBox
 
@@ -109,8 +112,8 @@ except ImportError:
 # Windows OCR (встроен в Windows 10+)
 try:
     from winsdk.windows.media.ocr import OcrEngine
-    from winsdk.windows.storage.streams import InMemoryRandomAccessStream, DataWriter
-    from winsdk.windows.graphics.imaging import BitmapDecoder, BitmapPixelFormat, BitmapAlphaMode
+    from winsdk.windows.storage.streams import DataWriter
+    from winsdk.windows.graphics.imaging import BitmapPixelFormat, SoftwareBitmap
     from winsdk.windows.globalization import Language
     import asyncio
     WINDOWS_OCR_AVAILABLE = True
@@ -132,15 +135,413 @@ def get_ocr_status():
         'pillow': PIL_AVAILABLE                # Для работы с изображениями
     }
 
-def is_ocr_available():
-    """Проверяет доступность OCR"""
+def is_ocr_available(raster=False):
+    """Проверяет доступность OCR
+    
+    reportlab и Pillow нужны только для пересборки страниц растром
+    (ocr_pdf с keep_original_pages=False, raster=True); по умолчанию
+    текстовый слой добавляется к исходным страницам средствами PyMuPDF.
+    """
     status = get_ocr_status()
-    return all([
-        status['pymupdf'],
-        status['windows_ocr'],
-        status['reportlab'],
-        status['pillow']
-    ])
+    required = [status['pymupdf'], status['windows_ocr']]
+    if raster:
+        required += [status['reportlab'], status['pillow']]
+    return all(required)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ДВИЖКИ РАСПОЗНАВАНИЯ СТРАНИЦ
+# ─────────────────────────────────────────────────────────────────────────────
+
+# Потоков распознавания в ocr_pdf (одно ядро остаётся интерфейсу и рендерингу)
+OCR_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+# Страница с изображениями и меньшим числом полезных символов считается сканом
+OCR_PAGE_MIN_TEXT = 50
+
+class PageOcrEngine:
+    """Интерфейс движка OCR для ocr_pdf.
+    
+    Экземпляр создаётся на поток распознавания и используется только в нём.
+    recognize() получает сырые пиксели страницы в градациях серого (Gray8,
+    по байту на пиксель, строки без выравнивания - как pix.samples у PyMuPDF)
+    и возвращает строки [(текст, x0, y0, x1, y1)] в пикселях изображения.
+    Для проверки без Windows достаточно передать в ocr_pdf фабрику другого подкласса.
+    Атрибуты name и language созданного экземпляра входят в ключ кэша результатов
+    OCR, поэтому language - язык, на котором движок действительно распознаёт.
+    """
+    name = ""
+    language = ""
+    
+    def recognize(self, pixels, width, height):
+        raise NotImplementedError
+    
+    def close(self):
+        """Освобождает ресурсы движка"""
+        pass
+
+
+class WindowsPageOcrEngine(PageOcrEngine):
+    """Windows OCR (winsdk) с одним event loop на весь срок жизни экземпляра"""
+    name = "windows"
+    language = "ru"
+    
+    def __init__(self, language=None):
+        import asyncio
+        
+        language = language or self.language
+        self.language = language
+        
+        if not WINDOWS_OCR_AVAILABLE:
+            raise ImportError("Для OCR требуется библиотека winsdk: pip install winsdk\n(Требуется Windows 10 или новее)")
+        
+        engine = None
+        try:
+            # Пробуем создать OCR engine для нужного языка
+            engine = OcrEngine.try_create(Language(language))
+        except Exception:
+            pass
+        if engine is None:
+            # Fallback на системные языки пользователя
+            engine = OcrEngine.try_create_from_user_profile_languages()
+        if engine is None:
+            raise Exception("Не удалось инициализировать OCR engine")
+        
+        # После fallback язык другой - он входит в ключ кэша результатов
+        try:
+            self.language = engine.recognizer_language.language_tag
+        except Exception:
+            pass
+        
+        self.engine = engine
+        self.loop = asyncio.new_event_loop()
+    
+    def recognize(self, pixels, width, height):
+        # Пиксели копируются в SoftwareBitmap напрямую - без кодирования в BMP/PNG
+        writer = DataWriter()
+        writer.write_bytes(bytes(pixels))
+        software_bitmap = SoftwareBitmap.create_copy_from_buffer(
+            writer.detach_buffer(), BitmapPixelFormat.GRAY8, width, height
+        )
+        result = self.loop.run_until_complete(self.engine.recognize_async(software_bitmap))
+        
+        lines = []
+        if result:
+            for line in result.lines:
+                words = line.words
+                if not line.text.strip() or not words:
+                    continue
+                # Границы строки - по всем её словам
+                lines.append((
+                    line.text,
+                    min(w.bounding_rect.x for w in words),
+                    min(w.bounding_rect.y for w in words),
+                    max(w.bounding_rect.x + w.bounding_rect.width for w in words),
+                    max(w.bounding_rect.y + w.bounding_rect.height for w in words),
+                ))
+        return lines
+    
+    def close(self):
+        try:
+            self.loop.close()
+        except Exception:
+            pass
+
+
+class OcrWorkerPool:
+    """Потоки распознавания страниц: у каждого потока свой экземпляр движка.
+    
+    Движки создаются фабрикой при первой странице в потоке и закрываются в close().
+    Если задан cache (OcrResultCache), страницы с уже известными пикселями
+    берутся из него. Ключ включает имя и язык движка, поэтому первый движок
+    создаётся и тогда, когда все страницы найдены в кэше; остальные потоки
+    создают свои только для нераспознанных страниц. cache_variant дополняет
+    ключ (например, разрешением рендеринга).
+    """
+    def __init__(self, engine_factory, num_workers=OCR_WORKERS, cache=None, cache_variant=""):
+        _ensure_concurrent_imports()
+        self.engine_factory = engine_factory
+        self.num_workers = max(1, num_workers)
+        self.executor = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="ocr")
+        self._local = threading.local()
+        self._engines = []
+        self._lock = threading.Lock()
+        self.init_error = None  # Ошибка создания движка (OCR недоступен целиком)
+        self.cache = cache
+        self.cache_variant = cache_variant
+        self._engine_variant = None
+        self.cache_hits = 0
+    
+    def _engine(self):
+        engine = getattr(self._local, 'engine', None)
+        if engine is None:
+            try:
+                engine = self.engine_factory()
+            except Exception as e:
+                self.init_error = e
+                raise
+            self._local.engine = engine
+            with self._lock:
+                self._engines.append(engine)
+        return engine
+    
+    def _variant(self):
+        """Часть ключа кэша: движок и язык, с которыми он реально создан"""
+        if self._engine_variant is None:
+            engine = self._engine()
+            self._engine_variant = "|".join((engine.name or type(engine).__name__, engine.language,
+                                             self.cache_variant))
+        return self._engine_variant
+    
+    def _recognize(self, pixels, width, height):
+        key = None
+        if self.cache is not None:
+            # Хэш считается в потоке распознавания, параллельно с рендерингом
+            key = self.cache.key_for(pixels, width, height, self._variant())
+            lines = self.cache.get(key)
+            if lines is not None:
+                with self._lock:
+                    self.cache_hits += 1
+                return lines
+        
+        lines = self._engine().recognize(pixels, width, height)
+        if key is not None:
+            self.cache.put(key, lines)
+        return lines
+    
+    def submit(self, pixels, width, height):
+        """Future со строками распознанного текста (пиксели в формате Gray8)"""
+        return self.executor.submit(self._recognize, pixels, width, height)
+    
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            engines, self._engines = self._engines, []
+        for engine in engines:
+            try:
+                engine.close()
+            except Exception:
+                pass
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ПРОВЕРКА ТЕКСТОВОГО СЛОЯ PDF
+# ─────────────────────────────────────────────────────────────────────────────
+
+# Страниц в выборке pdf_has_text_layer (проверка останавливается на первом скане)
+PDF_TEXT_SAMPLE_PAGES = 8
+
+# Доля площади страницы под изображениями, начиная с которой страница похожа на скан
+PDF_SCAN_IMAGE_COVERAGE = 0.5
+
+class PdfTextLayerCache:
+    """Вердикты проверки текстового слоя PDF по хэшу содержимого файла (в памяти)
+    
+    Хэш файла запоминается по (путь, размер, время изменения), поэтому повторная
+    проверка того же файла не перечитывает его с диска.
+    """
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._hashes = {}
+        self._verdicts = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def file_hash(self, pdf_path):
+        """SHA-1 содержимого файла (None, если файл не читается)"""
+        import hashlib
+        
+        try:
+            st = os.stat(pdf_path)
+        except OSError:
+            return None
+        stat_key = (os.path.abspath(pdf_path), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            digest = self._hashes.get(stat_key)
+        if digest is not None:
+            return digest
+        
+        sha = hashlib.sha1()
+        try:
+            with open(pdf_path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    sha.update(block)
+        except OSError:
+            return None
+        digest = sha.hexdigest()
+        with self._lock:
+            if len(self._hashes) >= self.max_entries:
+                self._hashes.clear()
+            self._hashes[stat_key] = digest
+        return digest
+    
+    def get(self, pdf_path, kind):
+        digest = self.file_hash(pdf_path)
+        if digest is None:
+            return None
+        with self._lock:
+            value = self._verdicts.get((digest, kind))
+            if value is not None:
+                self._verdicts.move_to_end((digest, kind))
+            return value
+    
+    def put(self, pdf_path, kind, value):
+        digest = self.file_hash(pdf_path)
+        if digest is None:
+            return
+        with self._lock:
+            self._verdicts[(digest, kind)] = value
+            self._verdicts.move_to_end((digest, kind))
+            while len(self._verdicts) > self.max_entries:
+                self._verdicts.popitem(last=False)
+
+pdf_text_layer_cache = PdfTextLayerCache()
+
+# ─────────────────────────────────────────────────────────────────────────────
+# ПОСТОЯННЫЙ КЭШ РЕЗУЛЬТАТОВ OCR
+# ─────────────────────────────────────────────────────────────────────────────
+
+OCR_CACHE_DIR = os.path.join(os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache"),
+                             "GenerationDoc", "ocr_cache")
+OCR_CACHE_MAX_BYTES = 64 * 1024 * 1024
+OCR_CACHE_MAX_AGE_DAYS = 90  # Записи старше удаляются при очистке устаревших
+OCR_CACHE_FORMAT = 1  # Меняется, если меняется формат распознанных строк (сбрасывает кэш)
+
+class OcrResultCache:
+    """Кэш распознанных строк страниц на диске.
+    
+    Ключ - хэш пикселей отрендеренной страницы вместе с движком, языком и
+    разрешением, поэтому та же страница в другом порядке, с другой нумерацией
+    или в другом файле распознаётся один раз. Запись - JSON со строками
+    [(текст, x0, y0, x1, y1)]. Время изменения файла служит отметкой последнего
+    обращения: при превышении max_bytes удаляются самые давние записи.
+    """
+    def __init__(self, directory=OCR_CACHE_DIR, max_bytes=OCR_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None  # Считается при первой записи
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def key_for(pixels, width, height, variant=""):
+        """Ключ страницы по её пикселям; variant - движок, язык и разрешение"""
+        import hashlib
+        
+        digest = hashlib.sha256(f"{OCR_CACHE_FORMAT}|{variant}|{width}x{height}|".encode('utf-8'))
+        digest.update(pixels)
+        return digest.hexdigest()
+    
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+    
+    def get(self, key):
+        """Распознанные строки из кэша или None"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = [tuple(line) for line in json.load(f)]
+            os.utime(path, None)  # Отметка последнего обращения для LRU
+        except (OSError, ValueError, TypeError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return lines
+    
+    def put(self, key, lines):
+        """Сохраняет распознанные строки страницы"""
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump([list(line) for line in lines], f, ensure_ascii=False)
+            size = os.path.getsize(temp_path)
+            try:
+                # Перезапись: размер прежней записи уже учтён
+                size -= os.path.getsize(path)
+            except OSError:
+                pass
+            os.replace(temp_path, path)
+        except OSError:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            return
+        
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += size
+        self._evict(keep=path)
+    
+    def _entries(self):
+        """[(время обращения, размер, путь)] всех файлов кэша"""
+        entries = []
+        try:
+            for sub in os.scandir(self.directory):
+                if not sub.is_dir():
+                    continue
+                for entry in os.scandir(sub.path):
+                    if entry.name.endswith('.json'):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            pass
+        return entries
+    
+    def _evict(self, keep=None, max_age_days=None):
+        """Удаляет самые давние записи, пока размер кэша больше max_bytes
+        
+        Returns:
+            tuple: (удалено записей, освобождено байт)
+        """
+        with self._lock:
+            if max_age_days is None and self._total_bytes is not None and self._total_bytes <= self.max_bytes:
+                return 0, 0
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            oldest_allowed = time.time() - max_age_days * 86400 if max_age_days is not None else None
+            removed = freed = 0
+            for accessed, size, path in sorted(entries):
+                expired = oldest_allowed is not None and accessed < oldest_allowed
+                if total <= self.max_bytes and not expired:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.unlink(path)
+                    total -= size
+                    removed += 1
+                    freed += size
+                except OSError:
+                    pass
+            self._total_bytes = total
+            return removed, freed
+    
+    def prune(self, max_age_days=OCR_CACHE_MAX_AGE_DAYS):
+        """Удаляет записи без обращений дольше max_age_days и сверх max_bytes
+        
+        Returns:
+            tuple: (удалено записей, освобождено байт)
+        """
+        return self._evict(max_age_days=max_age_days)
+    
+    def stats(self):
+        """Количество записей, размер и попадания за сеанс"""
+        entries = self._entries()
+        return {'entries': len(entries), 'bytes': sum(size for _, size, _ in entries),
+                'hits': self.hits, 'misses': self.misses}
+    
+    def clear(self):
+        """Удаляет все записи кэша"""
+        import shutil
+        with self._lock:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self._total_bytes = 0
+
+# Глобальный кэш распознанных страниц
+ocr_result_cache = OcrResultCache()
 
 # ─────────────────────────────────────────────────────────────────────────────
 # КОНФИГУРАЦИЯ
@@ -1440,321 +1841,571 @@ class TabStatusTooltip:
             self.tooltip_window.destroy()
             self.tooltip_window = None
 
+# ── ПОСТОЯННЫЙ КЭШ КОНВЕРТАЦИЙ В PDF ────────────────────────────────
+
+PDF_CACHE_DIR = os.path.join(os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache"),
+                             "GenerationDoc", "pdf_cache")
+PDF_CACHE_MAX_BYTES = 512 * 1024 * 1024
+PDF_CACHE_FORMAT = 1  # Меняется, если меняется способ получения PDF (сбрасывает кэш)
+
+def _word_pdf_converter_tag():
+    """Метка конвертера Word → PDF для ключа кэша: версия Word или docx2pdf"""
+    if WIN32COM_AVAILABLE:
+        try:
+            import winreg
+            with winreg.OpenKey(winreg.HKEY_CLASSES_ROOT, r"Word.Application\CurVer") as key:
+                return winreg.QueryValue(key, None)  # Например "Word.Application.16"
+        except Exception:
+            return "Word.Application"
+    return "docx2pdf" if DOCX2PDF_AVAILABLE else "none"
+
+class PdfConversionCache:
+    """Кэш PDF на диске с адресацией по содержимому.
+    
+    Ключ - хэш байтов исходного файла вместе с меткой конвертера и вариантом
+    (например, предпросмотр с выделенными плейсхолдерами), поэтому после правки
+    файла старая запись просто перестаёт находиться, а после перезапуска
+    программы конвертация не повторяется. Время изменения файла кэша служит
+    отметкой последнего обращения: при превышении max_bytes удаляются самые
+    давние записи. Одинаковые файлы из разных потоков конвертируются один раз.
+    """
+    def __init__(self, directory=PDF_CACHE_DIR, max_bytes=PDF_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._total_bytes = None  # Считается при первой записи
+        self._converter_tag = None
+        self.hits = 0
+        self.misses = 0
+    
+    def key_for(self, file_path, variant=""):
+        """Ключ файла (None, если файл не читается)"""
+        import hashlib
+        
+        if self._converter_tag is None:
+            self._converter_tag = _word_pdf_converter_tag()
+        digest = hashlib.sha256(f"{PDF_CACHE_FORMAT}|{self._converter_tag}|{variant}|".encode('utf-8'))
+        try:
+            with open(file_path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+        except OSError:
+            return None
+        return digest.hexdigest()
+    
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".pdf")
+    
+    def get(self, key):
+        """Путь к PDF в кэше или None. Файл нельзя изменять или удалять"""
+        if not key:
+            return None
+        path = self._path(key)
+        try:
+            os.utime(path, None)  # Отметка последнего обращения для LRU
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+    
+    def put(self, key, pdf_path):
+        """Переносит готовый PDF в кэш. Returns: путь в кэше"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        import shutil
+        shutil.move(pdf_path, temp_path)
+        size = os.path.getsize(temp_path)
+        os.replace(temp_path, path)
+        
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += size
+        self._evict(keep=path)
+        return path
+    
+    def convert(self, file_path, convert_func, variant=""):
+        """
+        PDF из кэша или результат convert_func(file_path, pdf_path), сохранённый в кэш.
+        
+        Returns:
+            str: путь к PDF в кэше (только для чтения)
+        """
+        key = self.key_for(file_path, variant)
+        if key is None:
+            raise FileNotFoundError(f"Файл не найден: {file_path}")
+        
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            cached = self.get(key)
+            if cached:
+                return cached
+            
+            fd, temp_pdf = tempfile.mkstemp(suffix='.pdf', prefix='pdf_cache_')
+            os.close(fd)
+            try:
+                convert_func(file_path, temp_pdf)
+                if not os.path.exists(temp_pdf) or os.path.getsize(temp_pdf) == 0:
+                    raise Exception("PDF файл не был создан")
+                return self.put(key, temp_pdf)
+            finally:
+                if os.path.exists(temp_pdf):
+                    try:
+                        os.unlink(temp_pdf)
+                    except OSError:
+                        pass
+                with self._lock:
+                    self._key_locks.pop(key, None)
+    
+    def _entries(self):
+        """[(время обращения, размер, путь)] всех файлов кэша"""
+        entries = []
+        try:
+            for sub in os.scandir(self.directory):
+                if not sub.is_dir():
+                    continue
+                for entry in os.scandir(sub.path):
+                    if entry.name.endswith('.pdf'):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            pass
+        return entries
+    
+    def _evict(self, keep=None):
+        """Удаляет самые давние записи, пока размер кэша больше max_bytes"""
+        with self._lock:
+            if self._total_bytes is not None and self._total_bytes <= self.max_bytes:
+                return
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.unlink(path)
+                    total -= size
+                except OSError:
+                    pass  # Файл открыт в просмотре - удалится в следующий раз
+            self._total_bytes = total
+    
+    def stats(self):
+        """Количество записей, размер и попадания за сеанс"""
+        entries = self._entries()
+        return {'entries': len(entries), 'bytes': sum(size for _, size, _ in entries),
+                'hits': self.hits, 'misses': self.misses}
+    
+    def clear(self):
+        """Удаляет все записи кэша"""
+        import shutil
+        with self._lock:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self._total_bytes = 0
+
+# Глобальный кэш конвертаций Word → PDF
+pdf_conversion_cache = PdfConversionCache()
+
+def convert_word_file_to_pdf(docx_path, pdf_path):
+    """Конвертация Word → PDF: Word из общего пула, при неудаче docx2pdf"""
+    last_error = None
+    if WIN32COM_AVAILABLE:
+        try:
+            convert_docx_to_pdf_with_word(docx_path, pdf_path)
+            return
+        except Exception as e:
+            last_error = f"win32com: {str(e)}"
+    if DOCX2PDF_AVAILABLE:
+        try:
+            from docx2pdf import convert
+            convert(os.path.abspath(docx_path), os.path.abspath(pdf_path))
+            return
+        except Exception as e:
+            last_error = f"{last_error}; docx2pdf: {str(e)}" if last_error else f"docx2pdf: {str(e)}"
+    raise Exception(last_error or "Не найден конвертер Word → PDF (Microsoft Word или docx2pdf)")
+
 # ── КЛАСС ДЛЯ ФОНОВОЙ ПРЕДЗАГРУЗКИ WORD ДОКУМЕНТОВ ───────────────────
+
+# Приоритеты предзагрузки: меньше - раньше
+PRELOAD_PRIORITY_PREVIEW = 0       # Файл, который пользователь открывает прямо сейчас
+PRELOAD_PRIORITY_SELECTED = 5      # Файл, выбранный в списке
+PRELOAD_PRIORITY_SPECULATIVE = 10  # Фоновая подготовка добавленных файлов
+WORD_PRELOAD_WORKERS = 2  # Потоков конвертации (не больше PDF_POOL_SIZE - экземпляров Word в пуле)
+
 class WordPreloadManager:
-    """Менеджер для фоновой конвертации Word документов в PDF"""
-    def __init__(self):
-        self.cache = {}  # {file_path: {'temp_pdf_path': str, 'status': str, 'error': str, 'timestamp': float}}
-        self.queue = queue.Queue()
-        self.worker_thread = None
+    """Менеджер для фоновой конвертации Word документов в PDF.
+    
+    Файлы ждут в очереди с приоритетом: просматриваемый файл обгоняет фоновую
+    подготовку остальных, повторный запрос с более высоким приоритетом
+    поднимает уже стоящий в очереди файл. Конвертацию ведут num_workers потоков
+    (экземпляры Word берутся из общего пула). Готовые PDF хранятся в постоянном
+    кэше pdf_conversion_cache, здесь - только состояние файлов текущего сеанса:
+    'queued', 'processing', 'ready', 'error' или 'cancelled'.
+    """
+    def __init__(self, pdf_cache=None, num_workers=WORD_PRELOAD_WORKERS):
+        self.pdf_cache = pdf_cache or pdf_conversion_cache
+        self.num_workers = max(1, num_workers)
+        self.cache = {}  # {file_path: {'temp_pdf_path': str, 'status': str, 'error': str, 'timestamp': float, 'priority': int}}
+        self.queue = queue.PriorityQueue()  # (приоритет, номер, file_path)
+        self.workers = []
         self.running = False
-        self.max_cache_age = 3600  # Максимальный возраст кэша в секундах (1 час)
-        self.max_cache_size = 10  # Максимальное количество закэшированных файлов
-        
+        self.max_cache_age = 3600  # Сколько секунд хранится состояние файла
+        self.max_cache_size = 100  # Максимальное количество файлов с сохранённым состоянием
+        self._lock = threading.RLock()
+        self._counter = itertools.count()
+    
     def start(self):
-        """Запускает фоновый поток обработки"""
-        if not self.running:
+        """Запускает фоновые потоки обработки"""
+        with self._lock:
+            if self.running:
+                return
             self.running = True
-            self.worker_thread = threading.Thread(target=self._worker, daemon=True)
-            self.worker_thread.start()
+            self.workers = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.num_workers)]
+            for worker in self.workers:
+                worker.start()
     
     def stop(self):
-        """Останавливает фоновый поток и закрывает все Word экземпляры"""
+        """Останавливает фоновые потоки и закрывает все Word экземпляры"""
         self.running = False
         
         # Очищаем очередь
-        while not self.queue.empty():
+        while True:
             try:
                 self.queue.get_nowait()
                 self.queue.task_done()
-            except:
+            except queue.Empty:
                 break
         
-        # Принудительно закрываем все Word экземпляры
-        if WIN32COM_AVAILABLE:
-            try:
-                import win32com.client
-                import pythoncom
-                try:
-                    pythoncom.CoInitialize()
-                    word = win32com.client.Dispatch("Word.Application")
-                    
-                    # КРИТИЧНО: Отключаем все диалоги
-                    word.DisplayAlerts = 0
-                    
-                    # Закрываем все открытые документы без сохранения
-                    if word.Documents.Count > 0:
-                        for doc in list(word.Documents):
-                            try:
-                                doc.Close(SaveChanges=False)
-                            except:
-                                pass
-                    
-                    word.Quit(SaveChanges=False)
-                    del word
-                    
-                except:
-                    pass
-                finally:
-                    try:
-                        pythoncom.CoUninitialize()
-                    except:
-                        pass
-                    time.sleep(0.1)
-                    gc.collect()
-            except:
-                pass
+        # Закрываем экземпляры Word, запущенные пулом конвертеров
+        shutdown_pdf_converter_pools()
         
         self.clear_cache()
     
+    def _take(self):
+        """Следующий файл для конвертации (устаревшие записи очереди пропускаются)"""
+        priority, _, file_path = self.queue.get(timeout=0.5)
+        self.queue.task_done()
+        with self._lock:
+            entry = self.cache.get(file_path)
+            # Файл мог быть поднят в очереди (запись с меньшим приоритетом уже взята) или отменён
+            if entry is None or entry['status'] != 'queued' or entry['priority'] != priority:
+                return None
+            entry['status'] = 'processing'
+            entry['timestamp'] = datetime.now().timestamp()
+        return file_path
+    
     def _worker(self):
         """Фоновый поток для конвертации Word документов"""
         while self.running:
             try:
-                file_path = self.queue.get(timeout=0.5)
-                
-                if file_path in self.cache:
-                    status = self.cache[file_path]['status']
-                    if status in ('processing', 'ready'):
-                        self.queue.task_done()
-                        continue
-                
-                self.cache[file_path] = {
-                    'temp_pdf_path': None,
-                    'status': 'processing',
-                    'error': None,
-                    'timestamp': datetime.now().timestamp()
-                }
-                
-                temp_pdf_path = self._convert_word_to_pdf(file_path)
-                
-                if temp_pdf_path:
-                    self.cache[file_path]['temp_pdf_path'] = temp_pdf_path
-                    self.cache[file_path]['status'] = 'ready'
-                else:
-                    self.cache[file_path]['status'] = 'error'
-                    self.cache[file_path]['error'] = 'Не удалось конвертировать файл'
-                
-                self.queue.task_done()
-                
-                self._cleanup_old_cache()
-                
+                file_path = self._take()
             except queue.Empty:
                 continue
-            except Exception as e:
-                if file_path in self.cache:
-                    self.cache[file_path]['status'] = 'error'
-                    self.cache[file_path]['error'] = str(e)
+            if file_path is None:
                 continue
+            
+            try:
+                temp_pdf_path = self._convert_word_to_pdf(file_path)
+                with self._lock:
+                    entry = self.cache.get(file_path)
+                    if entry is not None:
+                        if temp_pdf_path:
+                            entry['temp_pdf_path'] = temp_pdf_path
+                            entry['status'] = 'ready'
+                        else:
+                            entry['status'] = 'error'
+                            entry['error'] = 'Не удалось конвертировать файл'
+            except Exception as e:
+                with self._lock:
+                    if file_path in self.cache:
+                        self.cache[file_path]['status'] = 'error'
+                        self.cache[file_path]['error'] = str(e)
+            
+            self._cleanup_old_cache()
     
     def _convert_word_to_pdf(self, file_path):
-        """Конвертирует Word документ в PDF и возвращает путь к временному файлу"""
+        """Конвертирует Word документ в PDF и возвращает путь к файлу в кэше"""
         try:
-            import tempfile
+            return self.get_or_convert(file_path)
+        except Exception:
+            return None
+    
+    def get_or_convert(self, file_path):
+        """
+        PDF документа из постоянного кэша, при отсутствии - конвертация в текущем потоке.
+        
+        Returns:
+            str: путь к PDF в кэше (только для чтения, не удалять)
+        """
+        return self.pdf_cache.convert(file_path, convert_word_file_to_pdf)
+    
+    def preload(self, file_path, priority=PRELOAD_PRIORITY_SPECULATIVE):
+        """Добавляет файл в очередь на предзагрузку (или поднимает его в очереди)"""
+        if not file_path or not os.path.exists(file_path):
+            return
+        
+        if not file_path.lower().endswith(('.docx', '.doc')):
+            return
+        
+        with self._lock:
+            entry = self.cache.get(file_path)
+            if entry is not None:
+                status = entry['status']
+                if status == 'processing':
+                    return  # Уже обрабатывается
+                if status == 'queued' and entry['priority'] <= priority:
+                    return  # Уже в очереди не ниже запрошенного
+                if status == 'ready' and self.get_cached_pdf(file_path):
+                    return  # Готов и файл с тех пор не менялся
+            
+            self.cache[file_path] = {
+                'temp_pdf_path': None,
+                'status': 'queued',
+                'error': None,
+                'timestamp': datetime.now().timestamp(),
+                'priority': priority
+            }
+            self.queue.put((priority, next(self._counter), file_path))
+        
+        if not self.running:
+            self.start()
+    
+    def prioritize(self, file_path, priority=PRELOAD_PRIORITY_SELECTED):
+        """Поднимает файл в начало очереди (например, при выборе в списке)"""
+        self.preload(file_path, priority)
+    
+    def cancel(self, file_path):
+        """Снимает файл с очереди (уже идущая конвертация завершится)"""
+        with self._lock:
+            entry = self.cache.get(file_path)
+            if entry is not None and entry['status'] == 'queued':
+                entry['status'] = 'cancelled'
+    
+    def wait(self, file_path, poll=None, timeout=None):
+        """
+        PDF файла с наивысшим приоритетом: файл поднимается в очереди и ожидается.
+        
+        Args:
+            poll: функция, вызываемая во время ожидания (например, обновление окна)
+        
+        Returns:
+            str: путь к PDF в кэше
+        """
+        cached = self.get_cached_pdf(file_path)
+        if cached:
+            return cached
+        
+        self.preload(file_path, PRELOAD_PRIORITY_PREVIEW)
+        started_at = time.time()
+        while self.get_status(file_path) in ('queued', 'processing'):
+            if timeout is not None and time.time() - started_at > timeout:
+                raise TimeoutError(f"Превышено время ожидания конвертации: {os.path.basename(file_path)}")
+            if poll:
+                poll()
+            time.sleep(0.05)
+        
+        cached = self.get_cached_pdf(file_path)
+        if cached:
+            return cached
+        # Ошибка фоновой конвертации - последняя попытка в текущем потоке, с текстом ошибки
+        return self.get_or_convert(file_path)
+    
+    def get_cached_pdf(self, file_path):
+        """Возвращает путь к кэшированному PDF текущей версии файла или None"""
+        cached = self.pdf_cache.get(self.pdf_cache.key_for(file_path))
+        if cached:
+            with self._lock:
+                if file_path in self.cache:
+                    self.cache[file_path]['timestamp'] = datetime.now().timestamp()
+        return cached
+    
+    def get_status(self, file_path):
+        """Возвращает статус конвертации: 'queued', 'processing', 'ready', 'error', 'cancelled' или None"""
+        with self._lock:
+            entry = self.cache.get(file_path)
+            return entry['status'] if entry else None
+    
+    def get_progress(self, file_paths=None):
+        """Количество файлов по статусам: {'queued': n, 'processing': n, 'ready': n, ...}"""
+        with self._lock:
+            paths = self.cache.keys() if file_paths is None else file_paths
+            counts = {}
+            for file_path in paths:
+                entry = self.cache.get(file_path)
+                if entry is not None:
+                    counts[entry['status']] = counts.get(entry['status'], 0) + 1
+            return counts
+    
+    def _cleanup_old_cache(self):
+        """Забывает состояние давно не запрошенных файлов (PDF остаются в постоянном кэше)"""
+        current_time = datetime.now().timestamp()
+        
+        with self._lock:
+            # Удаляем завершённые записи старше max_cache_age
+            expired = [file_path for file_path, entry in self.cache.items()
+                       if entry['status'] not in ('queued', 'processing')
+                       and current_time - entry['timestamp'] > self.max_cache_age]
             
-            if not os.path.exists(file_path):
-                return None
+            for file_path in expired:
+                self._remove_from_cache(file_path)
             
-            temp_pdf_fd, temp_pdf_path = tempfile.mkstemp(suffix='.pdf', prefix='word_preview_')
-            # КРИТИЧНО: Сразу закрываем дескриптор чтобы избежать блокировки
-            try:
-                os.close(temp_pdf_fd)
-            except:
-                pass
-            
-            # Пробуем конвертировать через win32com (Windows)
-            if WIN32COM_AVAILABLE:
-                import win32com.client
-                import pythoncom
-                
-                word = None
-                doc = None
-                
-                try:
-                    pythoncom.CoInitialize()
-                    
-                    try:
-                        # Используем DispatchEx для изолированного экземпляра
-                        word = win32com.client.DispatchEx("Word.Application")
-                    except:
-                        word = win32com.client.Dispatch("Word.Application")
-                    
-                    # КРИТИЧНО: Устанавливаем настройки ДО открытия документа
-                    word.DisplayAlerts = 0  # Отключаем ВСЕ диалоги и предупреждения
-                    try:
-                        word.Visible = False
-                    except:
-                        pass  # Игнорируем ошибку установки Visible
-                    
-                    # Открываем Word документ с параметрами безопасности
-                    doc = word.Documents.Open(os.path.abspath(file_path), ReadOnly=True, 
-                                             AddToRecentFiles=False, ConfirmConversions=False)
-                    
-                    doc.SaveAs(os.path.abspath(temp_pdf_path), FileFormat=17)
-                    
-                    return temp_pdf_path
-                    
-                except Exception as e:
-                    # Если win32com не сработал, пробуем docx2pdf
-                    if os.path.exists(temp_pdf_path):
-                        try:
-                            os.unlink(temp_pdf_path)
-                        except:
-                            pass
-                
-                finally:
-                    # КРИТИЧНО: Правильный порядок закрытия для разблокировки файлов
-                    try:
-                        if doc:
-                            doc.Close(SaveChanges=False)
-                            del doc
-                    except:
-                        pass
-                    
-                    try:
-                        if word:
-                            # Закрываем все оставшиеся документы
-                            try:
-                                while word.Documents.Count > 0:
-                                    word.Documents(1).Close(SaveChanges=False)
-                            except:
-                                pass
-                            
-                            # Принудительно закрываем Word с отключением предупреждений
-                            word.DisplayAlerts = 0
-                            word.Quit(SaveChanges=False)
-                            del word
-                    except:
-                        pass
-                    
-                    try:
-                        pythoncom.CoUninitialize()
-                    except:
-                        pass
-                    
-                    # Даем время системе закрыть процесс Word
-                    time.sleep(0.1)
-                    
-                    # Принудительная сборка мусора для освобождения COM объектов
-                    doc = None
-                    word = None
-                    gc.collect()
-            
-            # Используем docx2pdf как запасной вариант
-            if DOCX2PDF_AVAILABLE:
-                try:
-                    from docx2pdf import convert
-                    convert(file_path, temp_pdf_path)
-                    return temp_pdf_path
-                except Exception as e:
-                    if os.path.exists(temp_pdf_path):
-                        try:
-                            os.unlink(temp_pdf_path)
-                        except:
-                            pass
-            
-            # Если ничего не сработало
-            if os.path.exists(temp_pdf_path):
-                try:
-                    os.unlink(temp_pdf_path)
-                except:
-                    pass
-            
-            return None
-            
-        except Exception as e:
-            return None
-    
-    def preload(self, file_path):
-        """Добавляет файл в очередь на предзагрузку"""
-        if not file_path or not os.path.exists(file_path):
-            return
-        
-        if not file_path.lower().endswith(('.docx', '.doc')):
-            return
-        
-        if file_path in self.cache:
-            status = self.cache[file_path]['status']
-            if status in ('processing', 'ready'):
-                return  # Уже обрабатывается или готов
-        
-        if not self.running:
-            self.start()
-        
-        self.queue.put(file_path)
-    
-    def get_cached_pdf(self, file_path):
-        """Возвращает путь к кэшированному PDF или None"""
-        if file_path not in self.cache:
-            return None
-        
-        cache_entry = self.cache[file_path]
-        if cache_entry['status'] == 'ready':
-            cache_entry['timestamp'] = datetime.now().timestamp()
-            return cache_entry['temp_pdf_path']
-        
-        return None
-    
-    def get_status(self, file_path):
-        """Возвращает статус конвертации: 'processing', 'ready', 'error', или None"""
-        if file_path not in self.cache:
-            return None
-        return self.cache[file_path]['status']
-    
-    def _cleanup_old_cache(self):
-        """Очищает старые записи из кэша"""
-        current_time = datetime.now().timestamp()
-        
-        # Удаляем записи старше max_cache_age
-        expired = []
-        for file_path, entry in self.cache.items():
-            if current_time - entry['timestamp'] > self.max_cache_age:
-                expired.append(file_path)
-        
-        for file_path in expired:
-            self._remove_from_cache(file_path)
-        
-        # Если кэш слишком большой, удаляем самые старые записи
-        if len(self.cache) > self.max_cache_size:
-            # Сортируем по timestamp
-            sorted_entries = sorted(self.cache.items(), key=lambda x: x[1]['timestamp'])
-            to_remove = len(self.cache) - self.max_cache_size
-            
-            for file_path, _ in sorted_entries[:to_remove]:
-                self._remove_from_cache(file_path)
+            # Если записей слишком много, удаляем самые старые завершённые
+            if len(self.cache) > self.max_cache_size:
+                finished = sorted((entry['timestamp'], file_path) for file_path, entry in self.cache.items()
+                                  if entry['status'] not in ('queued', 'processing'))
+                for _, file_path in finished[:len(self.cache) - self.max_cache_size]:
+                    self._remove_from_cache(file_path)
     
     def _remove_from_cache(self, file_path):
-        """Удаляет запись из кэша и очищает временный файл"""
-        if file_path in self.cache:
-            entry = self.cache[file_path]
-            temp_pdf = entry.get('temp_pdf_path')
-            
-            if temp_pdf and os.path.exists(temp_pdf):
-                try:
-                    # КРИТИЧНО: Многократные попытки удаления для разблокировки
-                    for attempt in range(3):
-                        try:
-                            os.unlink(temp_pdf)
-                            break
-                        except PermissionError:
-                            if attempt < 2:
-                                time.sleep(0.1)
-                                gc.collect()
-                            else:
-                                pass  # Игнорируем если не удалось удалить
-                except:
-                    pass
-            
-            del self.cache[file_path]
+        """Удаляет состояние файла (сам PDF принадлежит постоянному кэшу)"""
+        with self._lock:
+            self.cache.pop(file_path, None)
     
     def clear_cache(self):
-        """Полностью очищает кэш"""
-        for file_path in list(self.cache.keys()):
-            self._remove_from_cache(file_path)
+        """Очищает состояние сеанса"""
+        with self._lock:
+            self.cache.clear()
 
 # Глобальный экземпляр менеджера предзагрузки
 word_preload_manager = WordPreloadManager()
 
+# ── БУФЕРИЗОВАННЫЙ ЛОГ ────────────────────────────────────────────────
+LOG_FLUSH_INTERVAL_MS = 100  # Период сброса накопленных сообщений в виджет
+LOG_MAX_LINES = 5000  # Сколько последних строк хранит виджет лога
+
+class LogSink:
+    """Буферизованный вывод лога в текстовый виджет.
+    
+    write() только кладёт сообщение в потокобезопасную очередь и может вызываться
+    из любого потока. Раз в LOG_FLUSH_INTERVAL_MS накопленные сообщения выводятся
+    в виджет одной вставкой, строки сверх LOG_MAX_LINES удаляются с начала.
+    Полный лог (без ограничения) можно параллельно писать в файл.
+    """
+    def __init__(self, text_widget, flush_interval=LOG_FLUSH_INTERVAL_MS, max_lines=LOG_MAX_LINES):
+        self.text_widget = text_widget
+        self.flush_interval = flush_interval
+        self.max_lines = max_lines
+        self._queue = queue.SimpleQueue()
+        self._file = None
+        self._file_lock = threading.Lock()
+        self.text_widget.after(self.flush_interval, self._flush)
+    
+    def write(self, message):
+        """Добавляет сообщение (из любого потока)"""
+        self._queue.put(message)
+        if self._file is not None:
+            with self._file_lock:
+                if self._file is not None:
+                    self._file.write(message + "\n")
+    
+    def _drain(self):
+        lines = []
+        try:
+            while True:
+                lines.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return lines
+    
+    def _flush(self):
+        """Выводит накопленные сообщения одной операцией (вызывается таймером в UI потоке)"""
+        lines = self._drain()
+        try:
+            if lines:
+                widget = self.text_widget
+                widget.config(state=tk.NORMAL)
+                widget.insert(tk.END, "\n".join(lines) + "\n")
+                
+                # Ограничиваем объём хранимого лога
+                # После завершающего перевода строки 'end-1c' указывает на пустую строку
+                line_count = int(widget.index('end-1c').split('.')[0]) - 1
+                if line_count > self.max_lines:
+                    widget.delete('1.0', f'{line_count - self.max_lines + 1}.0')
+                
+                widget.see(tk.END)
+                widget.config(state=tk.DISABLED)
+            
+            self.text_widget.after(self.flush_interval, self._flush)
+        except tk.TclError:
+            # Виджет уничтожен (вкладка закрыта)
+            self.stop_file()
+    
+    def clear(self):
+        """Очищает лог и ещё не выведенные сообщения"""
+        self._drain()
+        self.text_widget.config(state=tk.NORMAL)
+        self.text_widget.delete('1.0', tk.END)
+        self.text_widget.config(state=tk.DISABLED)
+    
+    def start_file(self, file_path):
+        """Начинает дублировать полный лог в файл"""
+        log_file = open(file_path, 'a', encoding='utf-8')
+        with self._file_lock:
+            self._close_file_locked()
+            self._file = log_file
+    
+    def stop_file(self):
+        """Прекращает запись лога в файл"""
+        with self._file_lock:
+            self._close_file_locked()
+    
+    def _close_file_locked(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except:
+                pass
+            self._file = None
+
+# Уровни подробности лога
+LOG_DEBUG = 10
+LOG_INFO = 20
+LOG_WARN = 30
+LOG_ERROR = 40
+
+LOG_LEVELS = {"debug": LOG_DEBUG, "info": LOG_INFO, "warn": LOG_WARN, "error": LOG_ERROR}
+LOG_LEVEL_LABELS = {
+    "debug": "Подробно",
+    "info": "Обычно",
+    "warn": "Предупреждения",
+    "error": "Только ошибки",
+}
+
+class LevelLogger:
+    """Обёртка над функцией вывода лога с порогом уровня.
+    
+    Сообщения ниже порога отбрасываются. Чтобы в горячих циклах не тратить время
+    даже на форматирование строки, проверяйте флаг заранее:
+    if log.debug_enabled: log.debug(f"...")
+    """
+    def __init__(self, write, level=LOG_INFO):
+        self.write = write
+        self.level = level
+        self.debug_enabled = level <= LOG_DEBUG
+        self.info_enabled = level <= LOG_INFO
+        self.warn_enabled = level <= LOG_WARN
+    
+    def debug(self, message):
+        if self.debug_enabled:
+            self.write(message)
+    
+    def info(self, message):
+        if self.info_enabled:
+            self.write(message)
+    
+    def warn(self, message):
+        if self.warn_enabled:
+            self.write(message)
+    
+    def error(self, message):
+        self.write(message)
+
 # ── КЛАСС ДЛЯ ВКЛАДКИ ЗАДАЧИ ──────────────────────────────────────────
 class TabTask:
     """Класс для одной вкладки с задачей генерации документов"""
@@ -1785,6 +2436,10 @@ class TabTask:
         
         self.is_processing = False
         self.should_stop = False  # Флаг для остановки обработки
+        self.save_log_to_file = tk.BooleanVar(value=False)  # Дублировать полный лог в файл
+        self.force_rebuild = tk.BooleanVar(value=False)  # Игнорировать манифест папки сохранения
+        self.generate_pdf = tk.BooleanVar(value=False)  # Сохранять документы Word сразу в PDF
+        self.merge_generated_pdf = tk.BooleanVar(value=False)  # Собирать PDF в один файл по ходу генерации
         
         self.create_widgets()
     
@@ -2111,6 +2766,52 @@ class TabTask:
         output_btn.grid(row=4, column=2, pady=SPACING["sm"])
         ToolTip(output_btn, "Выбрать папку для сохранения")
         
+        force_rebuild_check = tk.Checkbutton(
+            files_content,
+            text="Пересоздать все документы",
+            variable=self.force_rebuild,
+            font=FONTS["small"],
+            bg=COLORS["card_bg"],
+            activebackground=COLORS["card_bg"],
+            selectcolor=COLORS["bg_primary"]
+        )
+        force_rebuild_check.grid(row=5, column=1, sticky="w")
+        ToolTip(force_rebuild_check, "По умолчанию повторный запуск создаёт только документы изменившихся строк\n"
+                                     f"(сведения о прошлом запуске хранятся в {GENERATION_MANIFEST_NAME} в папке сохранения)")
+        
+        pdf_options_frame = tk.Frame(files_content, bg=COLORS["card_bg"])
+        pdf_options_frame.grid(row=6, column=1, sticky="w")
+        
+        merge_pdf_check = tk.Checkbutton(
+            pdf_options_frame,
+            text="Объединить в один PDF",
+            variable=self.merge_generated_pdf,
+            font=FONTS["small"],
+            bg=COLORS["card_bg"],
+            activebackground=COLORS["card_bg"],
+            selectcolor=COLORS["bg_primary"],
+            state="disabled"
+        )
+        
+        def on_generate_pdf_toggle():
+            merge_pdf_check.configure(state="normal" if self.generate_pdf.get() else "disabled")
+        
+        generate_pdf_check = tk.Checkbutton(
+            pdf_options_frame,
+            text="Сохранять Word как PDF",
+            variable=self.generate_pdf,
+            command=on_generate_pdf_toggle,
+            font=FONTS["small"],
+            bg=COLORS["card_bg"],
+            activebackground=COLORS["card_bg"],
+            selectcolor=COLORS["bg_primary"]
+        )
+        generate_pdf_check.pack(side=tk.LEFT)
+        merge_pdf_check.pack(side=tk.LEFT, padx=(SPACING["md"], 0))
+        ToolTip(generate_pdf_check, "Каждый документ конвертируется в PDF сразу после заполнения,\n"
+                                    "без отдельного прохода конвертации (конвертер - в настройках производительности)")
+        ToolTip(merge_pdf_check, f"PDF собираются в «{GENERATED_MERGED_PDF_NAME}» в порядке строк таблицы")
+        
         # ══════════════════════════════════════════════════════════════
         # СЕКЦИЯ 3: НАСТРОЙКИ НАИМЕНОВАНИЯ ФАЙЛОВ
         # ══════════════════════════════════════════════════════════════
@@ -2274,6 +2975,19 @@ class TabTask:
         )
         self.log_text.pack(fill=tk.BOTH, expand=False, padx=1, pady=1)
         self.log_text.config(state=tk.DISABLED)
+        self.log_sink = LogSink(self.log_text)
+        
+        log_file_check = tk.Checkbutton(
+            log_content,
+            text="Сохранять полный лог в файл (в папку сохранения)",
+            variable=self.save_log_to_file,
+            font=FONTS["small"],
+            bg=COLORS["card_bg"],
+            activebackground=COLORS["card_bg"],
+            selectcolor=COLORS["bg_primary"]
+        )
+        log_file_check.pack(anchor="w", pady=(SPACING["xs"], 0))
+        ToolTip(log_file_check, f"В окне хранятся только последние {LOG_MAX_LINES} строк.\nПолный лог каждого запуска будет записан в файл")
         
         # Контекстное меню для лога
         def show_context_menu(event):
@@ -2482,11 +3196,8 @@ class TabTask:
             self.log(f"Папка сохранения выбрана: {folder}")
     
     def log(self, message):
-        """Добавление сообщения в лог"""
-        self.log_text.config(state=tk.NORMAL)
-        self.log_text.insert(tk.END, message + "\n")
-        self.log_text.see(tk.END)
-        self.log_text.config(state=tk.DISABLED)
+        """Добавление сообщения в лог (потокобезопасно, вывод пакетами по таймеру)"""
+        self.log_sink.write(message)
     
     def copy_log_text(self):
         """Копирование выделенного текста"""
@@ -4376,6 +5087,7 @@ class MergeTabTask:
         )
         self.log_text.pack(fill=tk.BOTH, expand=False, padx=1, pady=1)
         self.log_text.config(state=tk.DISABLED)
+        self.log_sink = LogSink(self.log_text)
         
         # Контекстное меню для лога
         def show_context_menu(event):
@@ -4423,6 +5135,10 @@ class MergeTabTask:
             if index >= 0 and index < len(self.file_list):
                 self.drag_data["index"] = index
                 self.drag_data["y"] = event.y
+                # Выбранный файл, скорее всего, сейчас откроют - готовим его первым
+                if self.file_list[index].lower().endswith(('.docx', '.doc')):
+                    word_preload_manager.prioritize(self.file_list[index])
+                    self.update_file_counter()
         
         def on_drag_motion(event):
             # Проверяем, что перетаскивание началось
@@ -4717,6 +5433,7 @@ class MergeTabTask:
         if selection:
             index = selection[0]
             self.files_listbox.delete(index)
+            word_preload_manager.cancel(self.file_list[index])
             del self.file_list[index]
             self.update_file_counter()
     
@@ -4737,6 +5454,10 @@ class MergeTabTask:
                 # Сохраняем размер перед очисткой
                 listbox_size = self.files_listbox.size()
                 
+                # Фоновая подготовка удалённых файлов больше не нужна
+                for file_path in self.file_list:
+                    word_preload_manager.cancel(file_path)
+                
                 # Очищаем данные  
                 self.file_list.clear()
                 
@@ -4821,9 +5542,29 @@ class MergeTabTask:
         self.update_file_counter()
     
     def update_file_counter(self):
-        """Обновить счетчик файлов"""
+        """Обновить счетчик файлов (и ход фоновой подготовки Word)"""
         count = len(self.file_list)
-        self.file_counter_label.config(text=f"Файлов: {count}")
+        word_files = [f for f in self.file_list if f.lower().endswith(('.docx', '.doc'))]
+        progress = word_preload_manager.get_progress(word_files)
+        pending = progress.get('queued', 0) + progress.get('processing', 0)
+        if word_files and (pending or progress.get('ready')):
+            self.file_counter_label.config(
+                text=f"Файлов: {count}  (Word готово: {progress.get('ready', 0)}/{len(word_files)})")
+        else:
+            self.file_counter_label.config(text=f"Файлов: {count}")
+        
+        # Пока идёт подготовка, счётчик обновляется сам
+        if pending and not getattr(self, '_preload_refresh_scheduled', False):
+            self._preload_refresh_scheduled = True
+            
+            def refresh():
+                self._preload_refresh_scheduled = False
+                try:
+                    self.update_file_counter()
+                except tk.TclError:
+                    pass  # Окно закрыто
+            
+            self.file_counter_label.after(500, refresh)
     
     def preview_selected_file(self):
         """Предварительный просмотр выбранного файла"""
@@ -4862,17 +5603,8 @@ class MergeTabTask:
         self.log_text.config(state=tk.DISABLED)
     
     def log(self, message):
-        """Добавить сообщение в лог"""
-        def _log():
-            self.log_text.config(state=tk.NORMAL)
-            self.log_text.insert(tk.END, message + "\n")
-            self.log_text.see(tk.END)
-            self.log_text.config(state=tk.DISABLED)
-        
-        try:
-            self.window.window.after(0, _log)
-        except:
-            _log()
+        """Добавить сообщение в лог (потокобезопасно, вывод пакетами по таймеру)"""
+        self.log_sink.write(message)
     
     def open_document_editor(self):
         """Открыть редактор для формирования документа"""
@@ -4928,9 +5660,7 @@ class MergeTabTask:
             messagebox.showwarning("Предупреждение", "Добавьте минимум 2 файла для объединения!", parent=self.window.window)
             return
         
-        self.log_text.config(state=tk.NORMAL)
-        self.log_text.delete(1.0, tk.END)
-        self.log_text.config(state=tk.DISABLED)
+        self.log_sink.clear()
         
         # Определяем выходной путь
         if doc_type in ["convert", "image", "number_separate", "pdf_to_word"]:
@@ -5048,6 +5778,10 @@ class MergeTabTask:
             
             fit_mode = self.fit_mode.get() if self.fit_mode.get() in ['центр', 'заполнить', 'вписать'] else 'центр'
             
+            # Уровень лога берётся из настроек производительности главного окна
+            log_level_var = getattr(self.window, 'log_level', None)
+            log_level = LOG_LEVELS.get(log_level_var.get(), LOG_INFO) if log_level_var is not None else LOG_INFO
+            
             # === РАСШИРЕННЫЕ ПАРАМЕТРЫ КАЧЕСТВА ===
             try:
                 pdf_dpi = int(self.pdf_dpi.get())
@@ -5511,7 +6245,8 @@ class MergeTabTask:
                     self.file_list, output_path, self.log, use_ocr=use_ocr,
                     numbering_line1=numbering_line1, numbering_line2=numbering_line2, numbering_line3=numbering_line3,
                     numbering_position=numbering_position, numbering_border=numbering_border,
-                    numbering_increment_mode=numbering_increment_mode
+                    numbering_increment_mode=numbering_increment_mode,
+                    log_level=log_level
                 )
                 
                 self.log("═" * 60)
@@ -5538,7 +6273,8 @@ class MergeTabTask:
                         self.file_list, output_path, self.log, use_ocr=use_ocr,
                         numbering_line1=numbering_line1, numbering_line2=numbering_line2, numbering_line3=numbering_line3,
                         numbering_position=numbering_position, numbering_border=numbering_border,
-                        numbering_increment_mode=numbering_increment_mode
+                        numbering_increment_mode=numbering_increment_mode,
+                        log_level=log_level
                     )
                 
                 self.log("═" * 60)
@@ -5772,6 +6508,112 @@ RUSSIAN_CASES = {
     "loct": "Предложный (о ком? о чём?)"
 }
 
+# ── КЭШ СКЛОНЕНИЙ ───────────────────────────────────────────────────
+class DeclensionCache:
+    """Кэш склонений для apply_case.
+    
+    Фразовый уровень - LRU по (значение, падеж) с готовыми результатами apply_case.
+    Пословный уровень - результаты morph.parse и inflect, которые повторяются в разных
+    фразах (звания, должности, подразделения, месяцы). Счётчики попаданий и промахов
+    выводятся в итогах задания. Кэш живёт только в главном процессе: уникальные
+    значения склоняются до отправки задания (decline_unique_values, промахи -
+    пачками в пуле), и процессы пула получают уже готовые значения строк.
+    """
+    def __init__(self, max_phrases=20000, max_words=50000):
+        self.max_phrases = max_phrases
+        self.max_words = max_words
+        self._phrases = OrderedDict()
+        self._parses = OrderedDict()
+        self._inflections = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.word_hits = 0
+        self.word_misses = 0
+    
+    @staticmethod
+    def _lookup(storage, key):
+        """Возвращает (найдено, значение) и поднимает запись в начало LRU"""
+        try:
+            value = storage[key]
+        except KeyError:
+            return False, None
+        storage.move_to_end(key)
+        return True, value
+    
+    @staticmethod
+    def _store(storage, key, value, limit):
+        storage[key] = value
+        storage.move_to_end(key)
+        while len(storage) > limit:
+            storage.popitem(last=False)
+    
+    def get(self, value, case):
+        """Готовый результат apply_case или None"""
+        with self._lock:
+            found, result = self._lookup(self._phrases, (value, case))
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return result
+    
+    def put(self, value, case, result):
+        with self._lock:
+            self._store(self._phrases, (value, case), result, self.max_phrases)
+    
+    def parse(self, morph, word):
+        """morph.parse(word) с кэшированием"""
+        with self._lock:
+            found, parses = self._lookup(self._parses, word)
+            if found:
+                self.word_hits += 1
+                return parses
+            self.word_misses += 1
+        
+        parses = morph.parse(word)
+        with self._lock:
+            self._store(self._parses, word, parses, self.max_words)
+        return parses
+    
+    def inflect(self, morph, word, case):
+        """Слово в падеже case по первому разбору pymorphy3 (или None)"""
+        key = (word, case)
+        with self._lock:
+            found, inflected = self._lookup(self._inflections, key)
+            if found:
+                self.word_hits += 1
+                return inflected
+            self.word_misses += 1
+        
+        inflected = None
+        parses = self.parse(morph, word)
+        if parses:
+            result = parses[0].inflect({case})
+            if result:
+                inflected = result.word
+        
+        with self._lock:
+            self._store(self._inflections, key, inflected, self.max_words)
+        return inflected
+    
+    def stats(self):
+        """Снимок счётчиков попаданий/промахов"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'word_hits': self.word_hits,
+                'word_misses': self.word_misses,
+                'size': len(self._phrases)
+            }
+
+# Глобальный кэш склонений (свой в каждом процессе)
+declension_cache = DeclensionCache()
+
+# С какого количества новых значений склонение распределяется по пулу процессов
+DECLENSION_POOL_THRESHOLD = 500
+
 # ── ПОЛЬЗОВАТЕЛЬСКИЕ СПИСКИ (ПУСТЫЕ ПО УМОЛЧАНИЮ) ───────────────────
 DEFAULT_CUSTOM_LISTS = {}
 
@@ -5802,6 +6644,10 @@ def create_placeholder_pattern(placeholder):
     
     return prefix + escaped + suffix
 
+def _run_has_objects(r):
+    """Есть ли в run встроенные объекты (картинки, фигуры, надписи)"""
+    return bool(r.xpath('.//w:drawing | .//w:pict'))
+
 def _normalize_paragraph_runs(paragraph):
     """Объединяет смежные runs с одинаковым форматированием.
     
@@ -5817,7 +6663,10 @@ def _normalize_paragraph_runs(paragraph):
         next_run = paragraph.runs[i + 1]
         
         # Проверяем одинаковое ли форматирование
-        if (current.bold == next_run.bold and
+        # (run с картинкой или надписью не склеиваем - run.text удалил бы объект)
+        if (not _run_has_objects(current._element) and
+            not _run_has_objects(next_run._element) and
+            current.bold == next_run.bold and
             current.italic == next_run.italic and
             current.underline == next_run.underline and
             current.font.size == next_run.font.size and
@@ -5833,105 +6682,811 @@ def _normalize_paragraph_runs(paragraph):
         else:
             i += 1
 
+class PlaceholderMatcher:
+    """Однопроходная замена набора плейсхолдеров.
+    
+    Все ключи объединяются в одно регулярное выражение (альтернация, длинные ключи
+    первыми), которое компилируется один раз и переиспользуется для всех строк задания.
+    Текст просматривается один раз, независимо от количества плейсхолдеров.
+    """
+    def __init__(self, keys):
+        self.keys = tuple(dict.fromkeys(keys))
+        ordered = sorted(self.keys, key=len, reverse=True)
+        self.pattern = re.compile('|'.join(re.escape(key) for key in ordered)) if ordered else None
+    
+    def search(self, text):
+        """Есть ли в тексте хотя бы один плейсхолдер"""
+        return bool(self.pattern and text and self.pattern.search(text))
+    
+    def sub(self, text, values):
+        """Заменяет все плейсхолдеры за один проход. values - {ключ: строка}"""
+        if not self.pattern or not text:
+            return text
+        return self.pattern.sub(lambda match: values[match.group(0)], text)
+
+_placeholder_matchers = {}
+_placeholder_matchers_lock = threading.Lock()
+
+def _get_placeholder_matcher(keys):
+    """Возвращает закэшированный PlaceholderMatcher для набора ключей"""
+    keys = tuple(keys)
+    matcher = _placeholder_matchers.get(keys)
+    if matcher is None:
+        matcher = PlaceholderMatcher(keys)
+        with _placeholder_matchers_lock:
+            if len(_placeholder_matchers) >= 32:
+                _placeholder_matchers.clear()
+            _placeholder_matchers[keys] = matcher
+    return matcher
+
 def _replace_placeholders_in_paragraph(paragraph, replacements):
     """Вспомогательная функция замены плейсхолдеров (для использования в процессах)
     
     Сначала нормализует параграф (объединяет runs с одинаковым форматированием),
     затем делает замену. Это решает проблему разбитых плейсхолдеров И сохраняет форматирование.
     """
-    from docx.oxml.ns import qn
-    import re
+    matcher = _get_placeholder_matcher(tuple(replacements))
     
     # Проверяем есть ли хоть один плейсхолдер в полном тексте
-    full_text = paragraph.text
-    if not any(ph in full_text for ph in replacements):
+    if not matcher.search(paragraph.text):
         return
     
     # Нормализуем runs (объединяем смежные с одинаковым форматированием)
     _normalize_paragraph_runs(paragraph)
     
-    # Теперь делаем замену в каждом run
+    values = {key: str(value) for key, value in replacements.items()}
+    _replace_placeholders_in_runs(paragraph, values, matcher)
+
+def _replace_placeholders_in_runs(paragraph, values, matcher):
+    """Замена плейсхолдеров в runs уже нормализованного параграфа.
+    
+    values - значения, уже приведённые к строкам; matcher - PlaceholderMatcher по их ключам.
+    """
+    from docx.oxml.ns import qn
+    
+    # Делаем замену в каждом run
     for run in paragraph.runs:
         # Проверяем есть ли в run встроенные объекты (картинки, фигуры)
-        has_objects = False
-        if hasattr(run._element, 'xpath'):
-            drawings = run._element.xpath('.//w:drawing')
-            pictures = run._element.xpath('.//w:pict')
-            has_objects = len(drawings) > 0 or len(pictures) > 0
-        
-        if has_objects:
+        if _run_has_objects(run._element):
             # Если есть объекты, работаем на уровне XML элементов текста
             for text_elem in run._element.findall(qn('w:t')):
                 if text_elem.text:
-                    modified_text = text_elem.text
-                    for placeholder, replacement in replacements.items():
-                        pattern = re.escape(placeholder)
-                        modified_text = re.sub(pattern, str(replacement), modified_text)
-                    text_elem.text = modified_text
+                    text_elem.text = matcher.sub(text_elem.text, values)
         else:
             # Обычная замена для run без объектов
-            text = run.text
-            for placeholder, replacement in replacements.items():
-                pattern = re.escape(placeholder)
-                text = re.sub(pattern, str(replacement), text)
-            run.text = text
+            run.text = matcher.sub(run.text, values)
 
-def _convert_single_image(args):
+def _placeholder_keys(placeholders):
+    """Ключи замены активных плейсхолдеров (гарантированно в фигурных скобках)"""
+    keys = []
+    for ph in placeholders:
+        if not ph.get("active", True):
+            continue
+        key = ph["name"]
+        if not key.startswith('{'):
+            key = f"{{{key}}}"
+        keys.append(key)
+    return tuple(dict.fromkeys(keys))
+
+def _element_path(root, element):
+    """Возвращает путь (индексы дочерних элементов) от root до element"""
+    path = []
+    while element is not root:
+        parent = element.getparent()
+        path.append(parent.index(element))
+        element = parent
+    path.reverse()
+    return tuple(path)
+
+def _element_at_path(root, path):
+    """Находит элемент по пути, полученному из _element_path"""
+    element = root
+    for index in path:
+        element = element[index]
+    return element
+
+class WordStory:
+    """Часть .docx с текстом (тело, колонтитул, сноски), в которой есть плейсхолдеры"""
+    def __init__(self, part, root, paragraph_paths):
+        self.part = part
+        self.partname = part.partname.lstrip('/')
+        self.paragraph_paths = paragraph_paths
+        # Эталонная копия XML, из которой клонируется каждый документ
+        self.pristine = copy.deepcopy(root)
+        # XmlPart хранит дерево элементов, остальные части - байты (_blob)
+        self.is_xml_part = hasattr(part, '_element')
+
+class CompiledWordTemplate:
+    """Word шаблон, разобранный один раз на всё задание.
+    
+    При компиляции шаблон открывается через python-docx и за один обход всех
+    текстовых частей (тело, колонтитулы, сноски) находятся параграфы с
+    плейсхолдерами - включая вложенные таблицы и надписи (w:txbxContent). Такие
+    параграфы нормализуются (склеиваются runs) и запоминаются их пути в XML.
+    Для каждой строки клонируется только XML частей с плейсхолдерами, а замена
+    выполняется по сохранённым путям - без повторной распаковки и разбора .docx.
     """
-    Конвертация одного изображения в PDF (функция для параллельного выполнения).
+    # Типы частей, в которых ищутся плейсхолдеры
+    STORY_CONTENT_TYPES = (
+        'application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml',
+        'application/vnd.ms-word.document.macroEnabled.main+xml',
+        'application/vnd.ms-word.template.macroEnabledTemplate.main+xml',
+        'application/vnd.openxmlformats-officedocument.wordprocessingml.template.main+xml',
+        'application/vnd.openxmlformats-officedocument.wordprocessingml.header+xml',
+        'application/vnd.openxmlformats-officedocument.wordprocessingml.footer+xml',
+        'application/vnd.openxmlformats-officedocument.wordprocessingml.footnotes+xml',
+        'application/vnd.openxmlformats-officedocument.wordprocessingml.endnotes+xml',
+    )
     
-    Args:
-        args: кортеж (image_file, output_folder, use_ocr, max_image_size, fit_mode, 
-                     numbering_line1, numbering_line2, numbering_line3, numbering_position, numbering_border)
+    def __init__(self, template_path, placeholder_keys):
+        from docx import Document
+        
+        self.template_path = template_path
+        self.placeholder_keys = tuple(placeholder_keys)
+        self.matcher = _get_placeholder_matcher(self.placeholder_keys)
+        self.document = Document(template_path)
+        self._lock = threading.Lock()
+        
+        self.stories = []
+        for part in self.document.part.package.iter_parts():
+            if part.content_type not in self.STORY_CONTENT_TYPES:
+                continue
+            story = self._compile_part(part)
+            if story is not None:
+                self.stories.append(story)
+        
+        self._zip_template = None
+        self._zip_checked = False
     
-    Returns:
-        dict: {
-            'success': bool,
-            'pdf_file': str or None,
-            'image_file': str,
-            'error': str or None
-        }
-    """
-    image_file, output_folder, use_ocr, max_image_size, fit_mode, numbering_line1, numbering_line2, numbering_line3, numbering_position, numbering_border = args
+    @property
+    def paragraph_count(self):
+        """Количество параграфов с плейсхолдерами во всех частях"""
+        return sum(len(story.paragraph_paths) for story in self.stories)
     
-    try:
-        if not os.path.exists(image_file):
-            raise FileNotFoundError(f"Файл не найден: {image_file}")
+    def _compile_part(self, part):
+        """Индексирует параграфы части с плейсхолдерами (WordStory или None)"""
+        from docx.oxml import parse_xml
+        from docx.oxml.ns import qn
+        from docx.text.paragraph import Paragraph
         
-        image_file = os.path.abspath(image_file)
+        if hasattr(part, '_element'):
+            root = part._element
+        else:
+            root = parse_xml(part.blob)
         
-        base_name = os.path.splitext(os.path.basename(image_file))[0]
+        # Один обход: параграфы тела, таблиц (в т.ч. вложенных), надписей и сносок
+        matched = []
+        for p in list(root.iter(qn('w:p'))):
+            paragraph = Paragraph(p, None)
+            if not self.matcher.search(paragraph.text):
+                continue
+            _normalize_paragraph_runs(paragraph)
+            matched.append(p)
         
-        if output_folder:
-            os.makedirs(output_folder, exist_ok=True)
-            pdf_file = os.path.join(output_folder, base_name + ".pdf")
-        else:
-            pdf_file = os.path.join(os.path.dirname(image_file), base_name + ".pdf")
+        if not matched:
+            return None
         
-        # Конвертация
-        if use_ocr:
-            GenerationDocApp.image_to_pdf_with_ocr(image_file, pdf_file, None, max_image_size, fit_mode,
-                                                   numbering_line1, numbering_line2, numbering_line3,
-                                                   numbering_position, numbering_border)  # log_callback=None для параллельных задач
-        else:
-            GenerationDocApp.image_to_pdf_simple(image_file, pdf_file, None, max_image_size, fit_mode,
-                                                 numbering_line1, numbering_line2, numbering_line3,
-                                                 numbering_position, numbering_border)
+        # Пути считаются после нормализации всех параграфов
+        return WordStory(part, root, [_element_path(root, p) for p in matched])
+    
+    def _fill(self, values):
+        """Клоны XML частей с выполненной заменой: список (WordStory, корень)"""
+        from docx.text.paragraph import Paragraph
         
-        if os.path.exists(pdf_file):
-            return {
-                'success': True,
-                'pdf_file': pdf_file,
-                'image_file': image_file,
-                'error': None
-            }
-        else:
-            return {
-                'success': False,
-                'pdf_file': None,
-                'image_file': image_file,
-                'error': 'PDF файл не был создан'
-            }
+        filled = []
+        for story in self.stories:
+            root = copy.deepcopy(story.pristine)
+            elements = [_element_at_path(root, path) for path in story.paragraph_paths]
+            for p in elements:
+                _replace_placeholders_in_runs(Paragraph(p, None), values, self.matcher)
+            filled.append((story, root))
+        return filled
+    
+    def render(self, replacements, filepath):
+        """Заполняет клон шаблона значениями и сохраняет его в filepath"""
+        values = {key: str(value) for key, value in replacements.items()}
+        
+        from docx.opc.oxml import serialize_part_xml
+        
+        with self._lock:
+            for story, root in self._fill(values):
+                if story.is_xml_part:
+                    story.part._element = root
+                else:
+                    story.part._blob = serialize_part_xml(root)
+            self.document.save(filepath)
+    
+    def zip_template(self):
+        """ZipWordTemplate для прямой записи .docx или None, если шаблон не поддерживается"""
+        with self._lock:
+            if not self._zip_checked:
+                self._zip_checked = True
+                try:
+                    self._zip_template = ZipWordTemplate(self)
+                except ZipTemplateUnsupported:
+                    self._zip_template = None
+            return self._zip_template
+
+class ZipTemplateUnsupported(Exception):
+    """Шаблон нельзя заполнять прямой записью XML - используется python-docx или openpyxl"""
+    pass
+
+class ZipWordTemplate:
+    """Заполнение .docx без объектной модели python-docx.
+    
+    Шаблон один раз заполняется служебными метками вместо плейсхолдеров тем же
+    кодом, что и при обычной замене, и сериализуется так же, как это делает
+    python-docx. Полученный XML режется на неизменные байтовые отрезки и
+    элементы w:t с метками. Для каждой строки собирается только XML изменённых
+    частей, остальные части архива записываются уже сжатыми байтами.
+    
+    Результат совпадает с python-docx (содержимое частей побайтно). Строки, значения
+    которых содержат табуляцию, переводы строк или управляющие символы, render()
+    не обрабатывает - для них используется обычный путь.
+    """
+    _MARK_OPEN = '\ue000'
+    _MARK_CLOSE = '\ue001'
+    _MARK_BASE = 0xE100
+    _T_PLAIN = b'<w:t>'
+    _T_PRESERVE = b'<w:t xml:space="preserve">'
+    _T_CLOSE = b'</w:t>'
+    _R_CLOSE = b'</w:r>'
+    
+    # Значения, которые python-docx превращает не в текст w:t
+    _UNSUPPORTED_VALUE = re.compile('[\x00-\x08\x0b-\x1f\ue000-\ue0ff\ufffe\uffff]|\t|\n|\r')
+    
+    def __init__(self, compiled):
+        import struct
+        import zipfile
+        from lxml import etree
+        from docx.oxml.ns import qn
+        
+        keys = compiled.placeholder_keys
+        if len(keys) > 0xFF:
+            raise ZipTemplateUnsupported("слишком много плейсхолдеров")
+        
+        self.keys = keys
+        marks = {key: self._MARK_OPEN + chr(self._MARK_BASE + index) + self._MARK_CLOSE
+                 for index, key in enumerate(keys)}
+        self._mark_pattern = re.compile(self._MARK_OPEN + '(.)' + self._MARK_CLOSE)
+        
+        for story in compiled.stories:
+            pristine_xml = etree.tostring(story.pristine, encoding='UTF-8', standalone=True)
+            if self._MARK_OPEN.encode('utf-8') in pristine_xml:
+                raise ZipTemplateUnsupported("шаблон содержит служебные символы")
+        
+        # Части, XML которых зависит от строки: {имя в архиве: сегменты}
+        self.parts = {}
+        for story, marked_root in compiled._fill(marks):
+            self.parts[story.partname] = self._split_part(marked_root, qn)
+        
+        # Эталонный архив: порядок частей и уже сжатые неизменные части
+        buffer = io.BytesIO()
+        compiled.document.save(buffer)
+        data = buffer.getvalue()
+        
+        self.members = []
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            for info in archive.infolist():
+                if info.filename in self.parts:
+                    self.members.append((info.filename, None, info.external_attr))
+                    continue
+                if info.compress_type != zipfile.ZIP_DEFLATED or info.flag_bits & 0x08:
+                    raise ZipTemplateUnsupported("неподдерживаемый формат архива")
+                name_length, extra_length = struct.unpack('<HH', data[info.header_offset + 26:info.header_offset + 30])
+                start = info.header_offset + 30 + name_length + extra_length
+                raw = data[start:start + info.compress_size]
+                self.members.append((info.filename, (raw, info.CRC, info.file_size), info.external_attr))
+    
+    def _split_part(self, root, qn):
+        """Сериализует часть с метками и делит её на байтовые отрезки и элементы w:t"""
+        from lxml import etree
+        
+        mark_open = self._MARK_OPEN
+        
+        # Элементы w:t с метками в порядке документа и режим их заполнения
+        texts = []
+        for t in root.iter(qn('w:t')):
+            if t.text and mark_open in t.text:
+                run = t.getparent()
+                keeps_tag = _run_has_objects(run)
+                # Единственный w:t в run: при пустом тексте run сериализуется как <w:r/>
+                sole = not keeps_tag and len(run) == 1
+                texts.append((self._split_text(t.text), keeps_tag, sole))
+        
+        xml = etree.tostring(root, encoding='UTF-8', standalone=True)
+        
+        segments = []
+        position = 0
+        mark_bytes = mark_open.encode('utf-8')
+        for pieces, keeps_tag, sole in texts:
+            mark_at = xml.find(mark_bytes, position)
+            start = max(xml.rfind(b'<w:t>', position, mark_at), xml.rfind(b'<w:t ', position, mark_at))
+            tag_end = xml.find(b'>', start) + 1
+            end = xml.find(self._T_CLOSE, mark_at)
+            if mark_at < 0 or start < 0 or end < 0 or tag_end > mark_at:
+                raise ZipTemplateUnsupported("метка вне текста")
+            
+            tag = xml[start:tag_end]
+            if not keeps_tag and tag not in (self._T_PLAIN, self._T_PRESERVE):
+                raise ZipTemplateUnsupported("неожиданный элемент w:t")
+            
+            end += len(self._T_CLOSE)
+            run_open = None
+            if sole:
+                run_start = xml.rfind(b'<w:r', position, start)
+                run_open = xml[run_start:start]
+                if (run_start < 0 or not run_open.endswith(b'>') or b'<' in run_open[1:]
+                        or xml[end:end + len(self._R_CLOSE)] != self._R_CLOSE):
+                    raise ZipTemplateUnsupported("неожиданная структура run")
+                start = run_start
+                end += len(self._R_CLOSE)
+            
+            segments.append(xml[position:start])
+            # (открывающий тег или None для пересоздаваемого w:t, части текста,
+            #  открывающий тег run, если w:t - его единственный элемент)
+            segments.append((tag if keeps_tag else None, pieces, run_open))
+            position = end
+        
+        if xml.find(mark_bytes, position) >= 0:
+            raise ZipTemplateUnsupported("метка вне текста")
+        segments.append(xml[position:])
+        return segments
+    
+    def _split_text(self, text):
+        """Текст с метками -> список строк и ключей плейсхолдеров (в виде индексов)"""
+        pieces = []
+        position = 0
+        for match in self._mark_pattern.finditer(text):
+            if match.start() > position:
+                pieces.append(text[position:match.start()])
+            pieces.append(ord(match.group(1)) - self._MARK_BASE)
+            position = match.end()
+        if position < len(text):
+            pieces.append(text[position:])
+        return pieces
+    
+    @staticmethod
+    def _escape(text):
+        return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').encode('utf-8')
+    
+    def _build_part(self, segments, values):
+        out = []
+        for segment in segments:
+            if isinstance(segment, bytes):
+                out.append(segment)
+                continue
+            
+            tag, pieces, run_open = segment
+            text = ''.join(piece if isinstance(piece, str) else values[piece] for piece in pieces)
+            if tag is None:
+                # Как run.text в python-docx: пустой текст не создаёт w:t,
+                # пробелы по краям требуют xml:space="preserve"
+                if not text:
+                    if run_open is not None:
+                        out.append(run_open[:-1] + b'/>')
+                    continue
+                tag = self._T_PRESERVE if len(text.strip()) < len(text) else self._T_PLAIN
+            if run_open is not None:
+                out.append(run_open)
+            out.append(tag)
+            out.append(self._escape(text))
+            out.append(self._T_CLOSE)
+            if run_open is not None:
+                out.append(self._R_CLOSE)
+        return b''.join(out)
+    
+    def render(self, replacements, filepath):
+        """Собирает .docx напрямую. Возвращает False, если значения требуют python-docx"""
+        values = []
+        for key in self.keys:
+            value = str(replacements.get(key, ''))
+            if self._UNSUPPORTED_VALUE.search(value):
+                return False
+            values.append(value)
+        
+        entries = []
+        for name, stored, external_attr in self.members:
+            if stored is None:
+                stored = _deflate_zip_member(self._build_part(self.parts[name], values))
+            entries.append((name, stored, external_attr))
+        _write_deflated_zip(filepath, entries)
+        return True
+
+def _deflate_zip_member(content):
+    """Сжимает содержимое части архива: (сжатые байты, CRC, исходный размер)"""
+    import zlib
+    
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    raw = compressor.compress(content) + compressor.flush()
+    return raw, zlib.crc32(content), len(content)
+
+def _write_deflated_zip(filepath, entries):
+    """Записывает zip архив из уже сжатых частей.
+    
+    entries - список (имя, (сжатые байты, CRC, исходный размер), external_attr)
+    в порядке записи в архив.
+    """
+    import struct
+    
+    now = time.localtime()
+    dos_time = (now.tm_hour << 11) | (now.tm_min << 5) | (now.tm_sec // 2)
+    dos_date = ((now.tm_year - 1980) << 9) | (now.tm_mon << 5) | now.tm_mday
+    
+    central = []
+    offset = 0
+    with open(filepath, 'wb') as f:
+        for name, (raw, crc, size), external_attr in entries:
+            name_bytes = name.encode('utf-8')
+            flags = 0x800 if not name.isascii() else 0
+            f.write(struct.pack('<IHHHHHIIIHH', 0x04034B50, 20, flags, 8, dos_time, dos_date,
+                                crc, len(raw), size, len(name_bytes), 0))
+            f.write(name_bytes)
+            f.write(raw)
+            
+            central.append(struct.pack('<IHHHHHHIIIHHHHHII', 0x02014B50, 20, 20, flags, 8, dos_time,
+                                       dos_date, crc, len(raw), size, len(name_bytes), 0, 0, 0, 0,
+                                       external_attr, offset) + name_bytes)
+            offset += 30 + len(name_bytes) + len(raw)
+        
+        central_data = b''.join(central)
+        f.write(central_data)
+        f.write(struct.pack('<IHHHHIIH', 0x06054B50, 0, 0, len(central), len(central),
+                            len(central_data), offset, 0))
+
+class CompiledExcelTemplate:
+    """Excel шаблон, разобранный один раз на всё задание.
+    
+    Байты шаблона читаются с диска один раз, и один раз строится индекс ячеек с
+    плейсхолдерами: (номер листа, координата, исходный текст, найденные ключи).
+    Обычно строки записываются через ZipExcelTemplate (см. zip_template) без
+    разбора книги. Если шаблон или значения этого не позволяют, render()
+    загружает книгу заново из байтов в памяти - общую книгу пересохранять
+    нельзя: openpyxl при сохранении закрывает потоки изображений, и следующая
+    строка падала бы. Ячейки берутся по индексу, без обхода листов.
+    """
+    def __init__(self, template_path, placeholder_keys):
+        from openpyxl import load_workbook
+        
+        self.template_path = template_path
+        self.placeholder_keys = tuple(placeholder_keys)
+        self.matcher = _get_placeholder_matcher(self.placeholder_keys)
+        with open(template_path, 'rb') as f:
+            self.template_bytes = f.read()
+        self._lock = threading.Lock()
+        
+        # Порядок ячеек совпадает с обходом листов и iter_rows
+        self.cells = []
+        workbook = load_workbook(io.BytesIO(self.template_bytes))
+        try:
+            for sheet_index, sheet in enumerate(workbook.worksheets):
+                for row in sheet.iter_rows():
+                    for cell in row:
+                        if isinstance(cell.value, str) and self.matcher.search(cell.value):
+                            tokens = [key for key in self.placeholder_keys if key in cell.value]
+                            self.cells.append((sheet_index, cell.coordinate, cell.value, tokens))
+        finally:
+            workbook.close()
+        
+        self._zip_template = None
+        self._zip_checked = False
+    
+    def render(self, replacements, filepath):
+        """Заполняет ячейки с плейсхолдерами значениями и сохраняет книгу в filepath"""
+        from openpyxl import load_workbook
+        
+        values = {key: str(value) for key, value in replacements.items()}
+        
+        workbook = load_workbook(io.BytesIO(self.template_bytes))
+        try:
+            sheets = workbook.worksheets
+            for sheet_index, coordinate, text, tokens in self.cells:
+                sheets[sheet_index][coordinate].value = self.matcher.sub(text, values)
+            workbook.save(filepath)
+        finally:
+            workbook.close()
+    
+    def zip_template(self):
+        """ZipExcelTemplate для прямой записи .xlsx или None, если шаблон не поддерживается"""
+        with self._lock:
+            if not self._zip_checked:
+                self._zip_checked = True
+                try:
+                    self._zip_template = ZipExcelTemplate(self)
+                except Exception:
+                    # ZipTemplateUnsupported или нестандартная структура книги -
+                    # остаётся путь через openpyxl
+                    self._zip_template = None
+            return self._zip_template
+
+class ZipExcelTemplate:
+    """Заполнение .xlsx без openpyxl.
+    
+    Листы с плейсхолдерами один раз разбираются и сериализуются с метками на
+    месте найденных ячеек, XML режется на неизменные байтовые отрезки и
+    открывающие теги этих ячеек. Для каждой строки собирается только XML
+    таких листов: ячейка получает встроенную строку (t="inlineStr") с
+    результатом замены. Остальные части архива (включая sharedStrings,
+    изображения и стили) записываются уже сжатыми байтами.
+    
+    Набор найденных ячеек и их текст сверяются с индексом openpyxl; при
+    расхождении (например, плейсхолдер в формуле) шаблон не поддерживается.
+    Значения, которые openpyxl записал бы иначе (формулы, управляющие символы),
+    render() не обрабатывает - для них используется обычный путь.
+    """
+    _MARK_OPEN = '\ue000'
+    _MARK_CLOSE = '\ue001'
+    _NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+    _REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+    _DOC_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+    _T_OPEN = b' t="inlineStr"><is><t xml:space="preserve">'
+    _T_CLOSE = b'</t></is></c>'
+    
+    # Значения, которые openpyxl не записывает как обычную строку
+    _UNSUPPORTED_VALUE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\r\ue000-\ue0ff\ufffe\uffff]')
+    
+    def __init__(self, compiled):
+        import posixpath
+        import zipfile
+        from lxml import etree
+        
+        self.matcher = compiled.matcher
+        expected = {(sheet_index, coordinate): text for sheet_index, coordinate, text, tokens in compiled.cells}
+        
+        with zipfile.ZipFile(io.BytesIO(compiled.template_bytes)) as archive:
+            names = set(archive.namelist())
+            
+            def relationships(part):
+                folder, base = posixpath.split(part)
+                rels_name = posixpath.join(folder, '_rels', base + '.rels')
+                if rels_name not in names:
+                    return {}
+                result = {}
+                for rel in etree.fromstring(archive.read(rels_name)).iter(f'{{{self._REL_NS}}}Relationship'):
+                    target = rel.get('Target', '')
+                    if rel.get('TargetMode') == 'External':
+                        continue
+                    target = target[1:] if target.startswith('/') else posixpath.normpath(posixpath.join(folder, target))
+                    result[rel.get('Id')] = (rel.get('Type', '').rsplit('/', 1)[-1], target)
+                return result
+            
+            workbook_part = next((target for kind, target in relationships('').values()
+                                  if kind == 'officeDocument'), None)
+            if workbook_part not in names:
+                raise ZipTemplateUnsupported("не найдена книга")
+            workbook_rels = relationships(workbook_part)
+            
+            shared_strings = []
+            for kind, target in workbook_rels.values():
+                if kind == 'sharedStrings' and target in names:
+                    for item in etree.fromstring(archive.read(target)).iter(f'{{{self._NS}}}si'):
+                        shared_strings.append(self._item_text(item))
+            
+            # Листы в порядке workbook.worksheets (диаграммы-листы не считаются)
+            sheet_parts = []
+            workbook_root = etree.fromstring(archive.read(workbook_part))
+            for sheet in workbook_root.iter(f'{{{self._NS}}}sheet'):
+                kind, target = workbook_rels.get(sheet.get(f'{{{self._DOC_REL_NS}}}id'), (None, None))
+                if kind == 'worksheet':
+                    sheet_parts.append(target)
+            
+            self.parts = {}
+            found = {}
+            for sheet_index, part in enumerate(sheet_parts):
+                if not any(key[0] == sheet_index for key in expected):
+                    continue
+                root = etree.fromstring(archive.read(part))
+                texts = []
+                for cell in root.iter(f'{{{self._NS}}}c'):
+                    text = self._cell_text(cell, shared_strings)
+                    if text is None or not self.matcher.search(text):
+                        continue
+                    coordinate = cell.get('r')
+                    if coordinate is None or cell.find(f'{{{self._NS}}}f') is not None:
+                        raise ZipTemplateUnsupported("ячейка без адреса или с формулой")
+                    found[(sheet_index, coordinate)] = text
+                    texts.append(text)
+                    for child in list(cell):
+                        cell.remove(child)
+                    cell.attrib.pop('t', None)
+                    cell.text = self._MARK_OPEN + self._MARK_CLOSE
+                self.parts[part] = self._split_part(root, texts)
+            
+            if found != expected:
+                raise ZipTemplateUnsupported("ячейки не совпадают с индексом openpyxl")
+            
+            # Неизменные части сжимаются один раз
+            self.members = []
+            for info in archive.infolist():
+                if info.filename in self.parts:
+                    self.members.append((info.filename, None, info.external_attr))
+                else:
+                    self.members.append((info.filename, _deflate_zip_member(archive.read(info)), info.external_attr))
+    
+    def _item_text(self, item):
+        """Текст строки (si или is) без фонетических подсказок, как его видит openpyxl"""
+        t, r = f'{{{self._NS}}}t', f'{{{self._NS}}}r'
+        parts = []
+        for child in item:
+            if child.tag == t:
+                parts.append(child.text or '')
+            elif child.tag == r:
+                parts.extend(node.text or '' for node in child.iter(t))
+        return ''.join(parts)
+    
+    def _cell_text(self, cell, shared_strings):
+        """Строковое значение ячейки или None"""
+        kind = cell.get('t')
+        if kind == 's':
+            value = cell.find(f'{{{self._NS}}}v')
+            try:
+                return shared_strings[int(value.text)]
+            except (AttributeError, TypeError, ValueError, IndexError):
+                return None
+        if kind == 'inlineStr':
+            item = cell.find(f'{{{self._NS}}}is')
+            return self._item_text(item) if item is not None else None
+        if kind == 'str':
+            value = cell.find(f'{{{self._NS}}}v')
+            return value.text if value is not None else None
+        return None
+    
+    def _split_part(self, root, texts):
+        """Сериализует лист с метками и делит его на байтовые отрезки и ячейки"""
+        from lxml import etree
+        
+        xml = etree.tostring(root, encoding='UTF-8', standalone=True)
+        mark = (self._MARK_OPEN + self._MARK_CLOSE).encode('utf-8')
+        close = b'</c>'
+        
+        segments = []
+        position = 0
+        for text in texts:
+            mark_at = xml.find(mark, position)
+            start = xml.rfind(b'<c ', position, mark_at)
+            if mark_at < 0 or start < 0 or xml[mark_at + len(mark):mark_at + len(mark) + len(close)] != close:
+                raise ZipTemplateUnsupported("неожиданная структура ячейки")
+            cell_open = xml[start:mark_at]
+            if b'<' in cell_open[1:] or not cell_open.endswith(b'>'):
+                raise ZipTemplateUnsupported("неожиданная структура ячейки")
+            
+            segments.append(xml[position:start])
+            # (открывающий тег ячейки без '>', исходный текст)
+            segments.append((cell_open[:-1], text))
+            position = mark_at + len(mark) + len(close)
+        
+        if xml.find(mark, position) >= 0:
+            raise ZipTemplateUnsupported("лишняя метка")
+        segments.append(xml[position:])
+        return segments
+    
+    def _build_part(self, segments, values):
+        """XML листа для строки или None, если значение требует openpyxl"""
+        out = []
+        for segment in segments:
+            if isinstance(segment, bytes):
+                out.append(segment)
+                continue
+            
+            cell_open, text = segment
+            value = self.matcher.sub(text, values)
+            # openpyxl превращает строки с '=' в формулы
+            if value.startswith('=') or self._UNSUPPORTED_VALUE.search(value):
+                return None
+            if not value:
+                # Как openpyxl: пустая строка записывается ячейкой без значения
+                out.append(cell_open + b'/>')
+                continue
+            out.append(cell_open)
+            out.append(self._T_OPEN)
+            out.append(ZipWordTemplate._escape(value))
+            out.append(self._T_CLOSE)
+        return b''.join(out)
+    
+    def render(self, replacements, filepath):
+        """Собирает .xlsx напрямую. Возвращает False, если значения требуют openpyxl"""
+        values = {key: str(value) for key, value in replacements.items()}
+        
+        entries = []
+        for name, stored, external_attr in self.members:
+            if stored is None:
+                content = self._build_part(self.parts[name], values)
+                if content is None:
+                    return False
+                stored = _deflate_zip_member(content)
+            entries.append((name, stored, external_attr))
+        _write_deflated_zip(filepath, entries)
+        return True
+
+# Кэш скомпилированных шаблонов (свой в каждом процессе)
+_compiled_templates = {}
+_compiled_templates_lock = threading.Lock()
+_COMPILED_TEMPLATES_LIMIT = 4
+
+def _get_compiled_template(template_class, template_path, placeholder_keys):
+    """Возвращает скомпилированный шаблон, компилируя его при первом обращении.
+    
+    Ключ кэша учитывает время изменения файла, поэтому отредактированный шаблон
+    будет разобран заново.
+    """
+    stat = os.stat(template_path)
+    key = (template_class.__name__, os.path.abspath(template_path), stat.st_mtime, stat.st_size,
+           tuple(placeholder_keys))
+    
+    with _compiled_templates_lock:
+        compiled = _compiled_templates.get(key)
+        if compiled is None:
+            compiled = template_class(template_path, placeholder_keys)
+            if len(_compiled_templates) >= _COMPILED_TEMPLATES_LIMIT:
+                _compiled_templates.pop(next(iter(_compiled_templates)))
+            _compiled_templates[key] = compiled
+    
+    return compiled
+
+def _get_compiled_word_template(template_path, placeholder_keys):
+    """Скомпилированный Word шаблон (см. _get_compiled_template)"""
+    return _get_compiled_template(CompiledWordTemplate, template_path, placeholder_keys)
+
+def _get_compiled_excel_template(template_path, placeholder_keys):
+    """Скомпилированный Excel шаблон (см. _get_compiled_template)"""
+    return _get_compiled_template(CompiledExcelTemplate, template_path, placeholder_keys)
+
+def _convert_single_image(args):
+    """
+    Конвертация одного изображения в PDF (функция для параллельного выполнения).
+    
+    Args:
+        args: кортеж (image_file, output_folder, use_ocr, max_image_size, fit_mode, 
+                     numbering_line1, numbering_line2, numbering_line3, numbering_position, numbering_border)
+    
+    Returns:
+        dict: {
+            'success': bool,
+            'pdf_file': str or None,
+            'image_file': str,
+            'error': str or None
+        }
+    """
+    image_file, output_folder, use_ocr, max_image_size, fit_mode, numbering_line1, numbering_line2, numbering_line3, numbering_position, numbering_border = args
+    
+    try:
+        if not os.path.exists(image_file):
+            raise FileNotFoundError(f"Файл не найден: {image_file}")
+        
+        image_file = os.path.abspath(image_file)
+        
+        base_name = os.path.splitext(os.path.basename(image_file))[0]
+        
+        if output_folder:
+            os.makedirs(output_folder, exist_ok=True)
+            pdf_file = os.path.join(output_folder, base_name + ".pdf")
+        else:
+            pdf_file = os.path.join(os.path.dirname(image_file), base_name + ".pdf")
+        
+        # Конвертация
+        if use_ocr:
+            GenerationDocApp.image_to_pdf_with_ocr(image_file, pdf_file, None, max_image_size, fit_mode,
+                                                   numbering_line1, numbering_line2, numbering_line3,
+                                                   numbering_position, numbering_border)  # log_callback=None для параллельных задач
+        else:
+            GenerationDocApp.image_to_pdf_simple(image_file, pdf_file, None, max_image_size, fit_mode,
+                                                 numbering_line1, numbering_line2, numbering_line3,
+                                                 numbering_position, numbering_border)
+        
+        if os.path.exists(pdf_file):
+            return {
+                'success': True,
+                'pdf_file': pdf_file,
+                'image_file': image_file,
+                'error': None
+            }
+        else:
+            return {
+                'success': False,
+                'pdf_file': None,
+                'image_file': image_file,
+                'error': 'PDF файл не был создан'
+            }
     
     except Exception as e:
         return {
@@ -5983,75 +7538,12 @@ def _convert_single_pdf(args):
         
         success = False
         last_error = None
-        word = None
-        doc = None
         
         if WIN32COM_AVAILABLE:
             try:
-                import win32com.client
-                import pythoncom
-                
-                pythoncom.CoInitialize()
-                try:
-                    # Используем DispatchEx для изолированного экземпляра Word
-                    word = win32com.client.DispatchEx("Word.Application")
-                    
-                    # КРИТИЧНО: Устанавливаем настройки ДО открытия документа
-                    word.DisplayAlerts = 0  # Отключаем ВСЕ диалоги и предупреждения
-                    try:
-                        word.Visible = False
-                    except:
-                        pass  # Игнорируем ошибку установки Visible
-                    
-                    # Открываем документ с параметрами безопасности
-                    doc = word.Documents.Open(docx_file, ReadOnly=True, AddToRecentFiles=False,
-                                             ConfirmConversions=False)
-                    
-                    # Сохраняем в PDF
-                    doc.SaveAs(pdf_file, FileFormat=17)  # 17 = wdFormatPDF
-                    
-                    success = True
-                    
-                except Exception as e:
-                    last_error = f"win32com: {str(e)}"
-                    
-                finally:
-                    # КРИТИЧНО: Правильный порядок закрытия для разблокировки файлов
-                    try:
-                        if doc:
-                            doc.Close(SaveChanges=False)
-                            del doc
-                    except:
-                        pass
-                    
-                    try:
-                        if word:
-                            # Закрываем все оставшиеся документы
-                            try:
-                                while word.Documents.Count > 0:
-                                    word.Documents(1).Close(SaveChanges=False)
-                            except:
-                                pass
-                            
-                            word.DisplayAlerts = 0
-                            word.Quit(SaveChanges=False)
-                            del word
-                    except:
-                        pass
-                    
-                    try:
-                        pythoncom.CoUninitialize()
-                    except:
-                        pass
-                    
-                    # Даем время системе закрыть процесс Word
-                    time.sleep(0.1)
-                    
-                    # Очищаем ссылки и принудительно собираем мусор
-                    doc = None
-                    word = None
-                    gc.collect()
-                    
+                # Экземпляр Word берётся из пула процесса и остаётся открытым для следующих файлов
+                convert_docx_to_pdf_with_word(docx_file, pdf_file)
+                success = True
             except Exception as e:
                 last_error = f"win32com: {str(e)}"
         
@@ -6090,7 +7582,476 @@ def _convert_single_pdf(args):
             'error': error_text
         }
 
-def _process_single_document(args):
+# ── КОНВЕРТЕРЫ WORD → PDF ────────────────────────────────────────────
+
+class PdfConverter:
+    """Интерфейс конвертера DOCX → PDF.
+    
+    Экземпляром владеет PdfConverterPool: он вызывает convert() из одного потока
+    для многих документов подряд, поэтому конвертер может держать внешнюю
+    программу открытой. Новый конвертер (в том числе тестовый) добавляется
+    подклассом и записью в PDF_CONVERTERS.
+    """
+    name = ""
+    title = ""
+    
+    @classmethod
+    def is_available(cls):
+        """Можно ли использовать конвертер на этом компьютере"""
+        return False
+    
+    def convert(self, docx_path, pdf_path):
+        """Конвертирует документ; при неудаче выбрасывает исключение"""
+        raise NotImplementedError
+    
+    def close(self):
+        """Освобождает внешние ресурсы"""
+        pass
+
+
+class WordComPdfConverter(PdfConverter):
+    """Microsoft Word через COM: экземпляр Word открыт, пока его держит пул"""
+    name = "word"
+    title = "Microsoft Word"
+    
+    def __init__(self):
+        self.word = None
+    
+    @classmethod
+    def is_available(cls):
+        return WIN32COM_AVAILABLE
+    
+    def _start(self):
+        import win32com.client
+        import pythoncom
+        
+        pythoncom.CoInitialize()
+        # Используем DispatchEx для изолированного экземпляра Word
+        self.word = win32com.client.DispatchEx("Word.Application")
+        self.word.DisplayAlerts = 0
+        try:
+            self.word.Visible = False
+        except:
+            pass
+    
+    def convert(self, docx_path, pdf_path):
+        if self.word is None:
+            self._start()
+        doc = None
+        try:
+            doc = self.word.Documents.Open(os.path.abspath(docx_path), ReadOnly=True,
+                                           AddToRecentFiles=False, ConfirmConversions=False)
+            doc.SaveAs(os.path.abspath(pdf_path), FileFormat=17)  # 17 = wdFormatPDF
+        except Exception:
+            # После сбоя экземпляр Word может быть в неизвестном состоянии - следующий файл начнёт с нового
+            self.close()
+            raise
+        finally:
+            if doc is not None:
+                try:
+                    doc.Close(SaveChanges=False)
+                except:
+                    pass
+    
+    def close(self):
+        if self.word is None:
+            return
+        try:
+            while self.word.Documents.Count > 0:
+                self.word.Documents(1).Close(SaveChanges=False)
+        except:
+            pass
+        try:
+            self.word.Quit(SaveChanges=False)
+        except:
+            pass
+        self.word = None
+        try:
+            import pythoncom
+            pythoncom.CoUninitialize()
+        except:
+            pass
+        gc.collect()
+
+
+class LibreOfficePdfConverter(PdfConverter):
+    """LibreOffice в режиме без интерфейса (для компьютеров без Microsoft Office)"""
+    name = "libreoffice"
+    title = "LibreOffice"
+    
+    def __init__(self):
+        # Отдельный профиль на процесс: иначе параллельные soffice мешают друг другу
+        self.profile_dir = tempfile.mkdtemp(prefix='lo_profile_')
+    
+    @staticmethod
+    def _executable():
+        import shutil
+        return shutil.which("soffice") or shutil.which("libreoffice")
+    
+    @classmethod
+    def is_available(cls):
+        return cls._executable() is not None
+    
+    def convert(self, docx_path, pdf_path):
+        import subprocess
+        import shutil
+        
+        out_dir = tempfile.mkdtemp(prefix='lo_pdf_')
+        try:
+            profile_url = "file:///" + os.path.abspath(self.profile_dir).replace("\\", "/").lstrip("/")
+            completed = subprocess.run(
+                [self._executable(), f"-env:UserInstallation={profile_url}", "--headless",
+                 "--convert-to", "pdf", "--outdir", out_dir, os.path.abspath(docx_path)],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=180)
+            produced = os.path.join(out_dir, os.path.splitext(os.path.basename(docx_path))[0] + ".pdf")
+            if not os.path.exists(produced):
+                message = completed.stderr.decode(errors='replace').strip() or "PDF файл не был создан"
+                raise RuntimeError(f"LibreOffice: {message}")
+            shutil.move(produced, pdf_path)
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+    
+    def close(self):
+        import shutil
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+
+class Docx2PdfConverter(PdfConverter):
+    """Библиотека docx2pdf (использует установленный Word)"""
+    name = "docx2pdf"
+    title = "docx2pdf"
+    
+    @classmethod
+    def is_available(cls):
+        return DOCX2PDF_AVAILABLE
+    
+    def convert(self, docx_path, pdf_path):
+        from docx2pdf import convert
+        convert(os.path.abspath(docx_path), os.path.abspath(pdf_path))
+
+
+# Конвертеры в порядке выбора для режима "auto"
+PDF_CONVERTERS = {
+    "word": WordComPdfConverter,
+    "libreoffice": LibreOfficePdfConverter,
+    "docx2pdf": Docx2PdfConverter,
+}
+
+def resolve_pdf_converter(name="auto"):
+    """
+    Класс конвертера по имени ("auto" - первый доступный).
+    
+    Raises:
+        ImportError: если подходящий конвертер не установлен
+    """
+    if name != "auto":
+        converter_class = PDF_CONVERTERS.get(name)
+        if converter_class is None or not converter_class.is_available():
+            title = converter_class.title if converter_class else name
+            raise ImportError(f"Конвертер PDF недоступен: {title}")
+        return converter_class
+    for converter_class in PDF_CONVERTERS.values():
+        if converter_class.is_available():
+            return converter_class
+    raise ImportError(
+        "Не найден конвертер Word → PDF.\n"
+        "Установите Microsoft Word (pywin32), LibreOffice или docx2pdf."
+    )
+
+# Пул конвертеров: экземпляров на процесс, документов на экземпляр до перезапуска,
+# секунд простоя до закрытия экземпляра
+PDF_POOL_SIZE = 2
+PDF_POOL_MAX_USES = 50
+PDF_POOL_IDLE_TIMEOUT = 120.0
+
+class PdfConverterPool:
+    """Пул "тёплых" конвертеров PDF (экземпляров Word и т.п.).
+    
+    Каждый экземпляр принадлежит своему потоку (COM-объект Word нельзя
+    использовать из другого потока), документы раздаются через общую очередь.
+    Потоки запускаются по мере надобности до size; экземпляр перезапускается
+    после max_uses документов или после ошибки и закрывается после idle_timeout
+    секунд простоя. stats() отдаёт длину очереди и время конвертаций.
+    """
+    def __init__(self, converter_factory, size=PDF_POOL_SIZE, max_uses=PDF_POOL_MAX_USES,
+                 idle_timeout=PDF_POOL_IDLE_TIMEOUT):
+        self.converter_factory = converter_factory
+        self.size = max(1, size)
+        self.max_uses = max_uses
+        self.idle_timeout = idle_timeout
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = 0
+        self._idle = 0
+        self._closed = False
+        self._stats = {'conversions': 0, 'errors': 0, 'started': 0, 'recycled': 0,
+                       'convert_seconds': 0.0, 'max_convert_seconds': 0.0, 'wait_seconds': 0.0}
+    
+    def submit(self, docx_path, pdf_path):
+        """Ставит документ в очередь. Returns: Future с pdf_path"""
+        from concurrent.futures import Future
+        
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Пул конвертеров закрыт")
+            self._queue.put((docx_path, pdf_path, future, time.time()))
+            # Новый экземпляр запускается, только если все существующие заняты
+            if self._idle < self._queue.qsize() and self._threads < self.size:
+                self._threads += 1
+                threading.Thread(target=self._worker, daemon=True).start()
+        return future
+    
+    def convert(self, docx_path, pdf_path, timeout=None):
+        """Конвертирует документ и ждёт результата (исключение конвертера пробрасывается)"""
+        return self.submit(docx_path, pdf_path).result(timeout)
+    
+    def stats(self):
+        """Состояние пула: очередь, экземпляры, количество и среднее время конвертаций"""
+        with self._lock:
+            stats = dict(self._stats, queue_depth=self._queue.qsize(),
+                         instances=self._threads, idle=self._idle)
+        done = stats['conversions'] + stats['errors']
+        stats['avg_convert_seconds'] = stats['convert_seconds'] / done if done else 0.0
+        stats['avg_wait_seconds'] = stats['wait_seconds'] / done if done else 0.0
+        return stats
+    
+    def _worker(self):
+        converter = None
+        uses = 0
+        try:
+            while True:
+                with self._lock:
+                    self._idle += 1
+                try:
+                    item = self._queue.get(timeout=self.idle_timeout)
+                except queue.Empty:
+                    item = None
+                with self._lock:
+                    self._idle -= 1
+                    if item is None:
+                        if not self._closed and not self._queue.empty():
+                            # Документ поставлен, пока поток выходил по простою: submit()
+                            # под этой же блокировкой счёл поток свободным и новый не запустил
+                            continue
+                        # Простой: экземпляр закрывается, поток завершается
+                        if not self._closed:
+                            self._threads -= 1
+                        return
+                if item is False:
+                    return
+                
+                docx_path, pdf_path, future, queued_at = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                
+                started_at = time.time()
+                try:
+                    if converter is None:
+                        converter = self.converter_factory()
+                        uses = 0
+                        with self._lock:
+                            self._stats['started'] += 1
+                    converter.convert(docx_path, pdf_path)
+                    uses += 1
+                    error = None
+                except Exception as e:
+                    error = e
+                
+                elapsed = time.time() - started_at
+                with self._lock:
+                    self._stats['conversions' if error is None else 'errors'] += 1
+                    self._stats['convert_seconds'] += elapsed
+                    self._stats['max_convert_seconds'] = max(self._stats['max_convert_seconds'], elapsed)
+                    self._stats['wait_seconds'] += started_at - queued_at
+                
+                if converter is not None and (error is not None or uses >= self.max_uses):
+                    self._close_converter(converter)
+                    converter = None
+                    with self._lock:
+                        self._stats['recycled'] += 1
+                
+                if error is None:
+                    future.set_result(pdf_path)
+                else:
+                    future.set_exception(error)
+        finally:
+            if converter is not None:
+                self._close_converter(converter)
+    
+    @staticmethod
+    def _close_converter(converter):
+        try:
+            converter.close()
+        except Exception:
+            pass
+    
+    def shutdown(self):
+        """Закрывает все экземпляры; документы из очереди получают ошибку"""
+        with self._lock:
+            self._closed = True
+            threads = self._threads
+            self._threads = 0
+        while True:
+            try:
+                _, _, future, _ = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("Пул конвертеров закрыт"))
+        for _ in range(threads):
+            self._queue.put(False)
+
+
+# Пулы конвертеров этого процесса {имя конвертера: пул}
+_pdf_converter_pools = {}
+_pdf_converter_pools_lock = threading.Lock()
+
+def get_pdf_converter_pool(name="auto"):
+    """Общий пул конвертеров процесса (создаётся при первом обращении)"""
+    with _pdf_converter_pools_lock:
+        pool = _pdf_converter_pools.get(name)
+        if pool is None:
+            if not _pdf_converter_pools:
+                # Finalize срабатывает и при выходе процессов пула multiprocessing, где atexit не вызывается
+                import multiprocessing.util
+                multiprocessing.util.Finalize(None, shutdown_pdf_converter_pools, exitpriority=10)
+            pool = PdfConverterPool(resolve_pdf_converter(name))
+            _pdf_converter_pools[name] = pool
+        return pool
+
+def shutdown_pdf_converter_pools():
+    """Закрывает все пулы конвертеров процесса"""
+    with _pdf_converter_pools_lock:
+        pools = list(_pdf_converter_pools.values())
+        _pdf_converter_pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+def convert_docx_to_pdf_with_word(docx_path, pdf_path):
+    """Конвертация через общий пул экземпляров Microsoft Word"""
+    get_pdf_converter_pool("word").convert(os.path.abspath(docx_path), os.path.abspath(pdf_path))
+
+
+# Имя объединённого PDF в папке сохранения
+GENERATED_MERGED_PDF_NAME = "все документы.pdf"
+
+class OrderedPdfMerger:
+    """Объединение PDF по ходу генерации в порядке строк.
+    
+    Файлы приходят из процессов в произвольном порядке; буфер перестановки держит
+    пути, пришедшие раньше своей очереди, и дописывает их, как только готовы все
+    предыдущие строки. Строки с ошибкой отмечаются skip(), чтобы не задерживать очередь.
+    """
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.next_index = 0
+        self.page_count = 0
+        self.document_count = 0
+        self.failed = []   # Файлы, которые не удалось прочитать
+        self._buffer = {}  # {номер строки: путь к PDF или None}
+        if PYMUPDF_AVAILABLE:
+            self._document = fitz.open()
+            self._merger = None
+        elif PdfMerger is not None:
+            self._document = None
+            self._merger = PdfMerger()
+        else:
+            raise ImportError("Для объединения PDF установите PyMuPDF: pip install pymupdf")
+    
+    @property
+    def pending(self):
+        """Файлов в буфере, ожидающих предыдущие строки"""
+        return len(self._buffer)
+    
+    def add(self, index, pdf_path):
+        self._buffer[index] = pdf_path
+        self._drain()
+    
+    def skip(self, index):
+        self._buffer[index] = None
+        self._drain()
+    
+    def _drain(self):
+        while self.next_index in self._buffer:
+            pdf_path = self._buffer.pop(self.next_index)
+            self.next_index += 1
+            if pdf_path:
+                self._append(pdf_path)
+    
+    def _append(self, pdf_path):
+        try:
+            if self._document is not None:
+                with fitz.open(pdf_path) as source:
+                    self._document.insert_pdf(source)
+                    self.page_count += source.page_count
+            else:
+                self._merger.append(pdf_path)
+        except Exception:
+            self.failed.append(pdf_path)
+            return
+        self.document_count += 1
+    
+    def close(self):
+        """Дописывает оставшиеся файлы (пропуски в нумерации не ждём) и сохраняет результат"""
+        for index in sorted(self._buffer):
+            pdf_path = self._buffer.pop(index)
+            if pdf_path:
+                self._append(pdf_path)
+        if not self.document_count:
+            return None
+        if self._document is not None:
+            self._document.save(self.output_path, garbage=3, deflate=True)
+            self._document.close()
+        else:
+            self._merger.write(self.output_path)
+            self._merger.close()
+        return self.output_path
+
+
+def _generation_filename(row_index, row_data, filename_pattern, required_columns, filename_column):
+    """Имя файла строки по шаблону имени и признак незаполненных обязательных полей.
+    
+    Используется процессами генерации и главным процессом (ключ манифеста).
+    
+    Returns:
+        tuple: (имя файла, is_incomplete)
+    """
+    import pandas as pd
+    
+    is_incomplete = any(
+        pd.isna(row_data.get(col)) or str(row_data.get(col, "")).strip() == ""
+        for col in required_columns
+    )
+    suffix = "_пусто" if is_incomplete else ""
+    
+    column_value = ""
+    if filename_column and filename_column in row_data:
+        column_value = row_data.get(filename_column, "")
+        if pd.isna(column_value):
+            column_value = ""
+        else:
+            column_value = str(column_value).strip()
+            # Убираем недопустимые символы
+            invalid_chars = '<>:"/\\|?*'
+            for char in invalid_chars:
+                column_value = column_value.replace(char, '')
+            column_value = column_value.rstrip('.')
+            if not column_value:
+                column_value = f"строка{row_index + 1}"
+    
+    if not column_value and '{column}' in filename_pattern:
+        column_value = f"строка{row_index + 1}"
+    
+    filename = filename_pattern.format(i=row_index + 1, suffix=suffix, column=column_value)
+    name_part, ext = os.path.splitext(filename)
+    if len(name_part) > 200:
+        name_part = name_part[:200]
+        filename = name_part + ext
+    
+    return filename, is_incomplete
+
+def _process_single_document(args, log_level=LOG_INFO, word_backend="docx"):
     """
     Обработка одного документа (функция для параллельного выполнения).
     
@@ -6098,6 +8059,9 @@ def _process_single_document(args):
         args: кортеж (row_index, row_data, word_template, output_folder, 
                      filename_pattern, required_columns, placeholders, 
                      filename_column)
+        log_level: порог лога - сообщения ниже него не формируются и не передаются
+        word_backend: "docx" - сохранение через python-docx, "zip" - прямая запись XML
+                      (ZipWordTemplate, с откатом на python-docx)
     
     Returns:
         dict: результат обработки {
@@ -6106,11 +8070,10 @@ def _process_single_document(args):
             'filename': str,
             'is_incomplete': bool,
             'error': str or None,
-            'logs': list of str  # Логи для вывода
+            'logs': list of str  # Логи для вывода (только сообщения не ниже log_level)
         }
     """
     import pandas as pd
-    from docx import Document
     import os
     
     logs = []
@@ -6120,34 +8083,12 @@ def _process_single_document(args):
         (row_index, row_data, word_template, output_folder, filename_pattern,
          required_columns, placeholders, filename_column) = args
         
-        doc = Document(word_template)
-        
-        is_incomplete = any(
-            pd.isna(row_data.get(col)) or str(row_data.get(col, "")).strip() == ""
-            for col in required_columns
-        )
-        suffix = "_пусто" if is_incomplete else ""
+        filename, is_incomplete = _generation_filename(row_index, row_data, filename_pattern,
+                                                       required_columns, filename_column)
         
-        if is_incomplete:
+        if is_incomplete and log_level <= LOG_WARN:
             logs.append(f"   ⚠ Обнаружены пустые обязательные поля")
         
-        column_value = ""
-        if filename_column and filename_column in row_data:
-            column_value = row_data.get(filename_column, "")
-            if pd.isna(column_value):
-                column_value = ""
-            else:
-                column_value = str(column_value).strip()
-                invalid_chars = '<>:"/\\|?*'
-                for char in invalid_chars:
-                    column_value = column_value.replace(char, '')
-                column_value = column_value.rstrip('.')
-                if not column_value:
-                    column_value = f"строка{row_index + 1}"
-        
-        if not column_value and '{column}' in filename_pattern:
-            column_value = f"строка{row_index + 1}"
-        
         replacements = {}
         for ph in placeholders:
             if not ph.get("active", True):
@@ -6168,32 +8109,19 @@ def _process_single_document(args):
             
             replacements[placeholder_key] = value
         
-        for paragraph in doc.paragraphs:
-            _replace_placeholders_in_paragraph(paragraph, replacements)
-        
-        for table in doc.tables:
-            for table_row in table.rows:
-                for cell in table_row.cells:
-                    for paragraph in cell.paragraphs:
-                        _replace_placeholders_in_paragraph(paragraph, replacements)
-        
-        filename = filename_pattern.format(i=row_index + 1, suffix=suffix, column=column_value)
-        name_part, ext = os.path.splitext(filename)
-        if len(name_part) > 200:
-            name_part = name_part[:200]
-            filename = name_part + ext
+        # Шаблон разбирается один раз на процесс, дальше только клонируется
+        compiled = _get_compiled_word_template(word_template, tuple(replacements))
         
         output_folder = output_folder.strip()  # Удаляем пробелы в конце
         filepath = os.path.join(output_folder, filename)
         
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
         
-        doc.save(filepath)
-        logs.append(f"💾 Сохранен: {filename}")
-        
-        # Освобождаем ресурсы для разблокировки файлов
-        del doc
-        gc.collect()
+        zip_template = compiled.zip_template() if word_backend == "zip" else None
+        if zip_template is None or not zip_template.render(replacements, filepath):
+            compiled.render(replacements, filepath)
+        if log_level <= LOG_DEBUG:
+            logs.append(f"💾 Сохранен: {filename}")
         
         return {
             'success': True,
@@ -6218,7 +8146,7 @@ def _process_single_document(args):
         }
 
 
-def _process_single_excel_document(args):
+def _process_single_excel_document(args, log_level=LOG_INFO):
     """
     Обработка одного Excel документа (функция для параллельного выполнения).
     
@@ -6226,6 +8154,7 @@ def _process_single_excel_document(args):
         args: кортеж (row_index, row_data, excel_template, output_folder, 
                      filename_pattern, required_columns, placeholders, 
                      filename_column)
+        log_level: порог лога - сообщения ниже него не формируются и не передаются
     
     Returns:
         dict: результат обработки {
@@ -6234,14 +8163,11 @@ def _process_single_excel_document(args):
             'filename': str,
             'is_incomplete': bool,
             'error': str or None,
-            'logs': list of str
+            'logs': list of str  # Только сообщения не ниже log_level
         }
     """
     import pandas as pd
-    from openpyxl import load_workbook
     import os
-    import gc  
-    import re
     
     logs = []
     row_index = None
@@ -6250,38 +8176,13 @@ def _process_single_excel_document(args):
         (row_index, row_data, excel_template, output_folder, filename_pattern,
          required_columns, placeholders, filename_column) = args
         
-        # Загружаем Excel шаблон
-        wb = load_workbook(excel_template)
-        
-        # Проверяем обязательные поля
-        is_incomplete = any(
-            pd.isna(row_data.get(col)) or str(row_data.get(col, "")).strip() == ""
-            for col in required_columns
-        )
-        suffix = "_пусто" if is_incomplete else ""
+        # Проверяем обязательные поля и формируем имя файла
+        filename, is_incomplete = _generation_filename(row_index, row_data, filename_pattern,
+                                                       required_columns, filename_column)
         
-        if is_incomplete:
+        if is_incomplete and log_level <= LOG_WARN:
             logs.append(f"   ⚠ Обнаружены пустые обязательные поля")
         
-        # Формируем имя файла
-        column_value = ""
-        if filename_column and filename_column in row_data:
-            column_value = row_data.get(filename_column, "")
-            if pd.isna(column_value):
-                column_value = ""
-            else:
-                column_value = str(column_value).strip()
-                # Убираем недопустимые символы
-                invalid_chars = '<>:"/\\|?*'
-                for char in invalid_chars:
-                    column_value = column_value.replace(char, '')
-                column_value = column_value.rstrip('.')
-                if not column_value:
-                    column_value = f"строка{row_index + 1}"
-        
-        if not column_value and '{column}' in filename_pattern:
-            column_value = f"строка{row_index + 1}"
-        
         # Создаём замены для плейсхолдеров
         replacements = {}
         for ph in placeholders:
@@ -6303,25 +8204,13 @@ def _process_single_excel_document(args):
             
             replacements[placeholder_key] = value
         
-        # Заменяем плейсхолдеры во всех ячейках всех листов
-        for sheet in wb.worksheets:
-            for row in sheet.iter_rows():
-                for cell in row:
-                    if cell.value and isinstance(cell.value, str):
-                        cell_text = cell.value
-                        # Заменяем все плейсхолдеры
-                        for placeholder, replacement in replacements.items():
-                            if placeholder in cell_text:
-                                cell_text = cell_text.replace(placeholder, str(replacement))
-                                logs.append(f"   ✓ Замена в ячейке {cell.coordinate}: {placeholder}")
-                        cell.value = cell_text
-        
-        # Формируем имя файла
-        filename = filename_pattern.format(i=row_index + 1, suffix=suffix, column=column_value)
-        name_part, ext = os.path.splitext(filename)
-        if len(name_part) > 200:
-            name_part = name_part[:200]
-            filename = name_part + ext
+        # Шаблон разбирается один раз на процесс: заменяются только проиндексированные ячейки
+        compiled = _get_compiled_excel_template(excel_template, tuple(replacements))
+        
+        if log_level <= LOG_DEBUG:
+            for sheet_index, coordinate, text, tokens in compiled.cells:
+                for placeholder in tokens:
+                    logs.append(f"   ✓ Замена в ячейке {coordinate}: {placeholder}")
         
         output_folder = output_folder.strip()
         filepath = os.path.join(output_folder, filename)
@@ -6329,18 +8218,11 @@ def _process_single_excel_document(args):
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
         
         # Сохраняем файл
-        wb.save(filepath)
-        logs.append(f"💾 Сохранен: {filename}")
-        
-        # КРИТИЧНО: Правильно закрываем Excel файл для разблокировки
-        try:
-            wb.close()
-        except:
-            pass
-        finally:
-            del wb
-            # Принудительная сборка мусора для освобождения файлов
-            gc.collect()
+        zip_template = compiled.zip_template()
+        if zip_template is None or not zip_template.render(replacements, filepath):
+            compiled.render(replacements, filepath)
+        if log_level <= LOG_DEBUG:
+            logs.append(f"💾 Сохранен: {filename}")
         
         return {
             'success': True,
@@ -6365,6 +8247,575 @@ def _process_single_excel_document(args):
         }
 
 
+# ── ПОТОКОВОЕ ЧТЕНИЕ EXCEL ──────────────────────────────────────────
+
+# Количество строк Excel в одной порции потокового чтения
+EXCEL_STREAM_CHUNK_ROWS = 2000
+
+class ExcelRowStream:
+    """Потоковое чтение первого листа Excel (openpyxl read_only) порциями DataFrame.
+    
+    В памяти одновременно находится только одна порция строк, поэтому документы
+    начинают создаваться до того, как прочитана последняя строка таблицы.
+    Значения приводятся так же, как в pd.read_excel: пустые ячейки - None,
+    целые числа - int, полностью пустые строки внутри таблицы сохраняются
+    (номера строк совпадают), а после последней непустой - отбрасываются,
+    безымянные и повторяющиеся заголовки получают имена "Unnamed: N" и "имя.1".
+    Колонки порций имеют тип object (без приведения к float из-за пропусков).
+    """
+    def __init__(self, file_path):
+        from openpyxl import load_workbook
+        
+        self.workbook = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+        self.sheet = self.workbook.worksheets[0]
+        self._rows = self.sheet.iter_rows(values_only=True)
+        
+        header = next(self._rows, None) or ()
+        self.columns = self._make_columns(header)
+        
+        # Оценка по размеру листа из файла (может отсутствовать или быть неточной)
+        max_row = self.sheet.max_row
+        self.row_count = max(0, max_row - 1) if max_row else 0
+    
+    @staticmethod
+    def _make_columns(header):
+        columns = []
+        seen = {}
+        for index, name in enumerate(header):
+            if name is None or name == "":
+                name = f"Unnamed: {index}"
+            if name in seen:
+                seen[name] += 1
+                name = f"{name}.{seen[name]}"
+            else:
+                seen[name] = 0
+            columns.append(name)
+        return columns
+    
+    @staticmethod
+    def _convert_value(value):
+        if value == "":
+            return None
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        return value
+    
+    def chunks(self, chunk_rows=EXCEL_STREAM_CHUNK_ROWS):
+        """Генератор DataFrame по chunk_rows строк"""
+        import pandas as pd
+        
+        width = len(self.columns)
+        convert = self._convert_value
+        batch = []
+        # Пустые строки откладываются: в таблицу они попадают, только если
+        # за ними есть непустая строка (хвостовые пустые pd.read_excel отбрасывает)
+        blank_rows = 0
+        for row in self._rows:
+            values = [convert(value) for value in row[:width]]
+            if all(value is None for value in values):
+                blank_rows += 1
+                continue
+            if len(values) < width:
+                values.extend([None] * (width - len(values)))
+            
+            for _ in range(blank_rows):
+                batch.append([None] * width)
+                if len(batch) >= chunk_rows:
+                    yield pd.DataFrame(batch, columns=self.columns, dtype=object)
+                    batch = []
+            blank_rows = 0
+            batch.append(values)
+            
+            if len(batch) >= chunk_rows:
+                yield pd.DataFrame(batch, columns=self.columns, dtype=object)
+                batch = []
+        
+        if batch:
+            yield pd.DataFrame(batch, columns=self.columns, dtype=object)
+    
+    def close(self):
+        """Закрывает файл (read_only книга держит его открытым до закрытия)"""
+        try:
+            self.workbook.close()
+        except:
+            pass
+
+
+# ── МАНИФЕСТ ПАПКИ СОХРАНЕНИЯ ───────────────────────────────────────
+
+GENERATION_MANIFEST_NAME = ".generation_manifest.json"
+GENERATION_JOURNAL_NAME = ".generation_journal.jsonl"
+JOURNAL_FLUSH_INTERVAL = 2.0   # Секунд между сбросами журнала на диск
+JOURNAL_FLUSH_EVERY = 50       # ...или после стольких новых файлов
+
+class GenerationManifest:
+    """Манифест папки сохранения для инкрементальной генерации.
+    
+    Для каждой задачи ("word"/"excel", имя выходного файла по шаблону имени)
+    хранит хэш подготовленных значений строки вместе с хэшем конфигурации
+    (шаблоны, плейсхолдеры, имена файлов) и имя созданного файла. Номер строки в
+    ключ не входит: после вставки или удаления строк в таблице остальные строки
+    с прежним именем и значениями пропускаются (кроме шаблонов имени с {i}).
+    Файлы строк, которые исчезли из таблицы или получили другое имя, не
+    удаляются, а помечаются как устаревшие.
+    
+    Манифест записывается в конце запуска, а до этого каждый созданный файл
+    дописывается в журнал (по строке JSON, сброс на диск периодически). Если
+    запуск оборвался (сбой, закрытие программы), следующий запуск читает журнал
+    поверх манифеста и продолжает с места остановки. Файл пропускается, только
+    если он целиком записан: размер совпадает, архив docx/xlsx читается, а PDF
+    заканчивается маркером %%EOF.
+    """
+    VERSION = 2
+    
+    def __init__(self, output_folder, config_hash, use_previous=True):
+        self.output_folder = output_folder
+        self.path = os.path.join(output_folder, GENERATION_MANIFEST_NAME)
+        self.journal_path = os.path.join(output_folder, GENERATION_JOURNAL_NAME)
+        self.config_hash = config_hash
+        self.rows = {}
+        self.stale = []
+        self.up_to_date = 0
+        self.resumed = 0       # Записей, восстановленных из журнала прерванного запуска
+        self.incomplete = 0    # Файлов из прошлых запусков, не прошедших проверку
+        self._previous = {}
+        self._seen = set()
+        self._journal_file = None
+        self._journal_pending = []
+        self._journal_flushed_at = time.time()
+        self.load(use_previous)
+    
+    def load(self, use_previous=True):
+        """Читает манифест прошлого запуска (use_previous=False - полная пересборка)"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        if not isinstance(data, dict) or data.get("version") != self.VERSION:
+            data = {}
+        
+        self.stale = list(data.get("stale", []))
+        previous = dict(data.get("rows", {}))
+        
+        # Журнал остаётся только после прерванного запуска: его записи новее манифеста
+        for key, entry in self._read_journal():
+            previous[key] = entry
+            self.resumed += 1
+        
+        if use_previous:
+            self._previous = previous
+        else:
+            # Записи прошлого запуска не используются для пропуска, но их файлы
+            # всё равно должны попасть в устаревшие, если строка исчезла
+            self._previous = {key: dict(entry, hash=None) for key, entry in previous.items()}
+    
+    def _read_journal(self):
+        """Записи журнала прерванного запуска: [(ключ, запись)]"""
+        entries = []
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        item = json.loads(line)
+                        if item.get("version") != self.VERSION:
+                            continue
+                        entries.append((item["key"], {"hash": item["hash"], "filename": item["filename"],
+                                                      "size": item.get("size")}))
+                    except (ValueError, KeyError, TypeError):
+                        # Последняя строка могла оборваться при сбое
+                        continue
+        except OSError:
+            pass
+        return entries
+    
+    @staticmethod
+    def config_digest(settings, template_paths):
+        """Хэш конфигурации задания: настройки (JSON) и содержимое файлов шаблонов"""
+        import hashlib
+        
+        digest = hashlib.sha1(json.dumps(settings, ensure_ascii=False, sort_keys=True, default=str).encode('utf-8'))
+        for path in template_paths:
+            if not path:
+                continue
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+        return digest.hexdigest()
+    
+    def row_hash(self, kind, row_values):
+        """Хэш значений строки задания (с учётом конфигурации, без номера строки)"""
+        import hashlib
+        
+        return hashlib.sha1(repr((self.config_hash, kind, row_values)).encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def row_key(kind, output_name):
+        """Ключ задачи: тип и имя выходного файла (до конвертации в PDF)"""
+        return f"{kind}:{output_name}"
+    
+    def is_up_to_date(self, key, row_hash):
+        """Файл строки уже создан с теми же данными - генерацию можно пропустить"""
+        if key in self._seen:
+            # Несколько строк с одним именем файла перезаписывают друг друга -
+            # пропуск одной из них оставил бы в папке чужой результат
+            return False
+        self._seen.add(key)
+        entry = self._previous.get(key)
+        if not entry or entry.get("hash") != row_hash:
+            return False
+        if not self._file_is_complete(entry):
+            self.incomplete += 1
+            return False
+        self.rows[key] = entry
+        self.up_to_date += 1
+        return True
+    
+    def filename_of(self, key):
+        """Имя файла строки по манифесту (None, если строки нет)"""
+        entry = self.rows.get(key)
+        return entry["filename"] if entry else None
+    
+    def _file_is_complete(self, entry):
+        """Файл существует, имеет записанный размер и читается как архив docx/xlsx"""
+        import zipfile
+        
+        path = os.path.join(self.output_folder, entry["filename"])
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return False
+        if entry.get("size") is not None and size != entry["size"]:
+            return False
+        if path.lower().endswith('.pdf'):
+            # PDF заканчивается маркером %%EOF - у оборванного файла его нет
+            try:
+                with open(path, 'rb') as f:
+                    f.seek(max(0, size - 1024))
+                    return b'%%EOF' in f.read()
+            except OSError:
+                return False
+        try:
+            # Центральный каталог находится в конце архива - оборванный файл не откроется
+            with zipfile.ZipFile(path) as archive:
+                archive.infolist()
+        except (zipfile.BadZipFile, OSError):
+            return False
+        return True
+    
+    def record(self, key, row_hash, filename):
+        """Запоминает созданный файл строки и дописывает его в журнал"""
+        try:
+            size = os.path.getsize(os.path.join(self.output_folder, filename))
+        except OSError:
+            size = None
+        self.rows[key] = {"hash": row_hash, "filename": filename, "size": size}
+        
+        previous = self._previous.get(key)
+        if previous and previous["filename"] != filename:
+            self._flag_stale(previous["filename"])
+        
+        self._journal_pending.append(json.dumps(dict(self.rows[key], key=key, version=self.VERSION),
+                                                ensure_ascii=False))
+        if (len(self._journal_pending) >= JOURNAL_FLUSH_EVERY or
+                time.time() - self._journal_flushed_at >= JOURNAL_FLUSH_INTERVAL):
+            self.flush_journal()
+    
+    def flush_journal(self):
+        """Сбрасывает накопленные записи журнала на диск"""
+        self._journal_flushed_at = time.time()
+        if not self._journal_pending:
+            return
+        try:
+            if self._journal_file is None:
+                self._journal_file = open(self.journal_path, 'a', encoding='utf-8')
+            self._journal_file.write("\n".join(self._journal_pending) + "\n")
+            self._journal_file.flush()
+            os.fsync(self._journal_file.fileno())
+            self._journal_pending = []
+        except OSError:
+            # Журнал - страховка; без него генерация продолжается
+            pass
+    
+    def close_journal(self):
+        """Сбрасывает и закрывает журнал (он остаётся на диске до сохранения манифеста)"""
+        self.flush_journal()
+        if self._journal_file is not None:
+            try:
+                self._journal_file.close()
+            except OSError:
+                pass
+            self._journal_file = None
+    
+    def _flag_stale(self, filename):
+        if filename not in self.stale:
+            self.stale.append(filename)
+    
+    def finish(self, complete):
+        """
+        Завершает запуск. complete - таблица обработана полностью
+        (только тогда отсутствующие строки считаются исчезнувшими).
+        
+        Returns:
+            list: файлы, помеченные устаревшими в этом запуске
+        """
+        before = set(self.stale)
+        for key, entry in self._previous.items():
+            if key in self.rows:
+                continue
+            if complete and key not in self._seen:
+                self._flag_stale(entry["filename"])
+            elif not complete and key not in self._seen:
+                # Строка не дошла до обработки - запись остаётся до следующего запуска
+                self.rows[key] = entry
+        
+        # Имя могло снова понадобиться другой строке; удалённые файлы не храним
+        current = {entry["filename"] for entry in self.rows.values()}
+        self.stale = [name for name in self.stale
+                      if name not in current and os.path.exists(os.path.join(self.output_folder, name))]
+        return [name for name in self.stale if name not in before]
+    
+    def save(self):
+        """Атомарно записывает манифест; журнал после этого больше не нужен"""
+        self.close_journal()
+        data = {"version": self.VERSION, "config_hash": self.config_hash,
+                "rows": self.rows, "stale": self.stale}
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+        try:
+            os.remove(self.journal_path)
+        except OSError:
+            pass
+
+
+# ── ПОСТОЯННЫЙ ПУЛ ПРОЦЕССОВ ГЕНЕРАЦИИ ──────────────────────────────
+
+def _generation_worker_init():
+    """Инициализатор процесса пула: заранее импортирует тяжёлые модули"""
+    try:
+        import pandas
+        import docx
+        import openpyxl
+    except ImportError:
+        pass
+
+def _generation_worker_ping():
+    """Пустая задача для прогрева процессов пула"""
+    return os.getpid()
+
+class GenerationWorkerPool:
+    """Долгоживущий пул процессов для генерации документов.
+    
+    Процессы запускаются один раз (при старте приложения) и переиспользуются между
+    заданиями, поэтому повторные запуски не платят за создание процессов и импорт
+    pandas/python-docx. Пул пересоздаётся только при изменении количества процессов
+    или после аварийного завершения воркера.
+    
+    Задание держит executor от acquire() до release(). Пока executor занят,
+    новое количество процессов (из настроек или другого задания) только
+    запоминается: пересоздание отменило бы задачи работающего задания.
+    Оно применяется при следующем acquire() или warm_up(), когда пул свободен.
+    """
+    def __init__(self):
+        self.executor = None
+        self.num_workers = 0
+        self._leases = 0
+        self._lock = threading.Lock()
+    
+    def acquire(self, num_workers):
+        """Возвращает рабочий executor и занимает его до release()"""
+        with self._lock:
+            executor = self._get_locked(num_workers)
+            self._leases += 1
+            return executor
+    
+    def release(self, executor):
+        """Освобождает executor, полученный через acquire()"""
+        with self._lock:
+            # Executor, заменённый после сбоя, уже не учитывается
+            if executor is self.executor and self._leases > 0:
+                self._leases -= 1
+    
+    def warm_up(self, num_workers):
+        """Запускает процессы заранее, не дожидаясь первого задания"""
+        if num_workers <= 1:
+            return
+        with self._lock:
+            executor = self._get_locked(num_workers)
+            for _ in range(self.num_workers):
+                executor.submit(_generation_worker_ping)
+    
+    def _get_locked(self, num_workers):
+        _ensure_concurrent_imports()
+        if self.executor is not None:
+            unusable = (getattr(self.executor, '_broken', False) or
+                        getattr(self.executor, '_shutdown_thread', False))
+            if unusable:
+                self._shutdown_locked()
+            elif self.num_workers != num_workers and self._leases == 0:
+                self._shutdown_locked()
+        
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=num_workers,
+                                                initializer=_generation_worker_init)
+            self.num_workers = num_workers
+            self._leases = 0
+            _register_executor(self.executor)
+        
+        return self.executor
+    
+    def shutdown(self):
+        """Останавливает пул"""
+        with self._lock:
+            self._shutdown_locked()
+    
+    def _shutdown_locked(self):
+        if self.executor is None:
+            return
+        try:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        except:
+            pass
+        _unregister_executor(self.executor)
+        self.executor = None
+        self.num_workers = 0
+        self._leases = 0
+
+# Глобальный пул процессов генерации
+generation_worker_pool = GenerationWorkerPool()
+
+# Максимальное количество строк в одной пачке, отправляемой в процесс
+GENERATION_CHUNK_SIZE = 32
+
+# Описания заданий, уже загруженные в этом процессе {job_id: job}
+_worker_jobs = {}
+_WORKER_JOBS_LIMIT = 4
+
+def _write_generation_job(job):
+    """Сохраняет описание задания во временный файл для процессов пула.
+    
+    Returns:
+        tuple: (job_id, путь к файлу)
+    """
+    import pickle
+    
+    fd, spec_path = tempfile.mkstemp(prefix='generation_job_', suffix='.pkl')
+    with os.fdopen(fd, 'wb') as f:
+        pickle.dump(job, f, protocol=pickle.HIGHEST_PROTOCOL)
+    
+    return os.path.basename(spec_path), spec_path
+
+def _load_generation_job(job_id, spec_path):
+    """Инициализация задания в процессе: описание читается и шаблон компилируется один раз"""
+    job = _worker_jobs.get(job_id)
+    if job is None:
+        import pickle
+        
+        with open(spec_path, 'rb') as f:
+            job = pickle.load(f)
+        
+        if job['word_template']:
+            _get_compiled_word_template(job['word_template'], _placeholder_keys(job['placeholders']))
+        if job['excel_template']:
+            _get_compiled_excel_template(job['excel_template'], _placeholder_keys(job['placeholders']))
+        
+        if len(_worker_jobs) >= _WORKER_JOBS_LIMIT:
+            _worker_jobs.pop(next(iter(_worker_jobs)), None)
+        _worker_jobs[job_id] = job
+    
+    return job
+
+def _run_generation_chunk(job_id, spec_path, rows):
+    """Обработка пачки строк за один вызов: один обмен с процессом на несколько документов.
+    
+    Args:
+        rows: список кортежей (kind, row_index, row_values)
+    
+    Returns:
+        list: результаты _run_generation_task в том же порядке
+    """
+    return [_run_generation_task(job_id, spec_path, *row) for row in rows]
+
+def _run_generation_task(job_id, spec_path, kind, row_index, row_values):
+    """
+    Обработка одной строки задания (в процессе пула или в текущем потоке).
+    
+    Args:
+        job_id, spec_path: идентификатор и файл описания задания (_write_generation_job)
+        kind: "word" или "excel"
+        row_index: номер строки
+        row_values: значения строки в порядке job['row_keys']
+    
+    Returns:
+        dict: результат _process_single_document / _process_single_excel_document
+              с дополнительным ключом 'kind' (в режиме PDF 'filename' - имя PDF)
+    """
+    try:
+        job = _load_generation_job(job_id, spec_path)
+    except Exception as e:
+        return {
+            'success': False,
+            'index': row_index,
+            'kind': kind,
+            'filename': None,
+            'is_incomplete': False,
+            'error': f"Не удалось загрузить задание: {e}",
+            'logs': []
+        }
+    
+    row_data = dict(zip(job['row_keys'], row_values))
+    log_level = job.get('log_level', LOG_INFO)
+    
+    if kind == "word":
+        result = _process_single_document((row_index, row_data, job['word_template'], job['output_folder'],
+                                           job['filename_pattern'], job['required_columns'],
+                                           job['placeholders'], job['filename_column']), log_level,
+                                          job.get('word_backend', "docx"))
+        if result['success'] and job.get('pdf_output'):
+            _convert_generated_to_pdf(job, result, log_level)
+    else:
+        result = _process_single_excel_document((row_index, row_data, job['excel_template'], job['output_folder'],
+                                                 job['excel_pattern'], job['required_columns'],
+                                                 job['placeholders'], job['filename_column']), log_level)
+    result['kind'] = kind
+    return result
+
+def _convert_generated_to_pdf(job, result, log_level=LOG_INFO):
+    """Конвертирует только что созданный документ Word в PDF в том же процессе.
+    
+    DOCX удаляется после успешной конвертации; при ошибке он остаётся в папке,
+    а результат помечается неуспешным.
+    """
+    output_folder = job['output_folder'].strip()
+    docx_path = os.path.join(output_folder, result['filename'])
+    pdf_name = os.path.splitext(result['filename'])[0] + ".pdf"
+    pdf_path = os.path.join(output_folder, pdf_name)
+    
+    started_at = time.time()
+    try:
+        if os.path.exists(pdf_path):
+            os.remove(pdf_path)
+        get_pdf_converter_pool(job.get('pdf_converter', "auto")).convert(docx_path, pdf_path)
+        if not os.path.exists(pdf_path):
+            raise RuntimeError("PDF файл не был создан")
+    except Exception as e:
+        result['success'] = False
+        result['error'] = f"PDF: {e}"
+        result['logs'].append(f"   ❌ ОШИБКА конвертации в PDF: {e}")
+        return
+    
+    try:
+        os.remove(docx_path)
+    except OSError:
+        pass
+    result['filename'] = pdf_name
+    result['pdf_seconds'] = time.time() - started_at
+    if log_level <= LOG_DEBUG:
+        result['logs'].append(f"📄 PDF: {pdf_name}")
+
+
 class SimpleDatePicker(tk.Frame):
     """Простой выбор даты с календарём на русском языке"""
     def __init__(self, parent, **kwargs):
@@ -7879,7 +10330,7 @@ class PerformanceSettingsDialog:
         
         self.top.withdraw()
         
-        self.top.geometry("600x550")
+        self.top.geometry("600x990")
         self.top.resizable(False, False)
         self.top.transient(parent)
         
@@ -7997,6 +10448,168 @@ class PerformanceSettingsDialog:
         
         self.update_info_label()
         
+        log_frame = tk.LabelFrame(
+            main_frame,
+            text=" 📋 Подробность лога ",
+            font=FONTS["heading"],
+            bg=COLORS["bg_secondary"],
+            fg=COLORS["text_primary"],
+            padx=15,
+            pady=8
+        )
+        log_frame.pack(fill=tk.X, pady=(0, 15))
+        
+        levels_frame = tk.Frame(log_frame, bg=COLORS["bg_secondary"])
+        levels_frame.pack(anchor="w")
+        
+        for level_key, level_label in LOG_LEVEL_LABELS.items():
+            tk.Radiobutton(
+                levels_frame,
+                text=level_label,
+                variable=self.app.log_level,
+                value=level_key,
+                font=FONTS["body"],
+                bg=COLORS["bg_secondary"],
+                activebackground=COLORS["bg_secondary"],
+                fg=COLORS["text_primary"]
+            ).pack(side=tk.LEFT, padx=(0, 10))
+        
+        tk.Label(
+            log_frame,
+            text="«Подробно» - каждый плейсхолдер и сохранённый файл (замедляет большие задания)",
+            font=FONTS["small"],
+            bg=COLORS["bg_secondary"],
+            fg=COLORS["text_secondary"],
+            wraplength=520,
+            justify=tk.LEFT
+        ).pack(anchor="w", pady=(4, 0))
+        
+        source_frame = tk.LabelFrame(
+            main_frame,
+            text=" 📥 Чтение Excel ",
+            font=FONTS["heading"],
+            bg=COLORS["bg_secondary"],
+            fg=COLORS["text_primary"],
+            padx=15,
+            pady=8
+        )
+        source_frame.pack(fill=tk.X, pady=(0, 15))
+        
+        tk.Checkbutton(
+            source_frame,
+            text="Потоковое чтение (для больших таблиц)",
+            variable=self.app.streaming_excel,
+            font=FONTS["body"],
+            bg=COLORS["bg_secondary"],
+            activebackground=COLORS["bg_secondary"],
+            fg=COLORS["text_primary"],
+            selectcolor=COLORS["bg_primary"]
+        ).pack(anchor="w")
+        
+        tk.Label(
+            source_frame,
+            text=f"Строки читаются порциями по {EXCEL_STREAM_CHUNK_ROWS}, документы создаются до окончания чтения файла",
+            font=FONTS["small"],
+            bg=COLORS["bg_secondary"],
+            fg=COLORS["text_secondary"],
+            wraplength=520,
+            justify=tk.LEFT
+        ).pack(anchor="w", pady=(4, 0))
+        
+        backend_frame = tk.LabelFrame(
+            main_frame,
+            text=" 📝 Запись документов Word ",
+            font=FONTS["heading"],
+            bg=COLORS["bg_secondary"],
+            fg=COLORS["text_primary"],
+            padx=15,
+            pady=8
+        )
+        backend_frame.pack(fill=tk.X, pady=(0, 15))
+        
+        for backend_key, backend_label in (("docx", "python-docx (стандартно)"),
+                                           ("zip", "Прямая запись XML (быстрее)")):
+            tk.Radiobutton(
+                backend_frame,
+                text=backend_label,
+                variable=self.app.word_backend,
+                value=backend_key,
+                font=FONTS["body"],
+                bg=COLORS["bg_secondary"],
+                activebackground=COLORS["bg_secondary"],
+                fg=COLORS["text_primary"]
+            ).pack(side=tk.LEFT, padx=(0, 10))
+        
+        converter_frame = tk.LabelFrame(
+            main_frame,
+            text=" 📄 Конвертер Word → PDF ",
+            font=FONTS["heading"],
+            bg=COLORS["bg_secondary"],
+            fg=COLORS["text_primary"],
+            padx=15,
+            pady=8
+        )
+        converter_frame.pack(fill=tk.X, pady=(0, 15))
+        
+        converter_options = [("auto", "Автоматически", True)]
+        converter_options += [(key, converter_class.title, converter_class.is_available())
+                              for key, converter_class in PDF_CONVERTERS.items()]
+        for converter_key, converter_label, available in converter_options:
+            tk.Radiobutton(
+                converter_frame,
+                text=converter_label,
+                variable=self.app.pdf_converter,
+                value=converter_key,
+                state="normal" if available else "disabled",
+                font=FONTS["body"],
+                bg=COLORS["bg_secondary"],
+                activebackground=COLORS["bg_secondary"],
+                fg=COLORS["text_primary"]
+            ).pack(side=tk.LEFT, padx=(0, 10))
+        
+        ocr_cache_frame = tk.LabelFrame(
+            main_frame,
+            text=" 🔍 Кэш распознавания (OCR) ",
+            font=FONTS["heading"],
+            bg=COLORS["bg_secondary"],
+            fg=COLORS["text_primary"],
+            padx=15,
+            pady=8
+        )
+        ocr_cache_frame.pack(fill=tk.X, pady=(0, 15))
+        
+        self.ocr_cache_label = tk.Label(
+            ocr_cache_frame,
+            text="",
+            font=FONTS["body"],
+            bg=COLORS["bg_secondary"],
+            fg=COLORS["text_secondary"]
+        )
+        self.ocr_cache_label.pack(side=tk.LEFT)
+        
+        create_modern_button(
+            ocr_cache_frame,
+            text="Очистить",
+            command=self.clear_ocr_cache,
+            style="secondary",
+            width=90,
+            height=30,
+            tooltip="Удалить все сохранённые результаты распознавания"
+        ).pack(side=tk.RIGHT, padx=(5, 0))
+        
+        create_modern_button(
+            ocr_cache_frame,
+            text="Удалить устаревшие",
+            command=self.prune_ocr_cache,
+            style="secondary",
+            width=150,
+            height=30,
+            tooltip=f"Удалить записи без обращений дольше {OCR_CACHE_MAX_AGE_DAYS} дней "
+                    f"и сверх лимита {OCR_CACHE_MAX_BYTES // (1024 * 1024)} МБ"
+        ).pack(side=tk.RIGHT, padx=(5, 0))
+        
+        self.update_ocr_cache_label()
+        
         explain_frame = tk.LabelFrame(
             main_frame,
             text=" 💡 Рекомендации и пояснения ",
@@ -8059,6 +10672,26 @@ class PerformanceSettingsDialog:
         )
         cancel_btn.pack(side=tk.RIGHT, padx=3)
     
+    def update_ocr_cache_label(self, note=""):
+        """Показывает размер кэша распознанных страниц"""
+        stats = ocr_result_cache.stats()
+        text = f"Страниц: {stats['entries']}, {stats['bytes'] / (1024 * 1024):.1f} МБ"
+        if note:
+            text += f" ({note})"
+        self.ocr_cache_label.config(text=text)
+    
+    def prune_ocr_cache(self):
+        """Удаляет устаревшие записи кэша OCR"""
+        removed, freed = ocr_result_cache.prune()
+        self.update_ocr_cache_label(f"удалено: {removed}, {freed / (1024 * 1024):.1f} МБ")
+    
+    def clear_ocr_cache(self):
+        """Удаляет все записи кэша OCR"""
+        if not messagebox.askyesno("Кэш OCR", "Удалить все сохранённые результаты распознавания?", parent=self.top):
+            return
+        ocr_result_cache.clear()
+        self.update_ocr_cache_label("очищен")
+    
     def get_cpu_name(self):
         """
         Получение точного названия процессора из Windows.
@@ -8122,6 +10755,10 @@ class PerformanceSettingsDialog:
     def ok(self):
         """Применение настроек"""
         self.app.save_config()
+        # Пересоздаём пул процессов под новое количество заранее
+        # (если идёт генерация - после того как задание освободит пул)
+        threading.Thread(target=generation_worker_pool.warm_up,
+                         args=(self.app.worker_processes.get(),), daemon=True).start()
         self.top.destroy()
     
     def cancel(self):
@@ -8326,6 +10963,13 @@ class GenerationDocApp:
         
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
+        # Подробность лога генерации и режим чтения Excel
+        # (создаются до load_config, чтобы подхватить сохранённые значения)
+        self.log_level = tk.StringVar(value="info")
+        self.streaming_excel = tk.BooleanVar(value=False)
+        self.word_backend = tk.StringVar(value="docx")  # "docx" или "zip" (см. ZipWordTemplate)
+        self.pdf_converter = tk.StringVar(value="auto")  # "auto" или ключ PDF_CONVERTERS
+        
         self.load_config()
         
         # Отложенная инициализация морфологического анализатора (lazy loading)
@@ -8389,6 +11033,20 @@ class GenerationDocApp:
                         if 1 <= saved_workers <= 32:
                             self.worker_processes.set(saved_workers)
                     
+                    saved_log_level = config.get("log_level", None)
+                    if saved_log_level in LOG_LEVELS and hasattr(self, 'log_level'):
+                        self.log_level.set(saved_log_level)
+                    
+                    if hasattr(self, 'streaming_excel'):
+                        self.streaming_excel.set(bool(config.get("streaming_excel", False)))
+                    
+                    if config.get("word_backend") in ("docx", "zip") and hasattr(self, 'word_backend'):
+                        self.word_backend.set(config["word_backend"])
+                    
+                    saved_converter = config.get("pdf_converter")
+                    if (saved_converter == "auto" or saved_converter in PDF_CONVERTERS) and hasattr(self, 'pdf_converter'):
+                        self.pdf_converter.set(saved_converter)
+                    
                     for ph in self.PLACEHOLDERS:
                         if "apply_genitive" in ph and "case" not in ph:
                             ph["case"] = "gent" if ph["apply_genitive"] else "nomn"
@@ -8436,6 +11094,10 @@ class GenerationDocApp:
                     elif saved_workers == 1 and self.cpu_cores > 1:
                         optimal_workers = max(1, self.cpu_cores - 1)
                         self.worker_processes.set(optimal_workers)
+                    
+                    # Процессы генерации запускаются один раз при старте приложения
+                    threading.Thread(target=generation_worker_pool.warm_up,
+                                     args=(self.worker_processes.get(),), daemon=True).start()
                 
                 self.root.after(0, update_workers)
                 self._cpu_info_loaded = True
@@ -8543,7 +11205,11 @@ class GenerationDocApp:
             "last_excel_dir": self.last_excel_dir,
             "last_word_dir": self.last_word_dir,
             "last_output_dir": self.last_output_dir,
-            "worker_processes": self.worker_processes.get()
+            "worker_processes": self.worker_processes.get(),
+            "log_level": self.log_level.get(),
+            "streaming_excel": self.streaming_excel.get(),
+            "word_backend": self.word_backend.get(),
+            "pdf_converter": self.pdf_converter.get()
         })
         
         with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
@@ -9206,8 +11872,9 @@ class GenerationDocApp:
             word_preload_manager.stop()
             
             # Даем время фоновым потокам завершиться
-            if word_preload_manager.worker_thread and word_preload_manager.worker_thread.is_alive():
-                word_preload_manager.worker_thread.join(timeout=2.0)
+            for worker in word_preload_manager.workers:
+                if worker.is_alive():
+                    worker.join(timeout=2.0)
             
             # Закрываем все дополнительные окна
             for widget in self.root.winfo_children():
@@ -9255,10 +11922,20 @@ class GenerationDocApp:
         else:
             import pandas as pd
         
+        job_spec_path = None
+        excel_stream = None
+        manifest = None
+        pdf_merger = None
+        declension_stats = declension_cache.stats()
+        
+        # Сообщения ниже выбранного уровня не выводятся
+        log_level = LOG_LEVELS.get(self.log_level.get(), LOG_INFO)
+        log = LevelLogger(tab.log, log_level)
+        
         try:
-            tab.log("\n" + "═" * 60)
-            tab.log("🚀 НАЧАЛО ОБРАБОТКИ ДОКУМЕНТОВ")
-            tab.log("═" * 60)
+            log.info("\n" + "═" * 60)
+            log.info("🚀 НАЧАЛО ОБРАБОТКИ ДОКУМЕНТОВ")
+            log.info("═" * 60)
             
             excel_file = tab.excel_path.get()
             word_template = tab.word_template_path.get()
@@ -9269,11 +11946,11 @@ class GenerationDocApp:
             use_excel = bool(excel_template)
             
             if use_word and use_excel:
-                tab.log(f"\n📝 Будут созданы документы обоих типов: Word и Excel")
+                log.info(f"\n📝 Будут созданы документы обоих типов: Word и Excel")
             elif use_word:
-                tab.log(f"\n📝 Тип документа: Word")
+                log.info(f"\n📝 Тип документа: Word")
             else:
-                tab.log(f"\n📊 Тип документа: Excel")
+                log.info(f"\n📊 Тип документа: Excel")
             
             output_folder = tab.output_folder.get()
             num_workers = self.worker_processes.get()
@@ -9284,134 +11961,210 @@ class GenerationDocApp:
             
             os.makedirs(output_folder, exist_ok=True)
             
-            tab.log(f"\n📊 Чтение Excel файла:")
-            tab.log(f"   {excel_file}")
-            df = pd.read_excel(excel_file, engine='openpyxl')
-            
-            tab.log(f"   ✓ Прочитано строк: {len(df)}")
-            
-            # ВАЖНО: Создаем копию данных и освобождаем файл для предотвращения блокировки
-            df = df.copy()
-            # Принудительно освобождаем файл Excel
-            gc.collect()
+            # Полный лог запуска дублируется в файл (в окне остаются только последние строки)
+            log_sink = getattr(tab, 'log_sink', None)
+            save_log_var = getattr(tab, 'save_log_to_file', None)
+            if log_sink is not None and save_log_var is not None and save_log_var.get():
+                log_file_path = os.path.join(output_folder, f"generation_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+                try:
+                    log_sink.start_file(log_file_path)
+                    log.info(f"\n🗒 Полный лог сохраняется в файл: {log_file_path}")
+                except Exception as e:
+                    log.warn(f"\n⚠️ Не удалось открыть файл лога: {e}")
+            
+            log.info(f"\n📊 Чтение Excel файла:")
+            log.info(f"   {excel_file}")
+            if self.streaming_excel.get():
+                # Строки читаются порциями по ходу обработки
+                excel_stream = ExcelRowStream(excel_file)
+                source_columns = excel_stream.columns
+                log.info(f"   ✓ Потоковое чтение, строк по размеру листа: ~{excel_stream.row_count}")
+            else:
+                # read_excel закрывает файл сам - копия таблицы не нужна
+                df = pd.read_excel(excel_file, engine='openpyxl')
+                source_columns = df.columns
+                log.info(f"   ✓ Прочитано строк: {len(df)}")
             
             # Определяем колонки с датами по заголовкам поддерживаем колонки с датами по заголовкам
-            date_columns = [col for col in df.columns if self.is_date_column(col)]
+            date_columns = [col for col in source_columns if self.is_date_column(col)]
             if date_columns:
-                tab.log(f"\n📅 Колонки с датами: {', '.join(date_columns)}")
+                log.debug(f"\n📅 Колонки с датами: {', '.join(date_columns)}")
             
-            tab.log(f"\n📝 Используемые шаблоны:")
+            log.debug(f"\n📝 Используемые шаблоны:")
             if use_word:
-                tab.log(f"   Word: {word_template}")
+                log.debug(f"   Word: {word_template}")
             if use_excel:
-                tab.log(f"   Excel: {excel_template}")
+                log.debug(f"   Excel: {excel_template}")
             
-            tab.log(f"\n⚡ Режим производительности:")
-            tab.log(f"   Рабочих процессов: {num_workers}")
+            log.debug(f"\n⚡ Режим производительности:")
+            log.debug(f"   Рабочих процессов: {num_workers}")
             if num_workers > 1:
-                tab.log(f"   Параллельная обработка включена!")
+                log.debug(f"   Параллельная обработка включена!")
             
             # Определяем обязательные столбцы Excel
             required_excel_columns = [ph["source_value"] for ph in self.PLACEHOLDERS 
                                      if ph["source_type"] == "excel" and ph["required"] and ph.get("active", True)]
             
             # Проверка столбцов
-            missing = [col for col in required_excel_columns if col not in df.columns]
+            missing = [col for col in required_excel_columns if col not in source_columns]
             if missing:
-                tab.log(f"\n❌ КРИТИЧЕСКАЯ ОШИБКА: Отсутствуют обязательные столбцы:")
+                log.error(f"\n❌ КРИТИЧЕСКАЯ ОШИБКА: Отсутствуют обязательные столбцы:")
                 for col in missing:
-                    tab.log(f"   • {col}")
+                    log.error(f"   • {col}")
                 self.root.after(0, lambda: messagebox.showerror("Ошибка", f"Отсутствуют столбцы в Excel:\n{', '.join(missing)}"))
                 tab.is_processing = False
                 tab.start_btn.configure(state="normal", text="▶ Начать обработку")
                 return
             
             if required_excel_columns:
-                tab.log(f"\n✓ Проверка обязательных столбцов пройдена ({len(required_excel_columns)} шт.)")
+                log.debug(f"\n✓ Проверка обязательных столбцов пройдена ({len(required_excel_columns)} шт.)")
             
-            # === ПОДГОТОВКА ДАННЫХ ДЛЯ ПАРАЛЛЕЛЬНОЙ ОБРАБОТКИ ===
-            tab.log(f"\n🔄 Подготовка данных для обработки...")
+            # Компилируем шаблоны один раз (в последовательном режиме они же и используются)
+            if use_word:
+                compiled_template = _get_compiled_word_template(word_template, _placeholder_keys(self.PLACEHOLDERS))
+                log.debug(f"\n📐 Шаблон Word разобран: параграфов с плейсхолдерами - {compiled_template.paragraph_count} "
+                          f"(частей документа: {len(compiled_template.stories)})")
+            if use_excel:
+                compiled_excel = _get_compiled_excel_template(excel_template, _placeholder_keys(self.PLACEHOLDERS))
+                log.debug(f"\n📐 Шаблон Excel разобран: ячеек с плейсхолдерами - {len(compiled_excel.cells)}")
+            
+            # Генерация сразу в PDF: документ конвертируется тем же процессом, что его создал
+            generate_pdf_var = getattr(tab, 'generate_pdf', None)
+            pdf_output = bool(use_word and generate_pdf_var is not None and generate_pdf_var.get())
+            merge_pdf_var = getattr(tab, 'merge_generated_pdf', None)
+            pdf_converter_name = self.pdf_converter.get() if hasattr(self, 'pdf_converter') else "auto"
+            if pdf_output:
+                try:
+                    converter_class = resolve_pdf_converter(pdf_converter_name)
+                except ImportError as e:
+                    msg = str(e)
+                    log.error(f"\n❌ {msg}")
+                    self.root.after(0, lambda msg=msg: messagebox.showerror("Ошибка", msg))
+                    tab.is_processing = False
+                    tab.start_btn.configure(state="normal", text="▶ Начать обработку")
+                    return
+                log.info(f"\n📄 Документы Word сохраняются в PDF (конвертер: {converter_class.title})")
+                if merge_pdf_var is not None and merge_pdf_var.get():
+                    pdf_merger = OrderedPdfMerger(os.path.join(output_folder, GENERATED_MERGED_PDF_NAME))
+                    log.info(f"   Объединённый файл: {GENERATED_MERGED_PDF_NAME}")
             
-            # Подготавливаем данные для каждой строки
-            tasks = []
-            for i in range(len(df)):
-                row = df.iloc[i]
-                row_data = {}
-                
-                # Копируем данные из Excel
-                for col in df.columns:
-                    value = row[col]
-                    # Форматируем даты только в колонках с датами
-                    if col in date_columns and pd.notna(value):
-                        row_data[col] = self.to_date(value)
-                    else:
-                        row_data[col] = value
-                
-                # Логируем заголовок строки
-                tab.log(f"\n" + "─" * 60)
-                tab.log(f"📄 Обработка строки {i + 1} из {len(df)}")
-                tab.log("─" * 60)
-                tab.log(f"🔄 Обработка плейсхолдеров:")
-                
-                for ph in self.PLACEHOLDERS:
-                    if not ph.get("active", True):
-                        continue
-                    
-                    value = ""
-                    original_value = ""
-                    
-                    if ph["source_type"] == "excel":
-                        value = row.get(ph["source_value"], "")
-                        if pd.isna(value):
-                            value = ""
-                        else:
-                            value = str(value).strip()
-                        original_value = value
-                    elif ph["source_type"] == "dropdown":
-                        dropdown_key = ph["source_value"]
-                        if dropdown_key in tab.custom_list_vars:
-                            value = tab.custom_list_vars[dropdown_key].get()
-                        original_value = value
-                    elif ph["source_type"] == "date":
-                        value = tab.selected_date.get_date().strftime('%d.%m.%Y')
-                        original_value = value
-                    elif ph["source_type"] == "static":
-                        value = ph["source_value"]
-                        original_value = value
-                    
-                    # Применяем падеж
-                    ph_case = ph.get("case", "nomn")
-                    case_name = RUSSIAN_CASES.get(ph_case, "Именительный").split(" ")[0]
+            # === ПОДГОТОВКА ДАННЫХ ДЛЯ ПАРАЛЛЕЛЬНОЙ ОБРАБОТКИ ===
+            log.info(f"\n🔄 Подготовка данных для обработки...")
+            
+            # В процессы передаются только значения, нужные для заполнения и имени файла
+            filename_column = tab.filename_column.get()
+            active_placeholders = [{"name": ph["name"], "active": True}
+                                   for ph in self.PLACEHOLDERS if ph.get("active", True)]
+            row_keys = list(dict.fromkeys(required_excel_columns + [ph["name"] for ph in active_placeholders]))
+            if filename_column and filename_column not in row_keys and filename_column in source_columns:
+                row_keys.append(filename_column)
+            
+            # Значения списков, даты и статики не зависят от строки - считаем один раз
+            log.debug(f"🔄 Обработка плейсхолдеров:")
+            constant_values = self.resolve_constant_placeholders(tab, log)
+            
+            kinds = (["word"] if use_word else []) + (["excel"] if use_excel else [])
+            
+            # Манифест папки: строки, файлы которых уже созданы с теми же данными, пропускаются
+            force_rebuild_var = getattr(tab, 'force_rebuild', None)
+            force_rebuild = bool(force_rebuild_var is not None and force_rebuild_var.get())
+            config_hash = GenerationManifest.config_digest(
+                {"placeholders": [ph for ph in self.PLACEHOLDERS if ph.get("active", True)],
+                 "filename_pattern": tab.filename_pattern.get(),
+                 "filename_column": filename_column,
+                 "required_columns": required_excel_columns,
+                 "row_keys": row_keys,
+                 "pdf_output": pdf_output},
+                [word_template if use_word else None, excel_template if use_excel else None])
+            manifest = GenerationManifest(output_folder, config_hash, use_previous=not force_rebuild)
+            task_hashes = {}  # {(kind, номер строки): (ключ манифеста, хэш)} для задач в работе
+            name_patterns = {"word": tab.filename_pattern.get(),
+                             "excel": tab.filename_pattern.get().replace('.docx', '.xlsx')}
+            pdf_timing = {'count': 0, 'seconds': 0.0}
+            
+            def iter_tasks(frames):
+                """Задачи по порциям таблицы: склонение и подготовка идут порция за порцией"""
+                start = 0
+                for frame in frames:
+                    # Каждая уникальная пара (значение, падеж) склоняется ровно один раз
+                    declensions = self.decline_unique_values(frame, tab, num_workers, log)
                     
-                    if ph_case != "nomn" and value:
-                        transformed_value = self.apply_case(value, ph_case)
-                        if transformed_value != original_value:
-                            tab.log(f"   ✓ {ph['name']} ({case_name}): '{original_value}' → '{transformed_value}'")
-                            value = transformed_value
-                        else:
-                            tab.log(f"   • {ph['name']} ({case_name}): '{value}'")
+                    # Значения из Excel готовятся целыми колонками
+                    prepared_rows = self.prepare_rows_columnar(frame, row_keys, date_columns, constant_values, declensions)
+                    for i, row_values in enumerate(prepared_rows, start):
+                        row_data = dict(zip(row_keys, row_values))
+                        for kind in kinds:
+                            # Ключ манифеста - имя файла, а не номер строки: вставка строки
+                            # в таблицу не заставляет пересоздавать все следующие
+                            try:
+                                output_name, _ = _generation_filename(i, row_data, name_patterns[kind],
+                                                                      required_excel_columns, filename_column)
+                            except Exception:
+                                # Ошибку шаблона имени покажет обработка строки
+                                yield (kind, i, row_values)
+                                continue
+                            key = manifest.row_key(kind, output_name)
+                            row_hash = manifest.row_hash(kind, row_values)
+                            if manifest.is_up_to_date(key, row_hash):
+                                if pdf_merger is not None and kind == "word":
+                                    pdf_merger.add(i, os.path.join(output_folder, manifest.filename_of(key)))
+                                continue
+                            task_hashes[(kind, i)] = (key, row_hash)
+                            yield (kind, i, row_values)
+                    start += len(frame)
+            
+            def remember_result(result):
+                """Заносит созданный файл в манифест"""
+                task_key = task_hashes.pop((result.get('kind'), result['index']), None)
+                if result['success'] and task_key is not None:
+                    manifest.record(task_key[0], task_key[1], result['filename'])
+                if 'pdf_seconds' in result:
+                    pdf_timing['count'] += 1
+                    pdf_timing['seconds'] += result['pdf_seconds']
+                if pdf_merger is not None and result.get('kind') == "word":
+                    if result['success']:
+                        pdf_merger.add(result['index'], os.path.join(output_folder, result['filename']))
                     else:
-                        tab.log(f"   • {ph['name']} ({case_name}): '{value}'")
-                    
-                    row_data[ph["name"]] = value
-                
-                # Создаём задачи для Word шаблона (если заполнен)
-                if use_word:
-                    task_word = (i, row_data, word_template, output_folder, 
-                               tab.filename_pattern.get(), required_excel_columns,
-                               self.PLACEHOLDERS, tab.filename_column.get(), "word")
-                    tasks.append(task_word)
-                
-                # Создаём задачи для Excel шаблона (если заполнен)
-                if use_excel:
-                    # Изменяем расширение в паттерне на .xlsx
-                    excel_pattern = tab.filename_pattern.get().replace('.docx', '.xlsx')
-                    task_excel = (i, row_data, excel_template, output_folder, 
-                                excel_pattern, required_excel_columns,
-                                self.PLACEHOLDERS, tab.filename_column.get(), "excel")
-                    tasks.append(task_excel)
+                        pdf_merger.skip(result['index'])
             
-            tab.log(f"\n   ✓ Подготовлено {len(tasks)} задач\n")
+            if excel_stream is not None:
+                # Задачи создаются по мере чтения, общее количество известно только примерно
+                tasks = iter_tasks(excel_stream.chunks(EXCEL_STREAM_CHUNK_ROWS))
+                total_tasks = excel_stream.row_count * len(kinds)
+            else:
+                tasks = list(iter_tasks([df]))
+                total_tasks = len(tasks)
+            
+            # Описание задания передаётся процессам один раз через файл
+            job_id, job_spec_path = _write_generation_job({
+                'word_template': word_template if use_word else None,
+                'excel_template': excel_template if use_excel else None,
+                'output_folder': output_folder,
+                'filename_pattern': name_patterns["word"],
+                # Изменяем расширение в паттерне на .xlsx
+                'excel_pattern': name_patterns["excel"],
+                'required_columns': required_excel_columns,
+                'placeholders': active_placeholders,
+                'filename_column': filename_column,
+                'row_keys': row_keys,
+                'log_level': log_level,
+                'word_backend': self.word_backend.get(),
+                'pdf_output': pdf_output,
+                'pdf_converter': pdf_converter_name,
+            })
+            
+            if excel_stream is not None:
+                log.info(f"\n   ✓ Задачи создаются по мере чтения (~{total_tasks})\n")
+            else:
+                log.info(f"\n   ✓ Подготовлено {total_tasks} задач\n")
+                if manifest.up_to_date:
+                    log.info(f"   ✓ Без изменений с прошлого запуска: {manifest.up_to_date} файлов (пропущены)\n")
+            if force_rebuild:
+                log.info("   🔁 Полная пересборка: манифест прошлого запуска не учитывается\n")
+            elif manifest.resumed:
+                log.info(f"   ↻ Продолжение прерванного запуска: в журнале {manifest.resumed} готовых файлов\n")
+            if manifest.incomplete:
+                log.warn(f"   ⚠ Недописанных или повреждённых файлов прошлого запуска: {manifest.incomplete} (будут созданы заново)\n")
             
             # === ПАРАЛЛЕЛЬНАЯ ОБРАБОТКА ===
             processed = 0
@@ -9420,19 +12173,18 @@ class GenerationDocApp:
             
             if num_workers == 1:
                 # Последовательная обработка
-                tab.log("📄 Последовательная обработка...")
+                log.info("📄 Последовательная обработка...")
                 for task in tasks:
                     # Проверяем флаг остановки
                     if tab.should_stop:
-                        tab.log("\n⚠️ Остановка обработки...")
+                        log.info("\n⚠️ Остановка обработки...")
                         break
                     
-                    # Определяем тип задачи по последнему элементу кортежа
-                    task_type = task[-1]
-                    if task_type == "word":
-                        result = _process_single_document(task[:-1])  # Убираем маркер типа
-                    else:
-                        result = _process_single_excel_document(task[:-1])
+                    result = _run_generation_task(job_id, job_spec_path, *task)
+                    remember_result(result)
+                    
+                    for log_msg in result.get('logs') or ():
+                        tab.log(log_msg)
                     
                     if result['success']:
                         processed += 1
@@ -9441,106 +12193,174 @@ class GenerationDocApp:
                         
                         # Обновляем прогресс (если доступно)
                         if hasattr(tab, 'update_progress'):
-                            tab.update_progress(processed, len(tasks), f"Обработка документов: {processed}/{len(tasks)}")
+                            tab.update_progress(processed, max(total_tasks, processed), f"Обработка документов: {processed}/{max(total_tasks, processed)}")
                         
                         if processed % 20 == 0:
-                            tab.log(f"   ✓ Обработано {processed}/{len(tasks)} документов...")
+                            log.debug(f"   ✓ Обработано {processed}/{total_tasks} документов...")
                     else:
                         errors.append(f"Строка {result['index'] + 1}: {result['error']}")
             else:
                 # Параллельная обработка
-                tab.log(f"⚡ Параллельная обработка на {num_workers} процессах...")
-                tab.log("")
+                log.info(f"⚡ Параллельная обработка на {num_workers} процессах...")
+                log.info("")
+                
+                from concurrent.futures import wait, FIRST_COMPLETED
+                
+                # Пул процессов живёт всё время работы приложения
+                executor = generation_worker_pool.acquire(num_workers)
+                
+                # Строки отправляются пачками, в работе одновременно не больше
+                # max_in_flight пачек - память не растёт вместе с размером таблицы
+                if total_tasks:
+                    chunk_size = max(1, min(GENERATION_CHUNK_SIZE, total_tasks // (num_workers * 4)))
+                else:
+                    chunk_size = GENERATION_CHUNK_SIZE
+                max_in_flight = num_workers * 2
+                task_iter = iter(tasks)
+                in_flight = {}
+                
+                def submit_next_chunk():
+                    chunk = list(itertools.islice(task_iter, chunk_size))
+                    if not chunk:
+                        return False
+                    future = executor.submit(_run_generation_chunk, job_id, job_spec_path, chunk)
+                    in_flight[future] = chunk
+                    return True
                 
-                executor = ProcessPoolExecutor(max_workers=num_workers)
-                _register_executor(executor)  # Регистрируем executor
                 try:
-                    # Отправляем задачи на выполнение с учётом типа
-                    futures = {}
-                    for task in tasks:
-                        task_type = task[-1]
-                        if task_type == "word":
-                            future = executor.submit(_process_single_document, task[:-1])
-                        else:
-                            future = executor.submit(_process_single_excel_document, task[:-1])
-                        futures[future] = task
+                    while len(in_flight) < max_in_flight and submit_next_chunk():
+                        pass
                     
-                    for future in as_completed(futures):
+                    while in_flight:
                         # Проверяем флаг остановки
                         if tab.should_stop:
-                            tab.log("\n⚠️ Остановка обработки...")
-                            tab.log("   Отменяем оставшиеся задачи...")
-                            # Принудительно останавливаем executor
-                            executor.shutdown(wait=False, cancel_futures=True)
-                            tab.log("   ✓ Остановка завершена")
+                            log.info("\n⚠️ Остановка обработки...")
+                            log.info("   Отменяем оставшиеся задачи...")
+                            # Отменяем только свои задачи, пул остаётся запущенным
+                            for pending in in_flight:
+                                pending.cancel()
+                            log.info("   ✓ Остановка завершена")
                             break
                         
-                        try:
-                            # Используем короткий таймаут чтобы быстрее реагировать на остановку
-                            result = future.result(timeout=60)
-                            
-                            # Выводим логи из результата
-                            for log_msg in result.get('logs', []):
-                                tab.log(log_msg)
+                        # Короткий таймаут, чтобы быстрее реагировать на остановку
+                        done, _ = wait(in_flight, timeout=0.5, return_when=FIRST_COMPLETED)
+                        
+                        for future in done:
+                            chunk = in_flight.pop(future)
+                            try:
+                                chunk_results = future.result()
+                            except Exception as e:
+                                if not tab.should_stop:
+                                    for task in chunk:
+                                        errors.append(f"Строка {task[1] + 1}: Критическая ошибка - {str(e)}")
+                                chunk_results = []
                             
-                            if result['success']:
-                                processed += 1
-                                if result['is_incomplete']:
-                                    with_empty += 1
+                            for result in chunk_results:
+                                remember_result(result)
                                 
-                                # Обновляем прогресс (если доступно)
-                                if hasattr(tab, 'update_progress'):
-                                    tab.update_progress(processed, len(tasks), f"Обработка документов: {processed}/{len(tasks)}")
+                                # Выводим логи из результата
+                                for log_msg in result.get('logs') or ():
+                                    tab.log(log_msg)
                                 
-                                if processed % 20 == 0:
-                                    tab.log(f"✓ Обработано {processed}/{len(tasks)} документов...")
-                                    gc.collect()
-                            else:
-                                errors.append(f"Строка {result['index'] + 1}: {result['error']}")
-                        
-                        except Exception as e:
+                                if result['success']:
+                                    processed += 1
+                                    if result['is_incomplete']:
+                                        with_empty += 1
+                                    
+                                    # Обновляем прогресс (если доступно)
+                                    if hasattr(tab, 'update_progress'):
+                                        tab.update_progress(processed, max(total_tasks, processed), f"Обработка документов: {processed}/{max(total_tasks, processed)}")
+                                    
+                                    if processed % 20 == 0:
+                                        log.debug(f"✓ Обработано {processed}/{total_tasks} документов...")
+                                else:
+                                    errors.append(f"Строка {result['index'] + 1}: {result['error']}")
+                            
                             if not tab.should_stop:
-                                task = futures[future]
-                                errors.append(f"Строка {task[0] + 1}: Критическая ошибка - {str(e)}")
+                                submit_next_chunk()
                 finally:
-                    # Гарантируем остановку executor
-                    try:
-                        if not tab.should_stop:
-                            executor.shutdown(wait=True)
-                        else:
-                            executor.shutdown(wait=False, cancel_futures=True)
-                    finally:
-                        _unregister_executor(executor)  # Удаляем из реестра
+                    # Не оставляем в пуле задачи прерванного задания
+                    for pending in in_flight:
+                        pending.cancel()
+                    generation_worker_pool.release(executor)
+            
+            # При потоковом чтении точное количество задач известно только после прочтения таблицы
+            if excel_stream is not None and not tab.should_stop:
+                total_tasks = processed + len(errors)
+            
+            # Объединённый PDF: дописываются файлы, оставшиеся в буфере перестановки
+            if pdf_merger is not None:
+                try:
+                    merged_path = pdf_merger.close()
+                    if merged_path:
+                        pages = f", страниц: {pdf_merger.page_count}" if pdf_merger.page_count else ""
+                        partial = " (частично - обработка остановлена)" if tab.should_stop else ""
+                        log.info(f"\n📚 Объединённый PDF{partial}: {pdf_merger.document_count} документов{pages}")
+                    for failed_path in pdf_merger.failed:
+                        log.warn(f"   ⚠ Не удалось добавить в объединённый PDF: {os.path.basename(failed_path)}")
+                except Exception as e:
+                    log.error(f"\n❌ Не удалось сохранить объединённый PDF: {e}")
+                pdf_merger = None
+            
+            # Манифест: файлы исчезнувших или переименованных строк помечаются устаревшими
+            new_stale = manifest.finish(complete=not tab.should_stop)
+            try:
+                manifest.save()
+            except OSError as e:
+                log.warn(f"\n⚠️ Не удалось сохранить манифест папки: {e}")
             
             # === ИТОГИ ===
-            tab.log("\n" + "═" * 60)
+            log.info("\n" + "═" * 60)
             if tab.should_stop:
-                tab.log("⏹ ОБРАБОТКА ОСТАНОВЛЕНА ПОЛЬЗОВАТЕЛЕМ")
+                log.info("⏹ ОБРАБОТКА ОСТАНОВЛЕНА ПОЛЬЗОВАТЕЛЕМ")
+                log.info("   Повторный запуск продолжит с места остановки")
             elif errors:
-                tab.log("⚠ ОБРАБОТКА ЗАВЕРШЕНА С ОШИБКАМИ")
+                log.warn("⚠ ОБРАБОТКА ЗАВЕРШЕНА С ОШИБКАМИ")
             else:
-                tab.log("✅ ОБРАБОТКА ЗАВЕРШЕНА УСПЕШНО!")
-            tab.log("═" * 60)
-            tab.log(f"📊 Статистика:")
-            tab.log(f"   Всего обработано:          {processed} файлов")
-            if len(tasks) > processed:
-                tab.log(f"   Не обработано:             {len(tasks) - processed} файлов")
-            tab.log(f"   Из них с пометкой _пусто:  {with_empty} файлов")
+                log.info("✅ ОБРАБОТКА ЗАВЕРШЕНА УСПЕШНО!")
+            log.info("═" * 60)
+            log.info(f"📊 Статистика:")
+            log.info(f"   Всего обработано:          {processed} файлов")
+            if total_tasks > processed:
+                log.info(f"   Не обработано:             {total_tasks - processed} файлов")
+            log.info(f"   Из них с пометкой _пусто:  {with_empty} файлов")
+            if manifest.up_to_date:
+                log.info(f"   Без изменений (пропущено): {manifest.up_to_date} файлов")
+            if pdf_timing['count']:
+                log.info(f"   Конвертация в PDF:         {pdf_timing['count']} файлов, "
+                         f"в среднем {pdf_timing['seconds'] / pdf_timing['count']:.2f} с")
             if errors:
-                tab.log(f"   Ошибок:                    {len(errors)}")
-            tab.log(f"\n📁 Папка сохранения:")
-            tab.log(f"   {os.path.abspath(output_folder)}")
+                log.info(f"   Ошибок:                    {len(errors)}")
+            
+            # Эффективность кэша склонений за это задание
+            current_stats = declension_cache.stats()
+            phrase_hits = current_stats['hits'] - declension_stats['hits']
+            phrase_misses = current_stats['misses'] - declension_stats['misses']
+            if phrase_hits or phrase_misses:
+                word_hits = current_stats['word_hits'] - declension_stats['word_hits']
+                word_misses = current_stats['word_misses'] - declension_stats['word_misses']
+                log.info(f"   Кэш склонений (фразы):     {phrase_hits} попаданий / {phrase_misses} промахов")
+                log.info(f"   Кэш склонений (слова):     {word_hits} попаданий / {word_misses} промахов")
+            log.info(f"\n📁 Папка сохранения:")
+            log.info(f"   {os.path.abspath(output_folder)}")
+            
+            if new_stale:
+                log.warn(f"\n⚠ Устаревшие файлы (строк больше нет в таблице или изменилось имя): {len(new_stale)}")
+                for name in new_stale[:10]:
+                    log.warn(f"   • {name}")
+                if len(new_stale) > 10:
+                    log.warn(f"   ... и ещё {len(new_stale) - 10} (список в {GENERATION_MANIFEST_NAME})")
             
             if errors and len(errors) <= 10:
-                tab.log(f"\n❌ Ошибки:")
+                log.error(f"\n❌ Ошибки:")
                 for error in errors:
-                    tab.log(f"   • {error}")
+                    log.error(f"   • {error}")
             elif errors:
-                tab.log(f"\n❌ Ошибки (первые 10 из {len(errors)}):")
+                log.error(f"\n❌ Ошибки (первые 10 из {len(errors)}):")
                 for error in errors[:10]:
-                    tab.log(f"   • {error}")
+                    log.error(f"   • {error}")
             
-            tab.log("═" * 60)
+            log.info("═" * 60)
             
             # Освобождаем память
             gc.collect()
@@ -9548,7 +12368,7 @@ class GenerationDocApp:
             if tab.should_stop:
                 self.root.after(0, lambda: messagebox.showinfo(
                     "Остановлено", 
-                    f"Обработка остановлена пользователем.\n\nОбработано файлов: {processed} из {len(tasks)}\n\nПапка: {output_folder}"
+                    f"Обработка остановлена пользователем.\n\nОбработано файлов: {processed} из {total_tasks}\n\nПапка: {output_folder}"
                 ))
             elif errors:
                 self.root.after(0, lambda: messagebox.showwarning(
@@ -9563,21 +12383,238 @@ class GenerationDocApp:
             
         except Exception as e:
             if not tab.should_stop:
-                tab.log("\n" + "═" * 60)
-                tab.log("❌ КРИТИЧЕСКАЯ ОШИБКА!")
-                tab.log("═" * 60)
-                tab.log(f"{e}")
+                log.error("\n" + "═" * 60)
+                log.error("❌ КРИТИЧЕСКАЯ ОШИБКА!")
+                log.error("═" * 60)
+                log.error(f"{e}")
                 import traceback
-                tab.log(traceback.format_exc())
-                tab.log("═" * 60)
-                self.root.after(0, lambda: messagebox.showerror("Ошибка", f"Произошла ошибка:\n{e}"))
+                log.error(traceback.format_exc())
+                log.error("═" * 60)
+                msg = str(e)
+                self.root.after(0, lambda msg=msg: messagebox.showerror("Ошибка", f"Произошла ошибка:\n{msg}"))
         
         finally:
+            if excel_stream is not None:
+                excel_stream.close()
+            if manifest is not None:
+                # После ошибки журнал остаётся: следующий запуск продолжит с этого места
+                manifest.close_journal()
+            if job_spec_path:
+                try:
+                    os.remove(job_spec_path)
+                except OSError:
+                    pass
+            if getattr(tab, 'log_sink', None) is not None:
+                tab.log_sink.stop_file()
             tab.is_processing = False
             tab.should_stop = False
             tab.start_btn.configure(text="▶ Начать обработку")
             gc.collect()
     
+    def resolve_constant_placeholders(self, tab, log=None):
+        """
+        Значения плейсхолдеров, не зависящих от строки Excel (список, дата, статика).
+        Вычисляются один раз на задание вместе с падежом.
+        
+        Returns:
+            dict: {индекс плейсхолдера в self.PLACEHOLDERS: значение}
+        """
+        if log is None:
+            log = LevelLogger(tab.log)
+        values = {}
+        selected_date = None
+        
+        for index, ph in enumerate(self.PLACEHOLDERS):
+            if not ph.get("active", True):
+                continue
+            
+            ph_case = ph.get("case", "nomn")
+            case_name = RUSSIAN_CASES.get(ph_case, "Именительный").split(" ")[0]
+            
+            if ph["source_type"] == "excel":
+                if log.debug_enabled:
+                    log.debug(f"   • {ph['name']} ({case_name}): столбец '{ph['source_value']}'")
+                continue
+            
+            value = ""
+            if ph["source_type"] == "dropdown":
+                dropdown_key = ph["source_value"]
+                if dropdown_key in tab.custom_list_vars:
+                    value = tab.custom_list_vars[dropdown_key].get()
+            elif ph["source_type"] == "date":
+                if selected_date is None:
+                    selected_date = tab.selected_date.get_date().strftime('%d.%m.%Y')
+                value = selected_date
+            elif ph["source_type"] == "static":
+                value = ph["source_value"]
+            
+            # Применяем падеж
+            if ph_case != "nomn" and value:
+                transformed_value = self.apply_case(value, ph_case)
+                if transformed_value != value:
+                    if log.debug_enabled:
+                        log.debug(f"   ✓ {ph['name']} ({case_name}): '{value}' → '{transformed_value}'")
+                    value = transformed_value
+                elif log.debug_enabled:
+                    log.debug(f"   • {ph['name']} ({case_name}): '{value}'")
+            elif log.debug_enabled:
+                log.debug(f"   • {ph['name']} ({case_name}): '{value}'")
+            
+            values[index] = value
+        
+        return values
+    
+    def decline_unique_values(self, df, tab, num_workers=1, log=None):
+        """
+        Предварительное склонение значений из Excel.
+        
+        Собирает уникальные пары (значение, падеж) по всем плейсхолдерам с падежом,
+        отличным от именительного, и склоняет каждую пару ровно один раз. Пары, которых
+        нет в кэше, при большом количестве распределяются по пулу процессов.
+        Стоимость склонения зависит от числа уникальных значений, а не строк.
+        
+        Returns:
+            dict: {(значение, падеж): результат}
+        """
+        import pandas as pd
+        
+        if log is None:
+            log = LevelLogger(tab.log)
+        pairs = set()
+        for ph in self.PLACEHOLDERS:
+            ph_case = ph.get("case", "nomn")
+            if not ph.get("active", True) or ph["source_type"] != "excel" or ph_case == "nomn":
+                continue
+            if ph["source_value"] not in df.columns:
+                continue
+            strings = self.excel_placeholder_strings(df[ph["source_value"]])
+            pairs.update((value, ph_case) for value in pd.unique(strings) if value)
+        
+        if not pairs:
+            return {}
+        
+        declensions = {}
+        misses = []
+        for value, case in pairs:
+            cached = declension_cache.get(value, case)
+            if cached is None:
+                misses.append((value, case))
+            else:
+                declensions[(value, case)] = cached
+        
+        if misses:
+            if num_workers > 1 and len(misses) >= DECLENSION_POOL_THRESHOLD:
+                executor = generation_worker_pool.acquire(num_workers)
+                try:
+                    chunk_size = max(1, -(-len(misses) // (num_workers * 4)))
+                    chunks = [misses[i:i + chunk_size] for i in range(0, len(misses), chunk_size)]
+                    results = [result for chunk_results in executor.map(_decline_values_chunk, chunks)
+                               for result in chunk_results]
+                finally:
+                    generation_worker_pool.release(executor)
+            else:
+                results = [self._apply_case_words(value, case) for value, case in misses]
+            
+            for pair, result in zip(misses, results):
+                declension_cache.put(pair[0], pair[1], result)
+                declensions[pair] = result
+        
+        log.debug(f"   🔤 Склонение: уникальных значений {len(pairs)}, из них новых {len(misses)}")
+        return declensions
+    
+    def prepare_rows_columnar(self, df, row_keys, date_columns, constant_values, declensions=None):
+        """
+        Подготовка значений всех строк целыми колонками (без обхода df.iloc[i]).
+        
+        Args:
+            df: DataFrame с данными
+            row_keys: порядок значений в кортеже строки
+            date_columns: колонки с датами (приводятся к дд.мм.гггг)
+            constant_values: результат resolve_constant_placeholders
+            declensions: результат decline_unique_values
+        
+        Returns:
+            list: кортежи значений строк в порядке row_keys
+        """
+        n = len(df)
+        if not row_keys:
+            return [()] * n
+        
+        columns = {}
+        
+        # Данные Excel (обязательные столбцы и столбец для имени файла)
+        for key in row_keys:
+            if key in df.columns:
+                series = df[key]
+                if key in date_columns:
+                    series = self.normalize_date_column(series)
+                columns[key] = series.tolist()
+        
+        # Плейсхолдеры (в порядке настройки - более поздние перекрывают ранние)
+        for index, ph in enumerate(self.PLACEHOLDERS):
+            if not ph.get("active", True):
+                continue
+            if ph["source_type"] == "excel":
+                columns[ph["name"]] = self.excel_placeholder_column(df, ph, declensions)
+            else:
+                columns[ph["name"]] = itertools.repeat(constant_values.get(index, ""), n)
+        
+        return list(zip(*(columns.get(key, itertools.repeat("", n)) for key in row_keys)))
+    
+    def excel_placeholder_column(self, df, ph, declensions=None):
+        """Значения плейсхолдера из столбца Excel для всех строк сразу (с учётом падежа)"""
+        import pandas as pd
+        
+        source = ph["source_value"]
+        if source not in df.columns:
+            return [""] * len(df)
+        
+        strings = self.excel_placeholder_strings(df[source])
+        
+        # Применяем падеж: склонения сопоставляются уникальным значениям колонки
+        ph_case = ph.get("case", "nomn")
+        if ph_case != "nomn":
+            declensions = declensions or {}
+            mapping = {}
+            for value in pd.unique(strings):
+                if not value:
+                    mapping[value] = value
+                elif (value, ph_case) in declensions:
+                    mapping[value] = declensions[(value, ph_case)]
+                else:
+                    mapping[value] = self.apply_case(value, ph_case)
+            strings = strings.map(mapping)
+        
+        return strings.tolist()
+    
+    @staticmethod
+    def excel_placeholder_strings(series):
+        """Колонка Excel в виде строк без пробелов по краям (пустые ячейки - пустая строка)"""
+        import pandas as pd
+        
+        if pd.api.types.is_datetime64_any_dtype(series):
+            strings = series.dt.strftime('%Y-%m-%d %H:%M:%S')
+        else:
+            strings = series.astype(str)
+        return strings.str.strip().where(series.notna(), "")
+    
+    def normalize_date_column(self, series):
+        """
+        Приведение колонки с датами к дд.мм.гггг одним векторным преобразованием.
+        Пустые значения остаются как есть (как и при построчном to_date).
+        """
+        import pandas as pd
+        
+        notna = series.notna()
+        if pd.api.types.is_datetime64_any_dtype(series):
+            converted = series.dt.strftime('%d.%m.%Y')
+        else:
+            # Смешанная колонка: to_date вызывается только для уникальных значений
+            mapping = {value: self.to_date(value) for value in pd.unique(series[notna])}
+            converted = series.map(mapping)
+        
+        return converted.astype(object).where(notna, series)
+    
     def decline_female_surname(self, surname, case="nomn"):
         """
         Склонение женской фамилии по правилам русского языка
@@ -9898,6 +12935,16 @@ class GenerationDocApp:
         
         value = str(value).strip()
         
+        cached = declension_cache.get(value, case)
+        if cached is not None:
+            return cached
+        
+        result = self._apply_case_words(value, case)
+        declension_cache.put(value, case, result)
+        return result
+    
+    def _apply_case_words(self, value, case):
+        """Пословное склонение фразы (без кэша фраз, см. apply_case)"""
         words = value.split()
         birth_year_indices = set()  # Индексы слов "года" и "рождения"
         
@@ -9914,7 +12961,7 @@ class GenerationDocApp:
         for word in words:
             clean_word = word.rstrip(',.;:!?')
             try:
-                parses = self.morph.parse(clean_word.lower())
+                parses = declension_cache.parse(self.morph, clean_word.lower())
                 if parses:
                     # Сохраняем ВСЕ возможные разборы слова
                     word_parses = []
@@ -10184,12 +13231,7 @@ class GenerationDocApp:
                     result_word = declined
             
             if not result_word:
-                parses = self.morph.parse(word_lower)
-                if parses:
-                    p = parses[0]
-                    inflected = p.inflect({case})
-                    if inflected:
-                        result_word = inflected.word
+                result_word = declension_cache.inflect(self.morph, word_lower, case)
             
             if not result_word:
                 result_word = word_lower
@@ -10271,31 +13313,13 @@ class GenerationDocApp:
     @staticmethod
     def replace_placeholders_in_paragraph(paragraph, replacements: dict):
         """Безопасная замена всех плейсхолдеров в параграфе с сохранением изображений и форматирования"""
-        from docx.oxml.ns import qn
-        
-        for run in paragraph.runs:
-            has_objects = False
-            if hasattr(run._element, 'xpath'):
-                drawings = run._element.xpath('.//w:drawing')
-                pictures = run._element.xpath('.//w:pict')  # старый формат изображений
-                has_objects = len(drawings) > 0 or len(pictures) > 0
-            
-            if has_objects:
-                for text_elem in run._element.findall(qn('w:t')):
-                    if text_elem.text:
-                        modified_text = text_elem.text
-                        for placeholder, replacement in replacements.items():
-                            modified_text = modified_text.replace(placeholder, str(replacement))
-                        text_elem.text = modified_text
-            else:
-                text = run.text
-                for placeholder, replacement in replacements.items():
-                    text = text.replace(placeholder, str(replacement))
-                run.text = text
+        matcher = _get_placeholder_matcher(tuple(replacements))
+        values = {key: str(value) for key, value in replacements.items()}
+        _replace_placeholders_in_runs(paragraph, values, matcher)
     
     def open_merge_window(self):
         """Открыть окно объединения документов"""
-        MergeDocumentsWindow(self.root)
+        MergeDocumentsWindow(self.root, log_level=self.log_level)
     
     def open_excel_constructor(self):
         """Открыть конструктор Excel"""
@@ -10414,78 +13438,239 @@ class GenerationDocApp:
     def pdf_has_text_layer(pdf_path, log_callback=None):
         """Проверяет, содержит ли PDF текстовый слой
         
+        Быстрая предварительная проверка: смотрит до PDF_TEXT_SAMPLE_PAGES страниц,
+        равномерно распределённых по документу, и останавливается на первой странице-скане.
+        Вердикт кэшируется по хэшу содержимого файла.
+        
+        Это эвристика: в длинном документе сканы, попавшие только на непроверенные
+        страницы, не обнаруживаются, и результат будет True. False же всегда
+        означает найденную страницу-скан. Поэтому функция годится только для
+        быстрой предпроверки "да/нет"; какие страницы распознавать, решает
+        pdf_pages_needing_ocr по всем страницам.
+        
         Args:
             pdf_path: путь к PDF файлу
             log_callback: функция для логирования (опционально)
             
         Returns:
-            bool: True если есть извлекаемый текст, False если PDF - скан/изображение
+            bool: True если в выборке у всех страниц есть текст, False если найден скан
+                  (постранично - см. pdf_pages_needing_ocr)
         """
-        if not PYMUPDF_AVAILABLE:
-            # Fallback через pypdf
-            try:
-                from pypdf import PdfReader
-                reader = PdfReader(pdf_path)
-                total_text = ""
-                page_count = len(reader.pages)
-                for page in reader.pages:
-                    text = page.extract_text()
-                    if text:
-                        total_text += text.strip()
-                
-                # Увеличенный порог: минимум 200 символов полезного текста на страницу
-                # (исключаем мусорные символы, номера страниц и т.д.)
-                useful_text = ''.join(c for c in total_text if c.isalnum() or c.isspace())
-                avg_text_per_page = len(useful_text.strip()) / max(page_count, 1)
-                
-                if log_callback:
-                    log_callback(f"    [DEBUG] Страниц: {page_count}, символов: {len(useful_text.strip())}, в среднем на страницу: {int(avg_text_per_page)}")
-                
-                # Если меньше 200 символов на страницу - считаем сканом
-                return avg_text_per_page > 200
-            except:
-                # Если не можем проверить через pypdf, считаем сканом (нужен OCR)
-                return False
+        # Полная постраничная проверка, если уже была, даёт точный ответ
+        pages = pdf_text_layer_cache.get(pdf_path, 'pages')
+        if pages is not None:
+            return not pages
+        has_text = pdf_text_layer_cache.get(pdf_path, 'has_text')
+        if has_text is not None:
+            return has_text
+        
+        try:
+            page_count, needs_ocr, close = GenerationDocApp._open_page_classifier(pdf_path)
+        except:
+            # Если не можем проверить, считаем что нужен OCR
+            return False
         
         try:
+            if page_count <= PDF_TEXT_SAMPLE_PAGES:
+                sample = list(range(page_count))
+            else:
+                step = (page_count - 1) / (PDF_TEXT_SAMPLE_PAGES - 1)
+                sample = sorted({round(i * step) for i in range(PDF_TEXT_SAMPLE_PAGES)})
+            
+            has_text = True
+            checked = 0
+            for page_idx in sample:
+                checked += 1
+                if needs_ocr(page_idx):
+                    has_text = False
+                    break
+        except:
+            return False
+        finally:
+            close()
+        
+        if log_callback:
+            log_callback(f"    [DEBUG] Страниц: {page_count}, проверено: {checked}, текстовый слой: {'есть' if has_text else 'нет'}")
+        
+        pdf_text_layer_cache.put(pdf_path, 'has_text', has_text)
+        return has_text
+    
+    @staticmethod
+    def _useful_text_length(text):
+        """Количество полезных символов (буквы, цифры, пробелы) без краевых пробелов"""
+        return len(''.join(ch for ch in text if ch.isalnum() or ch.isspace()).strip())
+    
+    @staticmethod
+    def _page_needs_ocr(page):
+        """Нужно ли распознавание странице PyMuPDF
+        
+        Сначала дешёвые признаки (изображения, шрифты, площадь под изображениями),
+        текст извлекается только для страниц, где крупные изображения соседствуют со шрифтами.
+        """
+        # get_image_info видит и встроенные в поток содержимого изображения (BI/ID/EI),
+        # которых нет в ресурсах страницы и которые не возвращает get_images
+        images = page.get_image_info()
+        if not images:
+            # Без изображений распознавать нечего
+            return False
+        if not page.get_fonts(full=True):
+            # Изображения без единого шрифта - скан без текста
+            return True
+        
+        # Есть и шрифты, и изображения: небольшие картинки (логотип, печать) - не скан
+        page_area = abs(page.rect) or 1
+        image_area = sum(abs(fitz.Rect(info['bbox'])) for info in images)
+        if image_area / page_area < PDF_SCAN_IMAGE_COVERAGE:
+            return False
+        
+        # Скан во всю страницу: есть ли на нём уже распознанный текст
+        return GenerationDocApp._useful_text_length(page.get_text()) < OCR_PAGE_MIN_TEXT
+    
+    @staticmethod
+    def _open_page_classifier(pdf_path):
+        """Открывает PDF для постраничной проверки
+        
+        Returns:
+            tuple: (число страниц, функция "нужен ли OCR странице с номером", закрытие документа)
+        """
+        if PYMUPDF_AVAILABLE:
             doc = fitz.open(pdf_path)
-            total_text = ""
-            has_images = False
-            page_count = doc.page_count
-            
-            for page in doc:
-                # Получаем текст
-                total_text += page.get_text()
-                
-                # Проверяем наличие изображений
-                images = page.get_images()
-                if images:
-                    has_images = True
-            
-            doc.close()
-            
-            # Фильтруем только полезный текст (буквы, цифры, пробелы)
-            useful_text = ''.join(c for c in total_text if c.isalnum() or c.isspace())
-            avg_text_per_page = len(useful_text.strip()) / max(page_count, 1)
-            
-            if log_callback:
-                log_callback(f"    [DEBUG] Страниц: {page_count}, символов: {len(useful_text.strip())}, в среднем на страницу: {int(avg_text_per_page)}, есть изображения: {has_images}")
-            
-            # Если есть изображения и мало текста - это скан
-            if has_images and avg_text_per_page < 200:
-                return False
+            return doc.page_count, lambda page_idx: GenerationDocApp._page_needs_ocr(doc[page_idx]), doc.close
+        
+        # Fallback через pypdf (без информации об изображениях)
+        from pypdf import PdfReader
+        reader = PdfReader(pdf_path)
+        
+        def needs_ocr(page_idx):
+            text = reader.pages[page_idx].extract_text() or ""
+            return GenerationDocApp._useful_text_length(text) < OCR_PAGE_MIN_TEXT
+        
+        return len(reader.pages), needs_ocr, lambda: None
+    
+    @staticmethod
+    def pdf_pages_needing_ocr(pdf_path, log_callback=None):
+        """Определяет постранично, каким страницам PDF нужно распознавание
+        
+        Страница считается сканом, если изображения занимают не меньше
+        PDF_SCAN_IMAGE_COVERAGE её площади и на ней меньше OCR_PAGE_MIN_TEXT
+        полезных символов (или на ней нет ни одного шрифта). Страницы без
+        изображений не распознаются. Результат кэшируется по хэшу содержимого файла.
+        
+        Просматриваются все страницы (выборка pdf_has_text_layer пропустила бы сканы
+        на непроверенных страницах); на большинстве страниц проверка обходится
+        признаками изображений и шрифтов без извлечения текста.
+        
+        Args:
+            pdf_path: путь к PDF файлу
+            log_callback: функция для логирования (опционально)
             
-            # Если текста меньше 200 символов на страницу - считаем сканом
-            return avg_text_per_page > 200
+        Returns:
+            list: номера страниц (с 0), которым нужен OCR; пустой список - OCR не нужен
+        """
+        pages = pdf_text_layer_cache.get(pdf_path, 'pages')
+        if pages is not None:
+            return list(pages)
+        
+        try:
+            page_count, needs_ocr, close = GenerationDocApp._open_page_classifier(pdf_path)
+            try:
+                pages = [page_idx for page_idx in range(page_count) if needs_ocr(page_idx)]
+            finally:
+                close()
         except:
             # Если не можем проверить, считаем что нужен OCR
-            return False
+            return GenerationDocApp._all_pdf_pages(pdf_path)
+        
+        if log_callback:
+            log_callback(f"    [DEBUG] Страниц: {page_count}, без текстового слоя: {len(pages)}")
+        
+        pdf_text_layer_cache.put(pdf_path, 'pages', tuple(pages))
+        return pages
+    
+    @staticmethod
+    def _all_pdf_pages(pdf_path):
+        """Номера всех страниц PDF (если файл не открывается - первая страница)"""
+        try:
+            if PYMUPDF_AVAILABLE:
+                with fitz.open(pdf_path) as doc:
+                    return list(range(doc.page_count))
+            from pypdf import PdfReader
+            return list(range(len(PdfReader(pdf_path).pages)))
+        except Exception:
+            return [0]
+    
+    @staticmethod
+    def _draw_ocr_text_layer(c, lines, font_name, scale_x, scale_y, page_height):
+        """Рисует на текущей странице canvas невидимый текст распознанных строк
+        
+        lines - [(текст, x0, y0, x1, y1)] в пикселях изображения страницы.
+        """
+        if not lines:
+            return
+        
+        # Сохраняем состояние и устанавливаем режим невидимого текста
+        # PDF оператор "3 Tr" = invisible text (только для поиска/копирования)
+        c.saveState()
+        c._code.append('3 Tr')  # Text render mode 3 = invisible
+        c.setFillColorRGB(0, 0, 0)
+        
+        for text, min_x, min_y, max_x, max_y in lines:
+            # Масштабируем координаты
+            x = min_x * scale_x
+            y = page_height - max_y * scale_y
+            height = (max_y - min_y) * scale_y
+            
+            # Размер шрифта по высоте
+            font_size = max(height * 0.8, 8)
+            
+            c.setFont(font_name, font_size)
+            c.drawString(x, y, text)
+        
+        # Восстанавливаем состояние
+        c.restoreState()
+    
+    @staticmethod
+    def _insert_ocr_text_layer(page, lines, scale_x, scale_y, font_file=None):
+        """Добавляет на исходную страницу PyMuPDF невидимый текст распознанных строк
+        
+        Содержимое страницы не меняется - дописывается только текст в режиме 3 (невидимый).
+        Координаты строк - в пикселях отрендеренной (видимой, с учётом /Rotate) страницы.
+        """
+        if not lines:
+            return
+        
+        if font_file:
+            font_args = {'fontname': 'OcrCyr', 'fontfile': font_file}
+        else:
+            font_args = {'fontname': 'helv', 'encoding': fitz.TEXT_ENCODING_CYRILLIC}
+        
+        for text, min_x, min_y, max_x, max_y in lines:
+            height = (max_y - min_y) * scale_y
+            # Базовая линия - низ строки, в координатах неповёрнутой страницы
+            point = fitz.Point(min_x * scale_x, max_y * scale_y) * page.derotation_matrix
+            page.insert_text(
+                point, text,
+                fontsize=max(height * 0.8, 8),
+                rotate=page.rotation,
+                render_mode=3,  # Невидимый текст (только для поиска/копирования)
+                **font_args
+            )
     
     @staticmethod
-    def ocr_pdf(pdf_path, output_path=None, log_callback=None, ocr_resolution=2.0, enable_memory_optimization=True):
+    def ocr_pdf(pdf_path, output_path=None, log_callback=None, ocr_resolution=2.0, enable_memory_optimization=True,
+                engine_factory=None, workers=None, keep_original_pages=True, pages=None, use_cache=True):
         """Выполняет OCR для PDF файла, создавая PDF с текстовым слоем
         
         Использует Windows OCR (встроен в Windows 10+) - никаких внешних моделей!
+        Страницы рендерятся по очереди и распознаются параллельно в пуле потоков
+        (у каждого потока свой движок и свой event loop), а в итоговый PDF
+        собираются строго в исходном порядке. Растр страницы нигде не кодируется
+        в PNG/BMP и не пишется на диск: движок получает pix.samples, а reportlab -
+        изображение в памяти.
+        
+        По умолчанию исходные страницы сохраняются как есть (векторная графика и
+        встроенные JPEG не перекодируются), поверх добавляется только невидимый
+        текстовый слой, поэтому размер файла остаётся близким к исходному.
         
         Args:
             pdf_path: путь к исходному PDF
@@ -10494,21 +13679,31 @@ class GenerationDocApp:
             ocr_resolution: разрешение рендеринга для OCR (1.0-3.0). 
                            1.0 - быстро, 2.0 - оптимально (по умолчанию), 3.0 - максимум
             enable_memory_optimization: включить оптимизацию памяти (очистка каждые 3 страницы)
+            engine_factory: фабрика PageOcrEngine (по умолчанию Windows OCR)
+            workers: число потоков распознавания (по умолчанию OCR_WORKERS)
+            keep_original_pages: True - сохранить исходные страницы и добавить только текст,
+                                 False - пересобрать каждую страницу как растровое изображение
+            pages: номера страниц (с 0) для распознавания, остальные переносятся без изменений
+                   (None - все страницы; см. pdf_pages_needing_ocr)
+            use_cache: брать распознанные строки из ocr_result_cache и сохранять в него новые
             
         Returns:
             str: путь к PDF с текстовым слоем
         """
         import tempfile
-        import asyncio
+        from collections import deque
         
         if not PYMUPDF_AVAILABLE:
             raise ImportError("Для OCR требуется библиотека PyMuPDF: pip install pymupdf")
-        if not WINDOWS_OCR_AVAILABLE:
-            raise ImportError("Для OCR требуется библиотека winsdk: pip install winsdk\n(Требуется Windows 10 или новее)")
-        if not REPORTLAB_AVAILABLE:
-            raise ImportError("Для OCR требуется библиотека reportlab: pip install reportlab")
-        if not PIL_AVAILABLE:
-            raise ImportError("Для OCR требуется библиотека Pillow: pip install Pillow")
+        if engine_factory is None:
+            if not WINDOWS_OCR_AVAILABLE:
+                raise ImportError("Для OCR требуется библиотека winsdk: pip install winsdk\n(Требуется Windows 10 или новее)")
+            engine_factory = WindowsPageOcrEngine
+        if not keep_original_pages:
+            if not REPORTLAB_AVAILABLE:
+                raise ImportError("Для OCR требуется библиотека reportlab: pip install reportlab")
+            if not PIL_AVAILABLE:
+                raise ImportError("Для OCR требуется библиотека Pillow: pip install Pillow")
         
         if output_path is None:
             output_path = pdf_path
@@ -10516,43 +13711,25 @@ class GenerationDocApp:
         if log_callback:
             log_callback(f"  OCR: обработка {os.path.basename(pdf_path)}...")
         
-        # Инициализируем Windows OCR engine (кэшируем для повторного использования)
-        if not hasattr(GenerationDocApp, '_ocr_engine'):
-            try:
-                # Пробуем создать OCR engine для русского языка
-                try:
-                    russian_lang = Language("ru")
-                    GenerationDocApp._ocr_engine = OcrEngine.try_create(russian_lang)
-                except Exception:
-                    # Fallback на системные языки пользователя
-                    GenerationDocApp._ocr_engine = OcrEngine.try_create_from_user_profile_languages()
-                
-                if GenerationDocApp._ocr_engine is None:
-                    raise Exception("Не удалось инициализировать OCR engine")
-                if log_callback:
-                    log_callback(f"  OCR: движок инициализирован")
-            except Exception as e:
-                raise Exception(f"Ошибка инициализации Windows OCR: {str(e)}")
-        
-        ocr_engine = GenerationDocApp._ocr_engine
-        
         # Открываем PDF с помощью PyMuPDF
         doc = fitz.open(pdf_path)
         page_count = doc.page_count
+        if pages is None:
+            ocr_pages = list(range(page_count))
+        else:
+            ocr_pages = sorted({page_idx for page_idx in pages if 0 <= page_idx < page_count})
         
+        num_workers = max(1, min(workers or OCR_WORKERS, len(ocr_pages) or 1))
         if log_callback:
-            log_callback(f"  OCR: {page_count} страниц для обработки")
-        
-        # Создаём новый PDF с OCR
-        from reportlab.pdfgen import canvas as rl_canvas
-        from reportlab.lib.pagesizes import A4
-        from reportlab.pdfbase import pdfmetrics
-        from reportlab.pdfbase.ttfonts import TTFont
+            if len(ocr_pages) == page_count:
+                log_callback(f"  OCR: {page_count} страниц для обработки, потоков: {num_workers}")
+            else:
+                log_callback(f"  OCR: {len(ocr_pages)} из {page_count} страниц для обработки, потоков: {num_workers}")
         
-        # Регистрируем шрифт с поддержкой кириллицы
+        # Ищем шрифт с поддержкой кириллицы
         # Пробуем найти системный шрифт Arial или DejaVu
         font_name = "Helvetica"  # fallback
-        font_registered = False
+        font_file = None
         
         # Список путей к шрифтам с кириллицей (Windows)
         font_paths = [
@@ -10563,19 +13740,30 @@ class GenerationDocApp:
             "C:/Windows/Fonts/segoeui.ttf",
         ]
         
-        for font_path in font_paths:
-            if os.path.exists(font_path):
-                try:
-                    pdfmetrics.registerFont(TTFont('CyrFont', font_path))
-                    font_name = "CyrFont"
-                    font_registered = True
-                    if log_callback:
-                        log_callback(f"  OCR: шрифт загружен: {os.path.basename(font_path)}")
-                    break
-                except Exception:
-                    continue
+        c = None
+        if keep_original_pages:
+            font_file = next((path for path in font_paths if os.path.exists(path)), None)
+        else:
+            # Создаём новый PDF с OCR
+            from reportlab.pdfgen import canvas as rl_canvas
+            from reportlab.lib.pagesizes import A4
+            from reportlab.pdfbase import pdfmetrics
+            from reportlab.pdfbase.ttfonts import TTFont
+            
+            for font_path in font_paths:
+                if os.path.exists(font_path):
+                    try:
+                        pdfmetrics.registerFont(TTFont('CyrFont', font_path))
+                        font_name = "CyrFont"
+                        font_file = font_path
+                        break
+                    except Exception:
+                        continue
         
-        if not font_registered:
+        if font_file:
+            if log_callback:
+                log_callback(f"  OCR: шрифт загружен: {os.path.basename(font_file)}")
+        else:
             if log_callback:
                 log_callback(f"  OCR: предупреждение - используем Helvetica (кириллица может отображаться некорректно)")
         
@@ -10583,161 +13771,128 @@ class GenerationDocApp:
         temp_pdf_path = temp_pdf.name
         temp_pdf.close()
         
-        c = rl_canvas.Canvas(temp_pdf_path, pagesize=A4)
-        
-        # Список временных файлов для гарантированного удаления
-        temp_files_cleanup = []
-        
-        try:
-            for page_idx in range(page_count):
+        if not keep_original_pages:
+            c = rl_canvas.Canvas(temp_pdf_path, pagesize=A4)
+        
+        # Движок и язык добавляет в ключ сам пул - по созданному движку
+        ocr_pool = OcrWorkerPool(engine_factory, num_workers,
+                                 cache=ocr_result_cache if use_cache else None,
+                                 cache_variant=f"{float(ocr_resolution):g}")
+        # Отрендеренные страницы, ожидающие распознавания, в порядке документа.
+        # Окно ограничено, чтобы изображения всего документа не копились в памяти.
+        pending = deque()
+        max_pending = num_workers * 2
+        
+        def compose_page(item):
+            """Дописывает очередную страницу, дождавшись её распознавания"""
+            page_idx, page_rect, img, img_size, future = item
+            try:
                 if log_callback:
                     log_callback(f"  OCR: страница {page_idx + 1}/{page_count}...")
                 
+                if c is not None:
+                    # Устанавливаем размер страницы в canvas равным реальному размеру
+                    c.setPageSize((page_rect.width, page_rect.height))
+                    
+                    # Рисуем изображение на странице (из памяти, без временного файла)
+                    c.drawImage(ImageReader(img), 0, 0, width=page_rect.width, height=page_rect.height)
+                
+                try:
+                    lines = future.result()
+                except Exception as e:
+                    if ocr_pool.init_error is not None:
+                        raise Exception(f"Ошибка инициализации OCR: {ocr_pool.init_error}")
+                    lines = []
+                    if log_callback:
+                        log_callback(f"  OCR: предупреждение на странице {page_idx + 1}: {str(e)}")
+                
+                img_width, img_height = img_size
+                scale_x = page_rect.width / img_width
+                scale_y = page_rect.height / img_height
+                
+                if c is not None:
+                    GenerationDocApp._draw_ocr_text_layer(c, lines, font_name, scale_x, scale_y, page_rect.height)
+                    c.showPage()
+                else:
+                    GenerationDocApp._insert_ocr_text_layer(doc[page_idx], lines, scale_x, scale_y, font_file)
+            finally:
+                # ОПТИМИЗАЦИЯ: Гарантированная очистка ресурсов после каждой страницы
+                if img is not None:
+                    try:
+                        img.close()
+                    except:
+                        pass
+                
+                # Очистка памяти каждые 3 страницы (опционально)
+                if enable_memory_optimization and (page_idx + 1) % 3 == 0:
+                    gc.collect()
+        
+        completed = False
+        try:
+            for page_idx in ocr_pages:
                 page = doc[page_idx]
                 
                 # Получаем реальный размер страницы из оригинального PDF
                 page_rect = page.rect
-                page_width = page_rect.width
-                page_height = page_rect.height
-                
-                # Устанавливаем размер страницы в canvas равным реальному размеру
-                c.setPageSize((page_width, page_height))
                 
-                pix = None
+                # Разрешение для OCR (настраиваемое)
+                mat = fitz.Matrix(ocr_resolution, ocr_resolution)
                 img = None
-                temp_img_path = None
-                
-                try:
-                    # Разрешение для OCR (настраиваемое)
-                    mat = fitz.Matrix(ocr_resolution, ocr_resolution)
+                if c is not None:
                     pix = page.get_pixmap(matrix=mat)
-                    
-                    # Конвертируем в PIL Image
-                    img_data = pix.tobytes("png")
-                    img = Image.open(io.BytesIO(img_data))
-                    
-                    img_width, img_height = img.size
-                    
-                    # Сохраняем во временный файл для reportlab
-                    temp_img = tempfile.NamedTemporaryFile(suffix='.png', delete=False)
-                    temp_img_path = temp_img.name
-                    temp_img.close()
-                    temp_files_cleanup.append(temp_img_path)
-                    
-                    img.save(temp_img_path, 'PNG')
-                    
-                    # Коэффициент масштабирования
-                    scale_x = page_width / img_width
-                    scale_y = page_height / img_height
-                    
-                    # Рисуем изображение на странице
-                    c.drawImage(temp_img_path, 0, 0, width=page_width, height=page_height)
-                    
-                    try:
-                        # Конвертируем PIL Image в формат для Windows OCR
-                        if img.mode != 'RGB':
-                            img = img.convert('RGB')
-                        
-                        # Создаём поток для изображения
-                        img_bytes = io.BytesIO()
-                        img.save(img_bytes, format='BMP')
-                        img_data_bytes = img_bytes.getvalue()
-                        img_bytes.close()
-                        
-                        # Асинхронная функция для OCR
-                        async def perform_ocr_async():
-                            stream = InMemoryRandomAccessStream()
-                            writer = DataWriter(stream)
-                            writer.write_bytes(img_data_bytes)
-                            await writer.store_async()
-                            stream.seek(0)
-                            
-                            decoder = await BitmapDecoder.create_async(stream)
-                            software_bitmap = await decoder.get_software_bitmap_async(
-                                BitmapPixelFormat.BGRA8,
-                                BitmapAlphaMode.PREMULTIPLIED
-                            )
-                            
-                            result = await ocr_engine.recognize_async(software_bitmap)
-                            return result
-                        
-                        # Выполняем OCR
-                        try:
-                            loop = asyncio.new_event_loop()
-                            asyncio.set_event_loop(loop)
-                            ocr_result = loop.run_until_complete(perform_ocr_async())
-                            loop.close()
-                        except RuntimeError:
-                            # Если уже есть running loop
-                            ocr_result = asyncio.run(perform_ocr_async())
-                        
-                        # Обрабатываем результаты распознавания
-                        if ocr_result:
-                            # Сохраняем состояние и устанавливаем режим невидимого текста
-                            # PDF оператор "3 Tr" = invisible text (только для поиска/копирования)
-                            c.saveState()
-                            c._code.append('3 Tr')  # Text render mode 3 = invisible
-                            c.setFillColorRGB(0, 0, 0)
-                            
-                            for line in ocr_result.lines:
-                                text = line.text
-                                if text.strip():
-                                    words = line.words
-                                    if words:
-                                        # Находим границы всех слов в строке
-                                        min_x = min(w.bounding_rect.x for w in words)
-                                        min_y = min(w.bounding_rect.y for w in words)
-                                        max_x = max(w.bounding_rect.x + w.bounding_rect.width for w in words)
-                                        max_y = max(w.bounding_rect.y + w.bounding_rect.height for w in words)
-                                        
-                                        # Масштабируем координаты
-                                        x = min_x * scale_x
-                                        y = page_height - max_y * scale_y
-                                        height = (max_y - min_y) * scale_y
-                                        
-                                        # Размер шрифта по высоте
-                                        font_size = max(height * 0.8, 8)
-                                        
-                                        c.setFont(font_name, font_size)
-                                        c.drawString(x, y, text)
-                            
-                            # Восстанавливаем состояние
-                            c.restoreState()
-                    
-                    except Exception as e:
-                        if log_callback:
-                            log_callback(f"  OCR: предупреждение на странице {page_idx + 1}: {str(e)}")
-                    
-                    c.showPage()
+                    # Для страницы - PIL Image поверх тех же байтов, для OCR - оттенки серого
+                    img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+                    gray = fitz.Pixmap(fitz.csGRAY, pix)
+                else:
+                    # Страница остаётся исходной - растр нужен только движку
+                    gray = page.get_pixmap(matrix=mat, colorspace=fitz.csGRAY)
+                future = ocr_pool.submit(gray.samples, gray.width, gray.height)
+                img_size = (gray.width, gray.height)
+                pix = gray = None  # PyMuPDF автоматически освобождает
                 
-                finally:
-                    # ОПТИМИЗАЦИЯ: Гарантированная очистка ресурсов после каждой страницы
-                    if img:
-                        try:
-                            img.close()
-                        except:
-                            pass
-                    if pix:
-                        try:
-                            pix = None  # PyMuPDF автоматически освобождает
-                        except:
-                            pass
-                    
-                    # Очистка памяти каждые 3 страницы (опционально)
-                    if enable_memory_optimization and (page_idx + 1) % 3 == 0:
-                        gc.collect()
+                pending.append((page_idx, page_rect, img, img_size, future))
+                
+                # Пока потоки распознают, дописываем готовые страницы по порядку
+                while pending and (len(pending) >= max_pending or pending[0][-1].done()):
+                    compose_page(pending.popleft())
+            
+            while pending:
+                compose_page(pending.popleft())
+            
+            if c is not None:
+                c.save()
+                if len(ocr_pages) < page_count:
+                    # Страницы без OCR переносим из исходного файла без растеризации
+                    with fitz.open(temp_pdf_path) as raster:
+                        for raster_idx, page_idx in enumerate(ocr_pages):
+                            doc.delete_page(page_idx)
+                            doc.insert_pdf(raster, from_page=raster_idx, to_page=raster_idx, start_at=page_idx)
+                    doc.save(temp_pdf_path, garbage=3, deflate=True)
+            else:
+                # Встраиваем только использованные глифы шрифта
+                if font_file:
+                    try:
+                        doc.subset_fonts()
+                    except Exception:
+                        pass
+                doc.save(temp_pdf_path, garbage=3, deflate=True)
+            completed = True
         
         finally:
-            # Гарантированное закрытие документа и сохранение
-            doc.close()
-            c.save()
+            ocr_pool.close()
+            for item in pending:
+                if item[2] is not None:
+                    try:
+                        item[2].close()
+                    except:
+                        pass
             
-            # Удаляем все временные файлы
-            for temp_file in temp_files_cleanup:
+            # Гарантированное закрытие документа
+            doc.close()
+            if not completed:
                 try:
-                    if os.path.exists(temp_file):
-                        os.unlink(temp_file)
-                except:
+                    os.unlink(temp_pdf_path)
+                except OSError:
                     pass
             
             # Финальная очистка памяти
@@ -10748,7 +13903,10 @@ class GenerationDocApp:
         shutil.move(temp_pdf_path, output_path)
         
         if log_callback:
-            log_callback(f"  OCR: завершено")
+            if ocr_pool.cache_hits:
+                log_callback(f"  OCR: завершено (из кэша: {ocr_pool.cache_hits} из {len(ocr_pages)} страниц)")
+            else:
+                log_callback(f"  OCR: завершено")
         
         return output_path
     
@@ -10756,7 +13914,7 @@ class GenerationDocApp:
     def merge_pdf_documents(file_paths, output_path, log_callback=None, use_ocr=True,
                             numbering_line1=None, numbering_line2=None, numbering_line3=None,
                             numbering_position='правый-нижний', numbering_border=True,
-                            numbering_increment_mode='per_page'):
+                            numbering_increment_mode='per_page', log_level=LOG_INFO):
         """Объединение PDF документов с опциональным OCR для сканов
         
         Args:
@@ -10770,6 +13928,7 @@ class GenerationDocApp:
             numbering_position: позиция штампа
             numbering_border: рисовать рамку
             numbering_increment_mode: режим инкремента ('per_page' или 'per_document')
+            log_level: порог лога (LOG_DEBUG выводит проверку каждого файла)
         
         Автоматически применяет OCR к PDF файлам без текстового слоя
         для обеспечения возможности копирования текста.
@@ -10785,30 +13944,29 @@ class GenerationDocApp:
         if PdfMerger is None:
             raise ImportError("Требуется установить pypdf или PyPDF2: pip install pypdf")
         
-        if log_callback:
-            log_callback(f"Объединение {len(file_paths)} PDF документов...")
+        log = LevelLogger(log_callback or (lambda message: None), log_level)
+        # Подробности проверки текстового слоя нужны только в подробном режиме
+        detail_callback = log_callback if log.debug_enabled else None
+        
+        log.info(f"Объединение {len(file_paths)} PDF документов...")
         
         # Проверяем доступность OCR (только Python библиотеки)
         ocr_status = get_ocr_status()
         ocr_ready = is_ocr_available() and use_ocr
         
-        if use_ocr and not is_ocr_available() and log_callback:
+        if use_ocr and not is_ocr_available() and log.warn_enabled:
             missing = []
             if not ocr_status['pymupdf']:
                 missing.append("PyMuPDF (pip install pymupdf)")
             if not ocr_status['windows_ocr']:
                 missing.append("winsdk (pip install winsdk) - требуется Windows 10+")
-            if not ocr_status['reportlab']:
-                missing.append("reportlab (pip install reportlab)")
-            if not ocr_status['pillow']:
-                missing.append("Pillow (pip install Pillow)")
             
-            log_callback(f"  ⚠ OCR недоступен. Для установки:")
+            log.warn(f"  ⚠ OCR недоступен. Для установки:")
             for m in missing:
-                log_callback(f"    {m}")
-            log_callback(f"  ⚠ Сканированные PDF будут объединены без распознавания текста")
-        elif not use_ocr and log_callback:
-            log_callback(f"  ℹ Быстрый режим: OCR отключен")
+                log.warn(f"    {m}")
+            log.warn(f"  ⚠ Сканированные PDF будут объединены без распознавания текста")
+        elif not use_ocr:
+            log.info(f"  ℹ Быстрый режим: OCR отключен")
         
         # Проверяем и применяем OCR к файлам без текстового слоя
         processed_files = []
@@ -10819,31 +13977,30 @@ class GenerationDocApp:
         add_numbering_before_merge = numbering_increment_mode in ['per_document', 'per_document_first_page'] and any([numbering_line1, numbering_line2, numbering_line3])
         
         for idx, pdf_file in enumerate(file_paths):
-            if log_callback:
-                log_callback(f"  Проверка файла {idx + 1}/{len(file_paths)}: {os.path.basename(pdf_file)}")
+            if log.debug_enabled:
+                log.debug(f"  Проверка файла {idx + 1}/{len(file_paths)}: {os.path.basename(pdf_file)}")
             
             # Проверяем наличие текстового слоя (только если OCR включен)
             if not use_ocr:
                 # Быстрый режим - просто добавляем файл
-                if log_callback:
-                    log_callback(f"    ℹ Добавлен без OCR")
+                log.debug(f"    ℹ Добавлен без OCR")
                 processed_files.append(pdf_file)
                 continue
             
-            has_text = GenerationDocApp.pdf_has_text_layer(pdf_file, log_callback)
+            ocr_pages = GenerationDocApp.pdf_pages_needing_ocr(pdf_file, detail_callback)
             
-            if has_text:
-                if log_callback:
-                    log_callback(f"    ✓ Текстовый слой присутствует")
+            if not ocr_pages:
+                log.debug(f"    ✓ Текстовый слой присутствует")
                 processed_files.append(pdf_file)
             else:
                 if not ocr_ready:
-                    if log_callback:
-                        log_callback(f"    ⚠ Текстовый слой отсутствует, OCR недоступен - используется оригинал")
+                    if log.warn_enabled:
+                        log.warn(f"    ⚠ {os.path.basename(pdf_file)}: текстовый слой отсутствует, OCR недоступен - используется оригинал")
                     processed_files.append(pdf_file)
                 else:
-                    if log_callback:
-                        log_callback(f"    ⚠ Текстовый слой отсутствует, выполняется OCR...")
+                    if log.info_enabled:
+                        log.info(f"    ⚠ {os.path.basename(pdf_file)}: текстовый слой отсутствует "
+                                 f"(страниц: {len(ocr_pages)}), выполняется OCR...")
                     
                     # Создаём временный файл для OCR
                     temp_pdf = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
@@ -10852,13 +14009,11 @@ class GenerationDocApp:
                     temp_files_to_cleanup.append(temp_pdf_path)
                     
                     try:
-                        GenerationDocApp.ocr_pdf(pdf_file, temp_pdf_path, log_callback)
+                        GenerationDocApp.ocr_pdf(pdf_file, temp_pdf_path, log_callback, pages=ocr_pages)
                         processed_files.append(temp_pdf_path)
-                        if log_callback:
-                            log_callback(f"    ✓ OCR выполнен успешно")
+                        log.info(f"    ✓ OCR выполнен успешно")
                     except Exception as e:
-                        if log_callback:
-                            log_callback(f"    ⚠ Ошибка OCR: {str(e)}, используется оригинал")
+                        log.warn(f"    ⚠ Ошибка OCR: {str(e)}, используется оригинал")
                         processed_files.append(pdf_file)
         
         # НУМЕРАЦИЯ per_document/per_document_first_page: Добавляем штампы к каждому файлу ДО объединения
@@ -10923,8 +14078,7 @@ class GenerationDocApp:
             # Очистка памяти после объединения
             gc.collect()
         
-        if log_callback:
-            log_callback("✓ PDF документы успешно объединены")
+        log.info("✓ PDF документы успешно объединены")
         
         # НУМЕРАЦИЯ per_page: Добавляем штампы ПОСЛЕ объединения
         if numbering_increment_mode == 'per_page' and any([numbering_line1, numbering_line2, numbering_line3]):
@@ -10994,71 +14148,11 @@ class GenerationDocApp:
                 "Установите её командой: pip install pywin32"
             )
         
-        word = None
-        doc = None
         try:
-            import pythoncom
-            pythoncom.CoInitialize()
-            
-            # Используем DispatchEx для изолированного экземпляра Word
-            try:
-                word = win32com.client.DispatchEx("Word.Application")
-            except:
-                word = win32com.client.Dispatch("Word.Application")
-            
-            # КРИТИЧНО: Устанавливаем настройки ДО открытия документа
-            word.DisplayAlerts = 0  # Отключаем ВСЕ диалоги и предупреждения
-            try:
-                word.Visible = False
-            except:
-                pass  # Игнорируем ошибку установки Visible
-            
-            # Открываем документ с параметрами безопасности
-            doc = word.Documents.Open(docx_file, ReadOnly=True, AddToRecentFiles=False, 
-                                     ConfirmConversions=False)
-            
-            # Сохраняем в PDF
-            doc.SaveAs(pdf_file, FileFormat=17)  # 17 = wdFormatPDF
-            
+            # Экземпляр Word берётся из общего пула и не закрывается после каждого файла
+            convert_docx_to_pdf_with_word(docx_file, pdf_file)
         except Exception as e:
             raise Exception(f"Ошибка при конвертации через Word COM: {str(e)}")
-        
-        finally:
-            # КРИТИЧНО: Правильный порядок закрытия для разблокировки файлов
-            try:
-                if doc:
-                    doc.Close(SaveChanges=False)
-                    del doc
-            except:
-                pass
-            
-            try:
-                if word:
-                    # Закрываем все открытые документы
-                    try:
-                        while word.Documents.Count > 0:
-                            word.Documents(1).Close(SaveChanges=False)
-                    except:
-                        pass
-                    
-                    # Выключаем предупреждения перед закрытием
-                    word.DisplayAlerts = 0
-                    word.Quit(SaveChanges=False)
-                    del word
-            except:
-                pass
-            
-            try:
-                import pythoncom
-                pythoncom.CoUninitialize()
-            except:
-                pass
-            
-            # Даем время системе закрыть процесс Word
-            time.sleep(0.1)
-            
-            # Принудительная сборка мусора для освобождения COM объектов
-            gc.collect()
     
     @staticmethod
     def convert_word_to_pdf(file_paths, output_folder=None, log_callback=None,
@@ -11241,9 +14335,7 @@ class GenerationDocApp:
         if PdfMerger is None:
             raise ImportError("Требуется установить pypdf или PyPDF2: pip install pypdf")
         
-        import tempfile
-        temp_dir = tempfile.mkdtemp()
-        temp_pdf_files = []
+        temp_pdf_files = []  # PDF в постоянном кэше - после объединения не удаляются
         errors = []
         
         try:
@@ -11269,43 +14361,11 @@ class GenerationDocApp:
                     
                     docx_file = os.path.abspath(docx_file)
                     
-                    base_name = os.path.splitext(os.path.basename(docx_file))[0]
-                    temp_pdf = os.path.join(temp_dir, base_name + ".pdf")
-                    
-                    if os.path.exists(temp_pdf):
-                        try:
-                            os.remove(temp_pdf)
-                        except:
-                            pass
-                    
-                    success = False
-                    last_error = None
-                    
-                    if WIN32COM_AVAILABLE:
-                        try:
-                            GenerationDocApp.convert_word_to_pdf_direct(docx_file, temp_pdf)
-                            success = True
-                        except Exception as e:
-                            last_error = f"win32com: {str(e)}"
-                    
-                    if not success and DOCX2PDF_AVAILABLE:
-                        try:
-                            convert(docx_file, temp_pdf)
-                            success = True
-                        except Exception as e:
-                            if last_error:
-                                last_error += f"; docx2pdf: {str(e)}"
-                            else:
-                                last_error = f"docx2pdf: {str(e)}"
-                    
-                    if success and os.path.exists(temp_pdf):
-                        temp_pdf_files.append(temp_pdf)
-                        if log_callback:
-                            log_callback(f"    ✓ Успешно")
-                    else:
-                        if not last_error:
-                            last_error = "PDF файл не был создан"
-                        raise Exception(last_error)
+                    # Уже конвертированные файлы берутся из постоянного кэша
+                    cached_pdf = pdf_conversion_cache.convert(docx_file, convert_word_file_to_pdf)
+                    temp_pdf_files.append(cached_pdf)
+                    if log_callback:
+                        log_callback(f"    ✓ Успешно")
                     
                 except Exception as e:
                     error_text = str(e)
@@ -11353,13 +14413,6 @@ class GenerationDocApp:
                 raise Warning(f"Файл создан, но были ошибки при конвертации некоторых документов:\n" + "\n".join(errors))
             
         finally:
-            # ОПТИМИЗАЦИЯ: Гарантированное удаление временной папки
-            import shutil
-            try:
-                shutil.rmtree(temp_dir)
-            except:
-                pass
-            
             # Финальная очистка памяти
             gc.collect()
     
@@ -12745,10 +15798,6 @@ class GenerationDocApp:
                     missing.append("PyMuPDF (pip install pymupdf)")
                 if not ocr_status['windows_ocr']:
                     missing.append("winsdk (pip install winsdk) - требуется Windows 10+")
-                if not ocr_status['reportlab']:
-                    missing.append("reportlab (pip install reportlab)")
-                if not ocr_status['pillow']:
-                    missing.append("Pillow (pip install Pillow)")
                 
                 log_callback("⚠ OCR недоступен. Для установки:")
                 for m in missing:
@@ -12785,13 +15834,13 @@ class GenerationDocApp:
                     current_pdf_path = pdf_path
                     
                     if use_ocr:
-                        # Проверяем наличие текстового слоя
-                        has_text = GenerationDocApp.pdf_has_text_layer(pdf_path, log_callback)
+                        # Проверяем наличие текстового слоя (постранично)
+                        ocr_pages = GenerationDocApp.pdf_pages_needing_ocr(pdf_path, log_callback)
                         
-                        if not has_text:
+                        if ocr_pages:
                             if ocr_ready:
                                 if log_callback:
-                                    log_callback("  ⚠ Текстовый слой отсутствует, выполняется OCR...")
+                                    log_callback(f"  ⚠ Текстовый слой отсутствует (страниц: {len(ocr_pages)}), выполняется OCR...")
                                 
                                 # Создаём временный файл для OCR
                                 temp_pdf = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
@@ -12801,7 +15850,8 @@ class GenerationDocApp:
                                 
                                 try:
                                     # Применяем OCR
-                                    GenerationDocApp.ocr_pdf(pdf_path, temp_pdf_path, log_callback, ocr_resolution)
+                                    GenerationDocApp.ocr_pdf(pdf_path, temp_pdf_path, log_callback, ocr_resolution,
+                                                             pages=ocr_pages)
                                     current_pdf_path = temp_pdf_path
                                     
                                     if log_callback:
@@ -13018,10 +16068,6 @@ class GenerationDocApp:
                     missing.append("PyMuPDF (pip install pymupdf)")
                 if not ocr_status['windows_ocr']:
                     missing.append("winsdk (pip install winsdk) - требуется Windows 10+")
-                if not ocr_status['reportlab']:
-                    missing.append("reportlab (pip install reportlab)")
-                if not ocr_status['pillow']:
-                    missing.append("Pillow (pip install Pillow)")
                 
                 log_callback("⚠ OCR недоступен. Для установки:")
                 for m in missing:
@@ -13048,13 +16094,13 @@ class GenerationDocApp:
                     current_pdf_path = pdf_path
                     
                     if use_ocr:
-                        # Проверяем наличие текстового слоя
-                        has_text = GenerationDocApp.pdf_has_text_layer(pdf_path, log_callback)
+                        # Проверяем наличие текстового слоя (постранично)
+                        ocr_pages = GenerationDocApp.pdf_pages_needing_ocr(pdf_path, log_callback)
                         
-                        if not has_text:
+                        if ocr_pages:
                             if ocr_ready:
                                 if log_callback:
-                                    log_callback("  ⚠ Текстовый слой отсутствует, выполняется OCR...")
+                                    log_callback(f"  ⚠ Текстовый слой отсутствует (страниц: {len(ocr_pages)}), выполняется OCR...")
                                 
                                 # Создаём временный файл для OCR
                                 temp_pdf = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
@@ -13064,7 +16110,8 @@ class GenerationDocApp:
                                 
                                 try:
                                     # Применяем OCR
-                                    GenerationDocApp.ocr_pdf(pdf_path, temp_pdf_path, log_callback, ocr_resolution)
+                                    GenerationDocApp.ocr_pdf(pdf_path, temp_pdf_path, log_callback, ocr_resolution,
+                                                             pages=ocr_pages)
                                     current_pdf_path = temp_pdf_path
                                     
                                     if log_callback:
@@ -13214,6 +16261,27 @@ class GenerationDocApp:
         if processed_count == 0:
             raise Exception(f"Не удалось обработать ни одного файла. Ошибок: {len(errors)}")
 
+class _StandaloneDecliner:
+    """apply_case без главного окна - для склонения в процессах пула"""
+    morph = GenerationDocApp.morph
+    apply_case = GenerationDocApp.apply_case
+    _apply_case_words = GenerationDocApp._apply_case_words
+    decline_female_surname = GenerationDocApp.decline_female_surname
+    decline_male_surname = GenerationDocApp.decline_male_surname
+    
+    def __init__(self):
+        self._morph = None
+
+_standalone_decliner = None
+
+def _decline_values_chunk(pairs):
+    """Склонение пачки пар (значение, падеж) в процессе пула"""
+    global _standalone_decliner
+    if _standalone_decliner is None:
+        _standalone_decliner = _StandaloneDecliner()
+    return [_standalone_decliner.apply_case(value, case) for value, case in pairs]
+
+
 class DocumentFormationEditor:
     """Редактор для формирования документа из Word, PDF и изображений"""
     def __init__(self, parent, initial_files=None):
@@ -13766,93 +16834,10 @@ DRAG & DROP:
         progress_window.update()
         
         try:
-            # Конвертируем Word в PDF во временный файл
-            temp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-            temp_pdf.close()
-            
-            conversion_success = False
-            
-            if DOCX2PDF_AVAILABLE:
-                import sys
-                import io
-                old_stderr = sys.stderr
-                
-                try:
-                    sys.stderr = io.StringIO()
-                    
-                    from docx2pdf import convert
-                    convert(word_path, temp_pdf.name)
-                    conversion_success = True
-                    
-                except Exception:
-                    pass
-                finally:
-                    sys.stderr = old_stderr
-            
-            if not conversion_success and WIN32COM_AVAILABLE:
-                word = None
-                doc = None
-                
-                try:
-                    import pythoncom
-                    pythoncom.CoInitialize()
-                    
-                    try:
-                        word = win32com.client.DispatchEx("Word.Application")
-                    except:
-                        word = win32com.client.Dispatch("Word.Application")
-                    
-                    # КРИТИЧНО: Устанавливаем настройки ДО открытия документа
-                    word.DisplayAlerts = 0
-                    try:
-                        word.Visible = False
-                    except:
-                        pass
-                    
-                    doc = word.Documents.Open(os.path.abspath(word_path), ReadOnly=True,
-                                             AddToRecentFiles=False, ConfirmConversions=False)
-                    
-                    doc.SaveAs(os.path.abspath(temp_pdf.name), FileFormat=17)
-                    
-                    conversion_success = True
-                    
-                except Exception:
-                    pass
-                    
-                finally:
-                    # КРИТИЧНО: Правильный порядок закрытия
-                    try:
-                        if doc:
-                            doc.Close(SaveChanges=False)
-                            del doc
-                    except:
-                        pass
-                    
-                    try:
-                        if word:
-                            try:
-                                while word.Documents.Count > 0:
-                                    word.Documents(1).Close(SaveChanges=False)
-                            except:
-                                pass
-                            word.DisplayAlerts = 0
-                            word.Quit(SaveChanges=False)
-                            del word
-                    except:
-                        pass
-                    
-                    try:
-                        pythoncom.CoUninitialize()
-                    except:
-                        pass
-                    
-                    time.sleep(0.1)
-                    doc = None
-                    word = None
-                    import gc
-                    gc.collect()
-            
-            if not conversion_success:
+            # PDF берётся из постоянного кэша, конвертация - только для новых или изменённых файлов
+            try:
+                cached_pdf = word_preload_manager.get_or_convert(word_path)
+            except Exception as conversion_error:
                 error_msg = "Не удалось конвертировать Word в PDF!\n\n"
                 
                 if not DOCX2PDF_AVAILABLE:
@@ -13867,13 +16852,13 @@ DRAG & DROP:
                 else:
                     error_msg += "❌ Microsoft Word обнаружен, но конвертация не удалась\n"
                     error_msg += "   Проверьте, что Word корректно установлен\n"
+                error_msg += f"\n{conversion_error}"
                 
                 progress_window.destroy()
                 messagebox.showerror("Ошибка конвертации", error_msg, parent=self.window)
-                os.unlink(temp_pdf.name)
                 return
             
-            pdf_doc = fitz.open(temp_pdf.name)
+            pdf_doc = fitz.open(cached_pdf)
             for page_num in range(len(pdf_doc)):
                 page = pdf_doc[page_num]
                 
@@ -13891,7 +16876,7 @@ DRAG & DROP:
                     'rotation': 0,
                     'preview': img,
                     'type': 'word',
-                    'temp_pdf': temp_pdf.name  # Сохраняем путь к временному PDF
+                    'temp_pdf': cached_pdf  # PDF в постоянном кэше (только чтение)
                 }
                 
                 self.pages.append(page_info)
@@ -13904,8 +16889,6 @@ DRAG & DROP:
         except Exception as e:
             progress_window.destroy()
             messagebox.showerror("Ошибка", f"Не удалось загрузить Word документ:\n{str(e)}", parent=self.window)
-            if os.path.exists(temp_pdf.name):
-                os.unlink(temp_pdf.name)
     
     def _add_image_page(self, image_path):
         """Добавить страницу из изображения"""
@@ -15727,7 +18710,8 @@ DRAG & DROP:
 
 class MergeDocumentsWindow:
     """Окно объединения документов с системой вкладок"""
-    def __init__(self, parent):
+    def __init__(self, parent, log_level=None):
+        self.log_level = log_level  # StringVar уровня лога из настроек приложения
         self.window = tk.Toplevel(parent)
         self.window.withdraw()
         self.window.title("Работа с документами")
@@ -19435,6 +22419,22 @@ class PreviewWindow:
             except Exception as e:
                 pass
             
+            if not active_placeholders:
+                # Выделять нечего: тот же PDF, что готовит фоновая предзагрузка - файл
+                # поднимается в начало её очереди, окно не замирает во время ожидания
+                self.page_label.config(text="Конвертация в PDF...")
+                self.window.update()
+                self._show_word_preview_pdf(word_preload_manager.wait(self.file_path, poll=self.window.update))
+                return
+            
+            # Предпросмотр этой версии файла с тем же набором плейсхолдеров берётся из постоянного кэша
+            cache_key = pdf_conversion_cache.key_for(
+                self.file_path, "preview-highlight|" + "|".join(sorted(active_placeholders)))
+            cached_pdf = pdf_conversion_cache.get(cache_key)
+            if cached_pdf:
+                self._show_word_preview_pdf(cached_pdf)
+                return
+            
             temp_docx_fd, temp_docx_path = tempfile.mkstemp(suffix='.docx', prefix='word_highlighted_')
             os.close(temp_docx_fd)
             
@@ -19560,76 +22560,15 @@ class PreviewWindow:
             try:
                 # Пробуем конвертировать через win32com (Windows)
                 if WIN32COM_AVAILABLE:
-                    import win32com.client
-                    import pythoncom
-                    
-                    word = None
-                    word_doc = None
+                    temp_pdf_fd, temp_pdf_path = tempfile.mkstemp(suffix='.pdf', prefix='word_preview_')
+                    os.close(temp_pdf_fd)
                     
                     try:
-                        pythoncom.CoInitialize()
-                        
-                        # Используем EnsureDispatch для надёжной работы с COM
-                        try:
-                            word = win32com.client.gencache.EnsureDispatch("Word.Application")
-                        except:
-                            # Fallback на обычный Dispatch
-                            try:
-                                word = win32com.client.DispatchEx("Word.Application")
-                            except:
-                                word = win32com.client.Dispatch("Word.Application")
-                        
-                        # КРИТИЧНО: Устанавливаем настройки ДО открытия документа
-                        word.DisplayAlerts = 0
-                        try:
-                            word.Visible = False
-                        except:
-                            pass  # Игнорируем ошибку установки Visible
-                        
-                        temp_pdf_fd, temp_pdf_path = tempfile.mkstemp(suffix='.pdf', prefix='word_preview_')
-                        os.close(temp_pdf_fd)
-                        
-                        # Открываем модифицированный Word документ с параметрами безопасности
-                        word_doc = word.Documents.Open(os.path.abspath(temp_docx_path), ReadOnly=True,
-                                                       AddToRecentFiles=False, ConfirmConversions=False)
-                        
-                        word_doc.SaveAs(os.path.abspath(temp_pdf_path), FileFormat=17)
-                    
+                        # Word из общего пула конвертеров - без запуска нового экземпляра на каждый просмотр
+                        convert_docx_to_pdf_with_word(temp_docx_path, temp_pdf_path)
                     except Exception as word_error:
                         raise Exception(f"Не удалось конвертировать документ через Word: {word_error}")
                     
-                    finally:
-                        # КРИТИЧНО: Правильный порядок закрытия
-                        try:
-                            if word_doc:
-                                word_doc.Close(SaveChanges=False)
-                                del word_doc
-                        except:
-                            pass
-                        
-                        try:
-                            if word:
-                                try:
-                                    while word.Documents.Count > 0:
-                                        word.Documents(1).Close(SaveChanges=False)
-                                except:
-                                    pass
-                                word.DisplayAlerts = 0
-                                word.Quit(SaveChanges=False)
-                                del word
-                        except:
-                            pass
-                        
-                        try:
-                            pythoncom.CoUninitialize()
-                        except:
-                            pass
-                        
-                        time.sleep(0.1)
-                        word_doc = None
-                        word = None
-                        gc.collect()
-                    
                 elif DOCX2PDF_AVAILABLE:
                     # Используем docx2pdf
                     from docx2pdf import convert
@@ -19658,6 +22597,14 @@ class PreviewWindow:
                 
                 self.temp_pdf_path = temp_pdf_path
                 self.temp_docx_path = temp_docx_path
+                
+                # PDF переносится в постоянный кэш и при закрытии окна не удаляется
+                if cache_key:
+                    try:
+                        temp_pdf_path = pdf_conversion_cache.put(cache_key, temp_pdf_path)
+                        self.temp_pdf_path = None
+                    except OSError:
+                        pass
                     
             except Exception as e:
                 if temp_pdf_path and os.path.exists(temp_pdf_path):
@@ -19673,20 +22620,7 @@ class PreviewWindow:
                 raise e
             
             # Открываем PDF для отображения
-            if temp_pdf_path and os.path.exists(temp_pdf_path):
-                pdf_doc = fitz.open(temp_pdf_path)
-                self.pdf_total_pages = len(pdf_doc)
-                self.pdf_doc = pdf_doc
-                
-                self.page_label.config(text=f"Страница: 1 / {self.pdf_total_pages}")
-                
-                # Активируем кнопки навигации
-                if self.pdf_total_pages > 1:
-                    self.next_page_btn.config(state=tk.NORMAL)
-                
-                self.show_pdf_page(0)
-            else:
-                raise Exception("Не удалось создать временный PDF файл")
+            self._show_word_preview_pdf(temp_pdf_path)
                 
         except Exception as e:
             error_msg = f"Не удалось открыть предпросмотр Word документа.\n\n"
@@ -19699,6 +22633,25 @@ class PreviewWindow:
             messagebox.showerror("Ошибка предпросмотра", error_msg, parent=self.window)
             self.on_closing()
     
+    def _show_word_preview_pdf(self, pdf_path):
+        """Показывает PDF, полученный из документа Word"""
+        import fitz
+        
+        if not pdf_path or not os.path.exists(pdf_path):
+            raise Exception("Не удалось создать временный PDF файл")
+        
+        pdf_doc = fitz.open(pdf_path)
+        self.pdf_total_pages = len(pdf_doc)
+        self.pdf_doc = pdf_doc
+        
+        self.page_label.config(text=f"Страница: 1 / {self.pdf_total_pages}")
+        
+        # Активируем кнопки навигации
+        if self.pdf_total_pages > 1:
+            self.next_page_btn.config(state=tk.NORMAL)
+        
+        self.show_pdf_page(0)
+    
     def preview_pdf(self):
         """Предварительный просмотр PDF документа с визуальным отображением страниц"""
         if not PYMUPDF_AVAILABLE: